@@ -8,11 +8,125 @@ db = SQLAlchemy()
 def create_app(init_scheduler=True):
     app = Flask(__name__)
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-key-for-testing')
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///settings.db'
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///settings.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        # Worker threads write concurrently; wait for SQLite's lock instead of failing fast
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30}}
+    
+    # Feed fetching concurrency (overall and per host)
+    app.config['FEED_FETCH_WORKERS'] = int(os.environ.get('FEED_FETCH_WORKERS', 16))
+    app.config['FEED_FETCH_PER_HOST'] = int(os.environ.get('FEED_FETCH_PER_HOST', 2))
+    
+    # Article body prefetch right after ingest (concurrency overall and per domain)
+    app.config['PREFETCH_WORKERS'] = int(os.environ.get('PREFETCH_WORKERS', 8))
+    app.config['PREFETCH_PER_HOST'] = int(os.environ.get('PREFETCH_PER_HOST', 2))
+    app.config['PREFETCH_LIMIT'] = int(os.environ.get('PREFETCH_LIMIT', 200))
+    
+    # LLM worker pool and per-model budgets ('model=rpm:tpm,...'; others use the defaults)
+    app.config['LLM_WORKERS'] = int(os.environ.get('LLM_WORKERS', 4))
+    app.config['LLM_RATE_LIMITS'] = os.environ.get('LLM_RATE_LIMITS', '')
+    app.config['LLM_DEFAULT_RPM'] = int(os.environ.get('LLM_DEFAULT_RPM', 60))
+    app.config['LLM_DEFAULT_TPM'] = int(os.environ.get('LLM_DEFAULT_TPM', 40000))
+    app.config['LLM_RATE_LIMIT_RETRIES'] = int(os.environ.get('LLM_RATE_LIMIT_RETRIES', 3))
+    # Fraction of the budgets above used by this process, when several processes share the API key
+    app.config['LLM_RATE_LIMIT_SHARE'] = float(os.environ.get('LLM_RATE_LIMIT_SHARE', 1))
+    
+    # LLM request timeouts per stage (seconds), retries on timeouts/5xx, and hedging of slow
+    # requests after this latency percentile (0 = no hedging)
+    app.config['LLM_FILTER_TIMEOUT'] = float(os.environ.get('LLM_FILTER_TIMEOUT', 20))
+    app.config['LLM_PARSE_TIMEOUT'] = float(os.environ.get('LLM_PARSE_TIMEOUT', 60))
+    app.config['LLM_RETRIES'] = int(os.environ.get('LLM_RETRIES', 2))
+    app.config['LLM_RETRY_BACKOFF'] = float(os.environ.get('LLM_RETRY_BACKOFF', 1.0))
+    app.config['LLM_HEDGE_PERCENTILE'] = float(os.environ.get('LLM_HEDGE_PERCENTILE', 0))
+    
+    # LLM backend ('openai' or 'ollama'), its server's base URL (e.g. the local mock) and
+    # a key to send instead of the one from the settings page
+    app.config['LLM_BACKEND'] = os.environ.get('LLM_BACKEND', 'openai')
+    app.config['LLM_BASE_URL'] = os.environ.get('LLM_BASE_URL', '')
+    app.config['LLM_API_KEY'] = os.environ.get('LLM_API_KEY', '')
+    
+    # LLM usage rows buffered before one bulk insert (or after this many seconds), and model
+    # prices ('model=prompt:completion,...' in dollars per million tokens) on top of the built-in ones
+    app.config['USAGE_FLUSH_SIZE'] = int(os.environ.get('USAGE_FLUSH_SIZE', 200))
+    app.config['USAGE_FLUSH_INTERVAL'] = float(os.environ.get('USAGE_FLUSH_INTERVAL', 10))
+    app.config['LLM_PRICES'] = os.environ.get('LLM_PRICES', '')
+    
+    # Entries kept in the persistent LLM response cache (0 = disabled)
+    app.config['LLM_CACHE_MAX_ENTRIES'] = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 10000))
+    
+    # Estimated similarity (0-1) above which articles are treated as near-duplicates (0 = disabled)
+    app.config['NEAR_DUP_THRESHOLD'] = float(os.environ.get('NEAR_DUP_THRESHOLD', 0.7))
+    
+    # Local pre-filter ahead of the filter model: scores at or above KEEP skip it, at or below DISCARD are dropped
+    app.config['PREFILTER_ENABLED'] = os.environ.get('PREFILTER_ENABLED', '1') not in ('0', 'false', 'False')
+    app.config['PREFILTER_KEEP_SCORE'] = float(os.environ.get('PREFILTER_KEEP_SCORE', 30))
+    app.config['PREFILTER_DISCARD_SCORE'] = float(os.environ.get('PREFILTER_DISCARD_SCORE', -8))
+    
+    # Tokens of article text sent to the filter and parse models (capped by each model's context size)
+    app.config['FILTER_INPUT_TOKENS'] = int(os.environ.get('FILTER_INPUT_TOKENS', 400))
+    app.config['PARSE_INPUT_TOKENS'] = int(os.environ.get('PARSE_INPUT_TOKENS', 2000))
+    
+    # Failed articles are retried after ARTICLE_RETRY_BACKOFF seconds, doubling up to the maximum,
+    # and moved to the dead-letter queue after ARTICLE_MAX_ATTEMPTS failures (0 = retry forever)
+    app.config['ARTICLE_MAX_ATTEMPTS'] = int(os.environ.get('ARTICLE_MAX_ATTEMPTS', 5))
+    app.config['ARTICLE_RETRY_BACKOFF'] = int(os.environ.get('ARTICLE_RETRY_BACKOFF', 300))
+    app.config['ARTICLE_RETRY_MAX_BACKOFF'] = int(os.environ.get('ARTICLE_RETRY_MAX_BACKOFF', 24 * 3600))
+    
+    # Article job queue: seconds a worker's claim lasts without a heartbeat, seconds between heartbeats,
+    # and jobs claimed at once; expired claims are taken over by other workers
+    app.config['JOB_LEASE_SECONDS'] = int(os.environ.get('JOB_LEASE_SECONDS', 300))
+    app.config['JOB_HEARTBEAT_INTERVAL'] = int(os.environ.get('JOB_HEARTBEAT_INTERVAL', 60))
+    app.config['JOB_CLAIM_BATCH'] = int(os.environ.get('JOB_CLAIM_BATCH', 100))
+    
+    # Response format requested from the parse model: 'auto' (JSON mode where the model supports it),
+    # 'json_object', 'json_schema' (structured outputs pinned to the summary schema) or 'none'
+    app.config['PARSE_RESPONSE_FORMAT'] = os.environ.get('PARSE_RESPONSE_FORMAT', 'auto')
+    
+    # Articles classified per filter request by process_pending_articles (1 = one request per article)
+    app.config['FILTER_GROUP_SIZE'] = int(os.environ.get('FILTER_GROUP_SIZE', 1))
+    
+    # Batch API mode (run_process_articles.py --batch): seconds between status polls and overall timeout
+    app.config['BATCH_POLL_INTERVAL'] = int(os.environ.get('BATCH_POLL_INTERVAL', 30))
+    app.config['BATCH_TIMEOUT'] = int(os.environ.get('BATCH_TIMEOUT', 24 * 3600))
+    
+    # Bounds (minutes) for the adaptive per-feed polling schedule
+    app.config['POLL_MIN_INTERVAL'] = int(os.environ.get('POLL_MIN_INTERVAL', 15))
+    app.config['POLL_MAX_INTERVAL'] = int(os.environ.get('POLL_MAX_INTERVAL', 720))
+    
+    # Shared outbound HTTP session (timeouts in seconds, pool sizes per host)
+    app.config['HTTP_CONNECT_TIMEOUT'] = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 5))
+    app.config['HTTP_READ_TIMEOUT'] = float(os.environ.get('HTTP_READ_TIMEOUT', 20))
+    app.config['HTTP_POOL_SIZE'] = int(os.environ.get('HTTP_POOL_SIZE', 10))
+    app.config['HTTP_HOST_POOL_SIZES'] = os.environ.get('HTTP_HOST_POOL_SIZES', '')
+    app.config['HTTP_RETRIES'] = int(os.environ.get('HTTP_RETRIES', 3))
+    app.config['HTTP_BACKOFF'] = float(os.environ.get('HTTP_BACKOFF', 0.5))
+    
+    # Article page downloads: size cap in bytes and accepted content types
+    app.config['EXTRACT_MAX_BYTES'] = int(os.environ.get('EXTRACT_MAX_BYTES', 5 * 1024 * 1024))
+    app.config['EXTRACT_CONTENT_TYPES'] = os.environ.get('EXTRACT_CONTENT_TYPES', 'text/html,application/xhtml+xml')
+    
+    # Worker processes for HTML extraction (0 = one per CPU core, -1 = extract in-process)
+    app.config['EXTRACTION_WORKERS'] = int(os.environ.get('EXTRACTION_WORKERS', 0))
+    # HTML extraction backend: 'lxml' (fast, needs lxml installed) or 'bs4'
+    app.config['EXTRACTION_BACKEND'] = os.environ.get('EXTRACTION_BACKEND', '')
     
     db.init_app(app)
     
+    from app import article_retry, http_client, extraction, job_queue, rate_limit, llm_cache, llm_client, near_dup, prefilter, prompt_budget, structured_output, usage
+    http_client.init_app(app)
+    extraction.init_app(app)
+    rate_limit.init_app(app)
+    llm_cache.init_app(app)
+    llm_client.init_app(app)
+    near_dup.init_app(app)
+    prefilter.init_app(app)
+    prompt_budget.init_app(app)
+    structured_output.init_app(app)
+    usage.init_app(app)
+    article_retry.init_app(app)
+    job_queue.init_app(app)
+    
     # Add custom template filters
     @app.template_filter('from_json')
     def from_json(value):
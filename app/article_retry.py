@@ -0,0 +1,105 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func, or_
+from app import db
+from app.models import Article
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Error classes of a failed processing attempt
+CONFIG = 'config'
+EXTRACTION = 'extraction'
+FILTER_FAILED = 'filter_failed'
+PARSE_FAILED = 'parse_failed'
+BATCH_FAILED = 'batch_failed'
+EXCEPTION = 'exception'
+
+# Failures that say nothing about the article itself (e.g. no API key yet):
+# they delay the next attempt but never count towards dead-lettering it
+NOT_COUNTED = {CONFIG}
+
+# Defaults, overridden from the app config by init_app
+_config = {
+    'max_attempts': 5,  # 0 = retry forever
+    'backoff': 300,  # Seconds before the first retry, doubled after each failure
+    'max_backoff': 24 * 3600,
+}
+
+_counters = {'failures': 0, 'dead_lettered': 0, 'requeued': 0}
+_counters_lock = threading.Lock()
+
+
+def init_app(app):
+    """Configure attempts and backoff from the Flask app config"""
+    config = app.config
+    _config.update({
+        'max_attempts': config.get('ARTICLE_MAX_ATTEMPTS', _config['max_attempts']),
+        'backoff': config.get('ARTICLE_RETRY_BACKOFF', _config['backoff']),
+        'max_backoff': config.get('ARTICLE_RETRY_MAX_BACKOFF', _config['max_backoff']),
+    })
+
+
+def backoff_delay(attempts):
+    """Seconds to wait after the given number of failed attempts"""
+    return min(_config['max_backoff'], _config['backoff'] * (2 ** max(0, attempts - 1)))
+
+
+def record_failure(article, error_class, message=''):
+    """Schedule the next attempt at an article, or dead-letter it once its attempts are used up; the caller commits"""
+    now = datetime.utcnow()
+    article.error_class = error_class
+    article.last_error = (message or '')[:255]
+
+    if error_class in NOT_COUNTED:
+        article.next_attempt_at = now + timedelta(seconds=backoff_delay(1))
+        return
+
+    article.attempts = (article.attempts or 0) + 1
+    with _counters_lock:
+        _counters['failures'] += 1
+    max_attempts = _config['max_attempts']
+    if max_attempts and article.attempts >= max_attempts:
+        article.dead_lettered_at = now
+        article.next_attempt_at = None
+        with _counters_lock:
+            _counters['dead_lettered'] += 1
+        logger.warning(f"Article {article.id} failed {article.attempts} times ({error_class}), moved to the dead-letter queue")
+    else:
+        delay = backoff_delay(article.attempts)
+        article.next_attempt_at = now + timedelta(seconds=delay)
+        logger.info(f"Article {article.id} failed ({error_class}), attempt {article.attempts}; retrying in {delay}s")
+
+
+def requeue(article):
+    """Give an article a fresh set of attempts, due right away; the caller commits"""
+    article.attempts = 0
+    article.next_attempt_at = None
+    article.dead_lettered_at = None
+    article.error_class = None
+    article.last_error = None
+    with _counters_lock:
+        _counters['requeued'] += 1
+
+
+def due(now=None):
+    """SQL condition for articles that may be attempted now: not dead-lettered and not backing off"""
+    now = now or datetime.utcnow()
+    return and_(
+        Article.dead_lettered_at.is_(None),
+        or_(Article.next_attempt_at.is_(None), Article.next_attempt_at <= now)
+    )
+
+
+def stats():
+    with _counters_lock:
+        counters = dict(_counters)
+    now = datetime.utcnow()
+    unprocessed = Article.processed.is_(False)
+    counters['dead_letter_queue'] = db.session.query(func.count(Article.id)).filter(
+        unprocessed, Article.dead_lettered_at.isnot(None)).scalar()
+    counters['backing_off'] = db.session.query(func.count(Article.id)).filter(
+        unprocessed, Article.dead_lettered_at.is_(None), Article.next_attempt_at > now).scalar()
+    counters['max_attempts'] = _config['max_attempts']
+    return counters
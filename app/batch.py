@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import logging
+import itertools
+from app import http_client
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Batch states after which the batch will not change any more
+TERMINAL_STATES = {'completed', 'failed', 'expired', 'cancelled'}
+
+
+def make_request(custom_id, model, messages, max_tokens=500, response_format=None):
+    """One line of a Batch API input file: a chat completion request"""
+    request = {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": {
+            "model": model,
+            "messages": messages,
+            "temperature": 0.2,
+            "max_tokens": max_tokens
+        }
+    }
+    if response_format:
+        request["body"]["response_format"] = response_format
+    return request
+
+
+class BatchClient:
+    """Submits a list of chat completion requests as one batch and collects the answers"""
+
+    def submit(self, requests):
+        """Submit the requests and return a batch id"""
+        raise NotImplementedError
+
+    def status(self, batch_id):
+        """Return the batch state, e.g. in_progress or completed"""
+        raise NotImplementedError
+
+    def results(self, batch_id):
+        """Return a dict of custom_id -> message content (None for failed requests)"""
+        raise NotImplementedError
+
+    def usage(self, batch_id):
+        """Return a dict of custom_id -> (prompt tokens, completion tokens) for answered requests"""
+        return {}
+
+
+class OpenAIBatchClient(BatchClient):
+    """Client for the OpenAI Batch API (/v1/files and /v1/batches)"""
+
+    def __init__(self, api_key, base_url=None):
+        self.api_key = api_key
+        self.base_url = (base_url or os.environ.get('OPENAI_BASE_URL') or 'https://api.openai.com/v1').rstrip('/')
+        self._batches = {}
+        self._usage = {}
+
+    def _headers(self):
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    def submit(self, requests):
+        payload = '\n'.join(json.dumps(request) for request in requests).encode('utf-8')
+        response = http_client.post(
+            f"{self.base_url}/files",
+            headers=self._headers(),
+            files={"file": ("batch.jsonl", payload, "application/jsonl")},
+            data={"purpose": "batch"}
+        )
+        response.raise_for_status()
+        input_file_id = response.json()["id"]
+
+        response = http_client.post(
+            f"{self.base_url}/batches",
+            headers=self._headers(),
+            json={
+                "input_file_id": input_file_id,
+                "endpoint": "/v1/chat/completions",
+                "completion_window": "24h"
+            }
+        )
+        response.raise_for_status()
+        batch = response.json()
+        self._batches[batch["id"]] = batch
+        return batch["id"]
+
+    def status(self, batch_id):
+        response = http_client.get(f"{self.base_url}/batches/{batch_id}", headers=self._headers())
+        response.raise_for_status()
+        batch = response.json()
+        self._batches[batch_id] = batch
+        return batch["status"]
+
+    def results(self, batch_id):
+        batch = self._batches.get(batch_id) or {}
+        output_file_id = batch.get("output_file_id")
+        if not output_file_id:
+            return {}
+
+        response = http_client.get(f"{self.base_url}/files/{output_file_id}/content", headers=self._headers())
+        response.raise_for_status()
+
+        answers = {}
+        usage = self._usage.setdefault(batch_id, {})
+        for line in response.text.splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            content = None
+            result = item.get("response") or {}
+            if result.get("status_code") == 200:
+                body = result.get("body") or {}
+                try:
+                    content = body["choices"][0]["message"]["content"]
+                except (KeyError, IndexError, TypeError):
+                    content = None
+                tokens = body.get("usage") or {}
+                if tokens:
+                    usage[item.get("custom_id")] = (tokens.get("prompt_tokens"), tokens.get("completion_tokens"))
+            answers[item.get("custom_id")] = content
+        return answers
+
+    def usage(self, batch_id):
+        return dict(self._usage.get(batch_id, {}))
+
+
+class LocalBatchClient(BatchClient):
+    """Offline stand-in that answers every request with a local function.
+
+    responder is called with each request body (model, messages, ...) and
+    returns the message content, or None to simulate a failed request.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, responder):
+        self.responder = responder
+        self._results = {}
+
+    def submit(self, requests):
+        batch_id = f"local-batch-{next(self._ids)}"
+        answers = {}
+        for request in requests:
+            try:
+                answers[request["custom_id"]] = self.responder(request["body"])
+            except Exception as e:
+                logger.error(f"Local batch request {request['custom_id']} failed: {str(e)}")
+                answers[request["custom_id"]] = None
+        self._results[batch_id] = answers
+        return batch_id
+
+    def status(self, batch_id):
+        return 'completed' if batch_id in self._results else 'failed'
+
+    def results(self, batch_id):
+        return self._results.get(batch_id, {})
+
+
+def run_batch(client, requests, poll_interval=30, timeout=24 * 3600, usage=None):
+    """Submit a batch, wait for it to finish and return its answers by custom_id.
+
+    If usage is a dict it is filled with the token counts the batch
+    reported, as custom_id -> (prompt tokens, completion tokens).
+    """
+    if not requests:
+        return {}
+
+    batch_id = client.submit(requests)
+    logger.info(f"Submitted batch {batch_id} with {len(requests)} requests")
+
+    deadline = time.monotonic() + timeout
+    while True:
+        state = client.status(batch_id)
+        if state in TERMINAL_STATES:
+            break
+        if time.monotonic() > deadline:
+            logger.error(f"Batch {batch_id} did not finish within {timeout}s (state: {state})")
+            return {}
+        time.sleep(poll_interval)
+
+    if state not in ('completed', 'expired'):
+        logger.error(f"Batch {batch_id} ended in state {state}")
+        return {}
+
+    # Expired batches may still have answers for the requests that did complete
+    answers = client.results(batch_id)
+    if usage is not None:
+        usage.update(client.usage(batch_id))
+    logger.info(f"Batch {batch_id} {state}: {sum(1 for a in answers.values() if a)} of {len(requests)} requests answered")
+    return answers
@@ -0,0 +1,34 @@
+from sqlalchemy import insert
+from app import db
+
+# Keep IN (...) lists well below the bound-parameter limits of every backend
+IN_CHUNK_SIZE = 500
+
+
+def chunked(values, size=IN_CHUNK_SIZE):
+    """Yield successive slices of a list"""
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def existing_values(column, values):
+    """Return the subset of values already present in a column, using batched IN queries"""
+    found = set()
+    for chunk in chunked(set(v for v in values if v is not None)):
+        found.update(value for (value,) in db.session.query(column).filter(column.in_(chunk)))
+    return found
+
+
+def insert_ignore(table):
+    """Build an INSERT that silently skips rows violating a unique constraint"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert(table).on_conflict_do_nothing()
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert(table).on_conflict_do_nothing()
+    if dialect in ('mysql', 'mariadb'):
+        return insert(table).prefix_with('IGNORE')
+    return insert(table)
@@ -0,0 +1,215 @@
+import os
+import atexit
+import logging
+import threading
+import multiprocessing
+import multiprocessing.util
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import html2text
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+except ImportError:  # Optional dependency, only needed for the fast backend
+    lxml = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Common containers that hold the main text of an article
+CONTENT_SELECTOR = 'article, .article, .post, .content, main, #content, #main'
+
+# The same selector as XPath, so lxml can evaluate it without cssselect.
+# Like soup.select, a union returns matches in document order.
+CONTENT_XPATH = ' | '.join([
+    '//article',
+    "//*[contains(concat(' ', normalize-space(@class), ' '), ' article ')]",
+    "//*[contains(concat(' ', normalize-space(@class), ' '), ' post ')]",
+    "//*[contains(concat(' ', normalize-space(@class), ' '), ' content ')]",
+    '//main',
+    "//*[@id='content']",
+    "//*[@id='main']",
+])
+
+DEFAULT_BACKEND = 'lxml' if lxml is not None else 'bs4'
+
+_pool = None
+_pool_lock = threading.Lock()
+_pool_workers = 0  # 0 = one worker per CPU core
+_backend = DEFAULT_BACKEND
+
+
+def make_converter():
+    """HTML to text converter; a fresh one per document since it keeps parse state"""
+    h2t = html2text.HTML2Text()
+    h2t.ignore_links = False
+    h2t.ignore_images = True
+    h2t.ignore_tables = False
+    return h2t
+
+
+class ExtractionBackend:
+    """Finds the main content of an HTML document and returns it as markdown"""
+
+    name = None
+
+    def extract(self, raw, encoding=None):
+        raise NotImplementedError
+
+
+class BeautifulSoupBackend(ExtractionBackend):
+    """Pure-Python backend using BeautifulSoup's html.parser"""
+
+    name = 'bs4'
+
+    def extract(self, raw, encoding=None):
+        soup = BeautifulSoup(raw, 'html.parser', from_encoding=encoding)
+
+        # Remove script and style elements
+        for script in soup(["script", "style"]):
+            script.extract()
+
+        # Look for common content containers, falling back to the body
+        content_candidates = soup.select(CONTENT_SELECTOR)
+        main_content = content_candidates[0] if content_candidates else soup.body
+
+        if main_content:
+            return make_converter().handle(str(main_content))
+        return None
+
+
+class LxmlBackend(ExtractionBackend):
+    """Fast backend using lxml's C parser and a single XPath query"""
+
+    name = 'lxml'
+
+    def extract(self, raw, encoding=None):
+        parser = lxml.html.HTMLParser(encoding=encoding) if encoding else None
+        document = lxml.html.document_fromstring(raw, parser=parser)
+
+        # Remove script and style elements
+        for element in document.xpath('//script | //style'):
+            element.drop_tree()
+
+        # Look for common content containers, falling back to the body
+        content_candidates = document.xpath(CONTENT_XPATH)
+        main_content = content_candidates[0] if content_candidates else document.find('body')
+
+        if main_content is not None:
+            return make_converter().handle(lxml.html.tostring(main_content, encoding='unicode'))
+        return None
+
+
+BACKENDS = {
+    BeautifulSoupBackend.name: BeautifulSoupBackend,
+    LxmlBackend.name: LxmlBackend,
+}
+
+
+def get_backend(name=None):
+    """Return an extraction backend by name, falling back to bs4 if it is unavailable"""
+    name = name or _backend
+    if name == LxmlBackend.name and lxml is None:
+        logger.warning("lxml is not installed, using the bs4 extraction backend")
+        name = BeautifulSoupBackend.name
+    backend_class = BACKENDS.get(name)
+    if backend_class is None:
+        logger.warning(f"Unknown extraction backend '{name}', using bs4")
+        backend_class = BeautifulSoupBackend
+    return backend_class()
+
+
+def html_to_markdown(raw, encoding=None, backend=None):
+    """Extract the main content of an HTML document and convert it to markdown.
+
+    Takes the raw response bytes and returns a markdown string (or None), so
+    only small payloads cross the process boundary when run on the pool.
+    If the selected backend fails, the document is retried with bs4.
+    """
+    selected = get_backend(backend)
+    try:
+        result = selected.extract(raw, encoding)
+        if result or selected.name == BeautifulSoupBackend.name:
+            return result
+    except Exception as e:
+        if selected.name == BeautifulSoupBackend.name:
+            raise
+        logger.debug(f"{selected.name} extraction failed ({str(e)}), retrying with bs4")
+    return BeautifulSoupBackend().extract(raw, encoding)
+
+
+def init_app(app):
+    """Configure the extraction backend and pool size from the Flask app config.
+
+    The pool itself is not started here, so the web app and scripts that never
+    parse article HTML don't fork a process per core; see start_pool.
+    """
+    global _pool_workers, _backend
+    _pool_workers = app.config.get('EXTRACTION_WORKERS', 0)
+    _backend = app.config.get('EXTRACTION_BACKEND') or DEFAULT_BACKEND
+
+
+def start_pool():
+    """Start the extraction pool in a process that is going to extract articles.
+
+    Call it before the process starts its scheduler, fetch or LLM threads:
+    forking once they run could copy a lock one of them holds into the
+    children. Does nothing if the pool is disabled (EXTRACTION_WORKERS < 0).
+    """
+    if _pool_workers < 0:
+        return None
+    return get_pool()
+
+
+def get_pool():
+    """Return the shared extraction process pool, starting it and all its worker processes if needed"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = _pool_workers if _pool_workers > 0 else (os.cpu_count() or 1)
+                # Fork where available: spawned children would re-import the
+                # entry script (app.py), which creates the app and its scheduler
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+                pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+                # A forking pool starts every worker on its first task, so do that now
+                pool.submit(len, b'').result()
+                _pool = pool
+                logger.info(f"Started HTML extraction pool with {workers} worker processes")
+    return _pool
+
+
+def shutdown_pool(wait=False):
+    """Stop the extraction pool's worker processes"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=wait, cancel_futures=True)
+            _pool = None
+
+
+atexit.register(shutdown_pool)
+# Processes started by multiprocessing skip atexit and join their children on exit,
+# so stop the pool first, before multiprocessing closes the queues it talks through
+multiprocessing.util.Finalize(None, shutdown_pool, kwargs={'wait': True}, exitpriority=100)
+
+
+def extract_markdown(raw, encoding=None, timeout=60):
+    """Run html_to_markdown on the process pool.
+
+    Runs in the calling thread instead if the pool was not started (see
+    start_pool), is disabled, or its worker processes died. The pool is never
+    started or restarted from here: that would fork from a process with
+    running threads.
+    """
+    pool = _pool
+    if _pool_workers < 0 or pool is None:
+        return html_to_markdown(raw, encoding, _backend)
+    try:
+        return pool.submit(html_to_markdown, raw, encoding, _backend).result(timeout=timeout)
+    except BrokenProcessPool:
+        logger.warning("HTML extraction pool is broken, extracting in-process until the next restart")
+        shutdown_pool()
+        return html_to_markdown(raw, encoding, _backend)
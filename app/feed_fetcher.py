@@ -0,0 +1,117 @@
+import time
+import logging
+from collections import Counter, deque
+from urllib.parse import urlparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class FetchResult:
+    """Outcome of fetching a single feed"""
+
+    def __init__(self, feed_id, url, data=None, error=None, elapsed=0.0):
+        self.feed_id = feed_id
+        self.url = url
+        self.data = data
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        return self.data is not None and self.error is None
+
+    def __repr__(self):
+        return f'<FetchResult feed={self.feed_id} ok={self.ok} elapsed={self.elapsed:.2f}s>'
+
+
+def host_of(url):
+    return urlparse(url).netloc.lower()
+
+
+def run_concurrently(items, func, url_of, max_workers=16, per_host=2, name='feed-fetch'):
+    """Run func(item) for every item on a bounded thread pool.
+
+    At most max_workers calls run at once overall and at most per_host calls
+    run at once against the same host (as returned by url_of(item)).
+    Items wait in per-host queues and are only handed to the pool once their
+    host has a free slot, so no pool thread sits blocked behind a busy host
+    while other hosts have work. Hosts take turns for free threads.
+    Results are returned in the same order as items.
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    per_host = max(1, per_host)
+    waiting = {}
+    for index, item in enumerate(items):
+        waiting.setdefault(host_of(url_of(item)), deque()).append(index)
+
+    workers = max(1, min(max_workers, len(items)))
+    results = [None] * len(items)
+    running = {}
+    active = Counter()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name) as executor:
+        while waiting or running:
+            # One item per host per pass, so a host with many items can't take every thread
+            submitted = True
+            while submitted and len(running) < workers:
+                submitted = False
+                for host in list(waiting):
+                    if len(running) >= workers:
+                        break
+                    if active[host] >= per_host:
+                        continue
+                    index = waiting[host].popleft()
+                    if not waiting[host]:
+                        del waiting[host]
+                    running[executor.submit(func, items[index])] = (host, index)
+                    active[host] += 1
+                    submitted = True
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                host, index = running.pop(future)
+                active[host] -= 1
+                results[index] = future.result()
+    return results
+
+
+def fetch_feeds(feeds, fetch_func, max_workers=16, per_host=2):
+    """Fetch many feeds in parallel.
+
+    feeds is a list of (feed_id, url, *args) tuples and fetch_func is called
+    as fetch_func(url, *args) for each one. Only network work happens on the
+    pool threads; callers apply the returned FetchResult objects to the
+    database afterwards.
+    """
+    def _fetch(feed):
+        feed_id, url, *args = feed
+        started = time.monotonic()
+        try:
+            data = fetch_func(url, *args)
+            error = None if data is not None else 'no data returned'
+        except Exception as e:
+            data = None
+            error = str(e)
+        return FetchResult(feed_id, url, data=data, error=error, elapsed=time.monotonic() - started)
+
+    started = time.monotonic()
+    results = run_concurrently(feeds, _fetch, url_of=lambda feed: feed[1],
+                               max_workers=max_workers, per_host=per_host)
+    logger.info(f"Fetched {len(results)} feeds in {time.monotonic() - started:.2f}s "
+                f"(max_workers={max_workers}, per_host={per_host})")
+    return results
+
+
+def log_fetch_timings(results, limit=10):
+    """Log the slowest feeds of a fetch cycle"""
+    slowest = sorted(results, key=lambda result: result.elapsed, reverse=True)[:limit]
+    total = sum(result.elapsed for result in results)
+    for result in slowest:
+        share = (result.elapsed / total * 100) if total else 0
+        status = 'ok' if result.ok else f'failed: {result.error}'
+        logger.info(f"Feed {result.feed_id} took {result.elapsed:.2f}s ({share:.0f}% of fetch time, {status}): {result.url}")
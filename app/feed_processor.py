@@ -1,16 +1,25 @@
 import os
 import json
+import time
 import uuid
 import logging
 import feedparser
-import requests
 import psutil
-import html2text
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from dateutil import parser as date_parser
-from bs4 import BeautifulSoup
-from app import db
+from flask import current_app
+from sqlalchemy import select, update
+from sqlalchemy.orm import aliased, lazyload, load_only
+from app import article_retry, db, http_client, job_queue, llm_cache, llm_client, near_dup, prefilter, prompt_budget, rate_limit, structured_output, usage
+from app.http_client import ContentRejected
+from app.db_utils import chunked, existing_values, insert_ignore
+from app.batch import OpenAIBatchClient, make_request, run_batch
+from app.extraction import extract_markdown
+from app.iocs import regex_extract_iocs
+from app.feed_fetcher import fetch_feeds, log_fetch_timings, run_concurrently
 from app.models import Feed, Article, Settings, Prompt, Tag, article_tags
+from app.poll_schedule import postpone_next_check, schedule_next_check
 import openai
 import re
 from dateutil import parser as date_parser
@@ -19,78 +28,81 @@ from dateutil import parser as date_parser
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# HTML to text converter
-h2t = html2text.HTML2Text()
-h2t.ignore_links = False
-h2t.ignore_images = True
-h2t.ignore_tables = False
-
-def fetch_feed(feed_url):
-    """Fetch and parse an RSS feed"""
+def fetch_feed(feed_url, etag=None, modified=None):
+    """Fetch and parse an RSS feed, using a conditional GET when etag/modified are known"""
     try:
-        feed_data = feedparser.parse(feed_url)
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if modified:
+            headers['If-Modified-Since'] = modified
+        
+        response = http_client.get(feed_url, headers=headers)
+        if response.status_code == 304:
+            return feedparser.FeedParserDict(status=304, entries=[], etag=etag, modified=modified)
+        if response.status_code >= 400:
+            logger.error(f"Error fetching feed {feed_url}: HTTP {response.status_code}")
+            return None
+        
+        feed_data = feedparser.parse(
+            response.content,
+            response_headers={k.lower(): v for k, v in response.headers.items()}
+        )
+        feed_data['status'] = response.status_code
+        feed_data['href'] = response.url
+        feed_data['etag'] = response.headers.get('ETag')
+        feed_data['modified'] = response.headers.get('Last-Modified')
         return feed_data
     except Exception as e:
         logger.error(f"Error fetching feed {feed_url}: {str(e)}")
         return None
 
 def extract_content(url):
-    """Extract the main content from a URL"""
+    """Extract the main content from a URL.
+    
+    Returns None on transient failures. Raises ContentRejected when the page
+    is too large or not HTML, so callers can record it and stop retrying.
+    """
     try:
-        response = requests.get(url, timeout=10)
+        response = http_client.download(url)
         if response.status_code != 200:
             return None
         
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.extract()
-        
-        # Try to find the main content
-        main_content = None
-        
-        # Look for common content containers
-        content_candidates = soup.select('article, .article, .post, .content, main, #content, #main')
-        if content_candidates:
-            main_content = content_candidates[0]
-        else:
-            # Fallback to body
-            main_content = soup.body
-        
-        if main_content:
-            # Convert to markdown
-            text = h2t.handle(str(main_content))
-            return text
-        
-        return None
+        # Parsing and markdown conversion are CPU-bound, so they run on the extraction process pool
+        return extract_markdown(response.content, response.encoding)
+    except ContentRejected:
+        raise
     except Exception as e:
         logger.error(f"Error extracting content from {url}: {str(e)}")
         return None
 
-def regex_extract_iocs(text):
-    """Extract IOCs using regex patterns"""
-    md5 = re.findall(r"\b[a-fA-F0-9]{32}\b", text)
-    sha1 = re.findall(r"\b[a-fA-F0-9]{40}\b", text)
-    sha256 = re.findall(r"\b[a-fA-F0-9]{64}\b", text)
-    ips = re.findall(r"\b(?:\d{1,3}\.){3}\d{1,3}\b", text)
-    domains = re.findall(r"\b[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b", text)
-    return {"md5": md5, "sha1": sha1, "sha256": sha256, "ips": ips, "domains": domains}
-
-def call_openai(model, messages, api_key):
-    """Call OpenAI API with the given model and messages"""
-    try:
-        client = openai.OpenAI(api_key=api_key)
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=0.2,
-            max_tokens=500
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        logger.error(f"Error calling OpenAI API: {str(e)}")
-        return None
+def call_openai(model, messages, api_key, max_tokens=500, stage=llm_client.PARSE, response_format=None):
+    """Call OpenAI API with the given model and messages.
+    
+    Each call waits for room in the model's requests/tokens-per-minute
+    budget, and 429 responses pause every worker using that model before
+    the call is retried. The request itself goes through the shared client
+    with the stage's timeout (see llm_client.create_completion).
+    """
+    limiter = rate_limit.get_limiter(model)
+    retries = current_app.config.get('LLM_RATE_LIMIT_RETRIES', 3)
+    for attempt in range(retries + 1):
+        limiter.acquire(rate_limit.estimate_tokens(messages, max_tokens))
+        try:
+            # Retries on 429 are handled here so they respect the shared backoff
+            response = llm_client.create_completion(api_key, model, messages, max_tokens=max_tokens, stage=stage,
+                                                    response_format=response_format)
+            limiter.on_success()
+            if response.prompt_tokens is not None:
+                logger.info(f"{model}: sent {response.prompt_tokens} prompt tokens, received {response.completion_tokens}")
+            return response.content
+        except openai.RateLimitError as e:
+            limiter.on_rate_limited(rate_limit.retry_after(e))
+        except Exception as e:
+            logger.error(f"Error calling OpenAI API: {str(e)}")
+            return None
+    logger.error(f"Error calling OpenAI API: still rate limited on {model} after {retries} retries")
+    return None
 
 def send_to_joplin(title, content, api_url, token):
     """Send content to Joplin via the Webclipper API"""
@@ -105,17 +117,282 @@ def send_to_joplin(title, content, api_url, token):
             "tags": ["cti", "openai"]
         }
         
-        response = requests.post(url, params=params, json=data)
+        response = http_client.post(url, params=params, json=data)
         return response.json()
     except Exception as e:
         logger.error(f"Error sending to Joplin: {str(e)}")
         return None
 
-def process_article(article_id, skip_processing_check=False):
-    """Process an article with OpenAI and send to Joplin"""
+FILTER_SYSTEM_PROMPT = "You are a CTI analyst assistant that determines if articles contain valuable threat intelligence."
+FILTER_INSTRUCTIONS = "Determine if this article contains valuable threat intelligence information such as new threats, vulnerabilities, TTPs, or IOCs. Respond with only 'KEEP' or 'DISCARD'."
+PARSE_SYSTEM_PROMPT = "You are a concise CTI analyst assistant."
+
+def filter_prompt_text():
+    """Prompt text of the first stage, used as part of the response cache key"""
+    return f"{FILTER_SYSTEM_PROMPT}\n{FILTER_INSTRUCTIONS}"
+
+def parse_prompt_text(parse_prompt):
+    """Prompt text of the second stage, used as part of the response cache key"""
+    return f"{PARSE_SYSTEM_PROMPT}\n{parse_prompt.content}"
+
+def filter_input(filter_prompt, content):
+    """The parts of an article sent to the filter model, packed into its small token budget"""
+    return prompt_budget.build_input(content, prompt_budget.FILTER, filter_prompt.model, filter_prompt_text())
+
+def parse_input(parse_prompt, content):
+    """The parts of an article sent to the parse model, packed into its token budget"""
+    return prompt_budget.build_input(content, prompt_budget.PARSE, parse_prompt.model, parse_prompt_text(parse_prompt))
+
+def build_filter_messages(article_text):
+    """Messages for the first (KEEP/DISCARD) stage; article_text is the text of filter_input"""
+    return [
+        {"role": "system", "content": FILTER_SYSTEM_PROMPT},
+        {"role": "user", "content": f"{FILTER_INSTRUCTIONS} Article: {article_text}"}
+    ]
+
+def build_parse_messages(parse_prompt, article_text):
+    """Messages for the second (detailed parse) stage; article_text is the text of parse_input"""
+    return [
+        {"role": "system", "content": PARSE_SYSTEM_PROMPT},
+        {"role": "user", "content": f"{parse_prompt.content} Article: {article_text}"}
+    ]
+
+def call_filter_model(filter_prompt, content, api_key, article_input=None):
+    """Run the first stage, reusing a cached answer for identical content.
+    
+    article_input is the content already packed by filter_input, if the caller has it.
+    """
+    article_input = article_input or filter_input(filter_prompt, content)
+    
+    def send():
+        prompt_budget.record_sent(article_input)
+        return call_openai(filter_prompt.model, build_filter_messages(article_input.text), api_key,
+                           stage=llm_client.FILTER)
+    
+    return llm_cache.cached_completion(
+        filter_prompt.name, filter_prompt.model, filter_prompt_text(), article_input.text, send,
+        stage=llm_client.FILTER
+    )
+
+def call_parse_model(parse_prompt, content, api_key):
+    """Run the second stage, reusing a cached answer for identical content"""
+    article_input = parse_input(parse_prompt, content)
+    messages = build_parse_messages(parse_prompt, article_input.text)
+    
+    def send():
+        prompt_budget.record_sent(article_input)
+        return call_openai(parse_prompt.model, messages, api_key,
+                           response_format=structured_output.response_format(parse_prompt.model, messages))
+    
+    return llm_cache.cached_completion(
+        parse_prompt.name, parse_prompt.model, parse_prompt_text(parse_prompt), article_input.text, send,
+        stage=llm_client.PARSE
+    )
+
+MULTI_FILTER_INSTRUCTIONS = "For each numbered article below, determine if it contains valuable threat intelligence information such as new threats, vulnerabilities, TTPs, or IOCs. Respond with one line per article in the form '<number>: KEEP' or '<number>: DISCARD' and nothing else."
+
+MULTI_FILTER_VERDICT = re.compile(r'^\W*(\d+)\W+(KEEP|DISCARD)\b', re.IGNORECASE | re.MULTILINE)
+
+def build_multi_filter_messages(article_texts):
+    """Messages for one filter request covering several articles, numbered from 1"""
+    items = "\n\n".join(f"[{number}] {text}" for number, text in enumerate(article_texts, start=1))
+    return [
+        {"role": "system", "content": FILTER_SYSTEM_PROMPT},
+        {"role": "user", "content": f"{MULTI_FILTER_INSTRUCTIONS}\n\n{items}"}
+    ]
+
+def parse_multi_filter_verdicts(result, count):
+    """Map item numbers to 'KEEP'/'DISCARD'; items missing, out of range or answered twice are left out"""
+    verdicts = {}
+    conflicting = set()
+    for number, verdict in MULTI_FILTER_VERDICT.findall(result or ''):
+        number = int(number)
+        if not 1 <= number <= count:
+            continue
+        verdict = verdict.upper()
+        if verdicts.get(number, verdict) != verdict:
+            conflicting.add(number)
+        verdicts[number] = verdict
+    return {number: verdict for number, verdict in verdicts.items() if number not in conflicting}
+
+def filter_articles_grouped(articles, filter_prompt, api_key, group_size):
+    """Run the filter stage for many articles, group_size of them per request.
+    
+    Returns a dict of article id -> 'KEEP' or 'DISCARD'. Articles whose
+    verdict could not be read from a grouped answer are retried one by one;
+    those that still fail are left out. Verdicts go into the response cache
+    under the same key as single-article answers.
+    """
+    prompt_text = filter_prompt_text()
+    inputs = {article.id: filter_input(filter_prompt, article.content) for article in articles}
+    verdicts = {}
+    pending = []
+    for article in articles:
+        cached = llm_cache.lookup(filter_prompt.model, prompt_text, inputs[article.id].text)
+        if cached is not None:
+            verdicts[article.id] = 'KEEP' if filter_says_keep(cached) else 'DISCARD'
+            usage.record(filter_prompt.model, llm_client.FILTER, cache_hit=True, article_ids=[article.id])
+        else:
+            pending.append(article)
+    
+    unparsed = []
+    for start in range(0, len(pending), group_size):
+        group = pending[start:start + group_size]
+        if len(group) == 1:
+            unparsed.extend(group)
+            continue
+        messages = build_multi_filter_messages([inputs[article.id].text for article in group])
+        prompt_budget.record_sent(*[inputs[article.id] for article in group])
+        # A verdict line is a handful of tokens; the request's tokens are shared out over the group
+        with usage.attribute(*[article.id for article in group]):
+            result = call_openai(filter_prompt.model, messages, api_key, max_tokens=8 * len(group) + 20,
+                                 stage=llm_client.FILTER)
+        parsed = parse_multi_filter_verdicts(result, len(group))
+        for number, article in enumerate(group, start=1):
+            verdict = parsed.get(number)
+            if verdict is None:
+                unparsed.append(article)
+                continue
+            verdicts[article.id] = verdict
+            llm_cache.store(filter_prompt.name, filter_prompt.model, prompt_text, inputs[article.id].text, verdict)
+    
+    if unparsed:
+        logger.info(f"Grouped filter: falling back to single requests for {len(unparsed)} articles")
+    for article in unparsed:
+        with usage.attribute(article.id):
+            result = call_filter_model(filter_prompt, article.content, api_key, inputs[article.id])
+        if result:
+            verdicts[article.id] = 'KEEP' if filter_says_keep(result) else 'DISCARD'
+    
+    logger.info(f"Grouped filter: {len(verdicts)} of {len(articles)} articles classified, {len(unparsed)} needed a single request")
+    return verdicts
+
+def filter_says_keep(filter_result):
+    """Whether the filter model's answer means the article should be kept"""
+    return "KEEP" in filter_result.upper()
+
+def mark_filtered_out(article, reason="Article filtered out - not relevant for CTI", filtered_by="model"):
+    """Record that the filter stage discarded an article; the caller commits.
+    
+    filtered_by is "model" for the filter model's verdict and "prefilter"
+    for a local pre-filter discard, which cost no LLM call.
+    """
+    article.processed = True
+    article.summary = json.dumps({"summary": reason, "filtered_out": True, "filtered_by": filtered_by})
+
+PREFILTER_REASON = "Article filtered out by the local pre-filter - not relevant for CTI"
+
+def fail_article(article, error_class, message):
+    """Log a failed attempt at an article and schedule its retry (or dead-letter it); returns False"""
+    logger.error(message)
+    article_retry.record_failure(article, error_class, message)
+    db.session.commit()
+    return False
+
+def save_parse_result(article, result_parse, settings):
+    """Store the parse stage's answer on the article and send it to Joplin"""
+    article_id = article.id
+    
+    # Extract IOCs using regex
+    iocs_regex = regex_extract_iocs(article.content)
+    
+    # Parse the result as JSON, repairing almost-JSON locally rather than paying for another call
+    summary_data = structured_output.parse_summary(result_parse)
+    if summary_data is None:
+        summary_data = {"summary": result_parse, "tags": ["cti"], "iocs": iocs_regex}
+    
+    # Ensure IOCs are included
+    if "iocs" not in summary_data:
+        summary_data["iocs"] = iocs_regex
+    
+    # Add the title
+    summary_data["title"] = article.title
+    summary_data["filtered_out"] = False
+    
+    # Save summary to article
+    article.summary = json.dumps(summary_data)
+    article.processed = True
+    db.session.commit()
+    
+    # Format the content for Joplin
+    joplin_content = f"# {summary_data['title']}\n\n"
+    
+    # Add publication date and link near the top
+    if article.published:
+        formatted_date = article.published.strftime('%Y-%m-%d %H:%M UTC')
+        joplin_content += f"*Published on: {formatted_date}*  \n"
+    joplin_content += f"*Source: [{article.url.split('/')[2]}]({article.url})*\n\n"
+    
+    joplin_content += f"## Summary\n{summary_data.get('summary', 'No summary available')}\n\n"
+    joplin_content += f"## Source Details\n[Original Article]({article.url})\n\n"
+    
+    joplin_content += "## IOCs\n"
+    for k, v in summary_data['iocs'].items():
+        if v:  # Only add if there are values
+            joplin_content += f"- {k.upper()}: {', '.join(v)}\n"
+    
+    if summary_data.get("ttp"):
+        joplin_content += f"\n## TTPs\n- {' '.join(summary_data['ttp'])}\n"
+    
+    if summary_data.get("threat_groups"):
+        joplin_content += f"\n## Threat Groups\n- {' '.join(summary_data['threat_groups'])}\n"
+    
+    # Send to Joplin if enabled and configured
+    if settings.joplin_enabled and settings.joplin_api_url and settings.joplin_token:
+        logger.info(f"Sending article {article_id} to Joplin")
+        joplin_response = send_to_joplin(
+            summary_data["title"], 
+            joplin_content, 
+            settings.joplin_api_url, 
+            settings.joplin_token
+        )
+        
+        if joplin_response:
+            article.sent_to_joplin = True
+            if 'id' in joplin_response:
+                article.joplin_id = joplin_response['id']
+            db.session.commit()
+            logger.info(f"Successfully sent article {article_id} to Joplin")
+    else:
+        if not settings.joplin_enabled:
+            logger.info(f"Joplin integration disabled, skipping send for article {article_id}")
+        else:
+            logger.info(f"Joplin API URL or token not configured, skipping send for article {article_id}")
+    
+    # Mark as processed
+    article.processed = True
+    db.session.commit()
+    
+    return True
+
+def process_article(article_id, claimed=False, filter_verdict=None):
+    """Process an article with OpenAI and send to Joplin.
+    
+    claimed means the caller already holds the article's job lease (see
+    process_pending_articles); otherwise the lease is taken here, and the
+    article is skipped if another worker holds it.
+    filter_verdict is 'KEEP' when the filter stage already ran for this
+    article (see run_grouped_filter), so only the parse stage is left.
+    Model calls made on the way are recorded against the article in the
+    usage table.
+    """
+    if claimed:
+        with usage.attribute(article_id):
+            return _process_article(article_id, filter_verdict)
+    
+    worker = job_queue.new_worker_id()
+    if not job_queue.claim_article(article_id, worker):
+        logger.warning(f"Article {article_id} is currently being processed by another worker, skipping")
+        return True
     try:
-        # Get the article with row locking to prevent concurrent processing
-        article = Article.query.with_for_update().get(article_id)
+        with job_queue.Heartbeat(current_app._get_current_object(), worker), usage.attribute(article_id):
+            return _process_article(article_id, filter_verdict)
+    finally:
+        job_queue.release([article_id], worker)
+
+def _process_article(article_id, filter_verdict):
+    try:
+        article = Article.query.get(article_id)
         if not article:
             logger.error(f"Article {article_id} not found")
             return False
@@ -123,178 +400,88 @@ def process_article(article_id, skip_processing_check=False):
         # Check if article is already processed
         if article.processed:
             logger.warning(f"Article {article_id} (GUID: {article.guid}) has already been processed, skipping")
-            # Make sure processing flag is reset
-            article.processing = False
-            db.session.commit()
             return True
-            
-        # Check if article is currently being processed by another process
-        # Skip this check if skip_processing_check is True (when called from process_pending_articles)
-        if not skip_processing_check and article.processing and not article.processed:
-            # Check if the processing has been going on for too long (more than 5 minutes)
-            # This prevents articles from getting stuck in processing state
-            current_time = datetime.utcnow()
-            processing_timeout = timedelta(minutes=5)
-            
-            if article.processing_started and (current_time - article.processing_started) > processing_timeout:
-                logger.warning(f"Article {article_id} (GUID: {article.guid}) has been in processing state for too long. Resetting processing flag.")
-                # Reset the processing flag to allow this process to handle it
-                article.processing = False
-                article.processing_started = None
-                db.session.commit()
-            else:
-                logger.warning(f"Article {article_id} (GUID: {article.guid}) is currently being processed by another process, skipping")
-                return True
-            
-        # Mark article as being processed and set the processing start time
-        article.processing = True
-        article.processing_started = datetime.utcnow()
-        db.session.commit()
         
         # Get settings
         settings = Settings.query.first()
         if not settings or not settings.openai_api_key:
-            logger.error("OpenAI API key not configured")
-            return False
+            return fail_article(article, article_retry.CONFIG, "OpenAI API key not configured")
         
         # Get prompts
         filter_prompt = Prompt.query.filter_by(name='filter_prompt').first()
         parse_prompt = Prompt.query.filter_by(name='parse_prompt').first()
         
         if not filter_prompt or not parse_prompt:
-            logger.error("Prompts not configured")
-            return False
+            return fail_article(article, article_retry.CONFIG, "Prompts not configured")
         
         # Extract content if not already done
-        if not article.content:
-            article.content = extract_content(article.url)
+        if not article.content and not article.content_error:
+            try:
+                article.content = extract_content(article.url)
+            except ContentRejected as e:
+                article.content_error = e.reason
             db.session.commit()
         
-        if not article.content:
-            logger.error(f"Could not extract content from {article.url}")
-            return False
-        
-        # Truncate content to limit token usage
-        truncated_content = article.content[:3000]
+        # Pages we refused to download (too large, not HTML) are never retried
+        if not article.content and article.content_error:
+            logger.warning(f"Skipping article {article_id}, content was rejected: {article.content_error}")
+            article.processed = True
+            article.summary = json.dumps({"summary": f"Article skipped - content rejected ({article.content_error})", "filtered_out": True})
+            db.session.commit()
+            return True
         
-        # FIRST STAGE: Determine if the article is worth keeping with GPT-3.5
-        filter_messages = [
-            {"role": "system", "content": "You are a CTI analyst assistant that determines if articles contain valuable threat intelligence."},
-            {"role": "user", "content": f"Determine if this article contains valuable threat intelligence information such as new threats, vulnerabilities, TTPs, or IOCs. Respond with only 'KEEP' or 'DISCARD'. Article: {truncated_content}"}
-        ]
+        if not article.content:
+            return fail_article(article, article_retry.EXTRACTION, f"Could not extract content from {article.url}")
         
-        # Call the filter model (GPT-3.5)
-        filter_result = call_openai(filter_prompt.model, filter_messages, settings.openai_api_key)
-        if not filter_result:
-            logger.error(f"Error calling OpenAI filter model for article {article_id}")
-            return False
+        # Near-duplicates of an already processed article reuse its result instead of calling the API
+        if near_dup.index_article(article):
+            saved = near_dup.reuse_canonical_summary(article)
+            db.session.commit()
+            if saved is not None:
+                logger.info(f"Article {article_id} is a near-duplicate of article {article.canonical_id}, reused its summary ({saved} LLM calls avoided)")
+                return True
         
-        # Check if the article should be kept
-        if "KEEP" not in filter_result.upper():
-            logger.info(f"Article {article_id} filtered out by GPT-3.5")
-            article.processed = True
-            article.summary = json.dumps({"summary": "Article filtered out - not relevant for CTI", "filtered_out": True})
+        # Clear keeps and clear rejects are decided locally without calling the filter model
+        verdict = prefilter.classify(article) if filter_verdict is None else None
+        if verdict == prefilter.DISCARD:
+            mark_filtered_out(article, PREFILTER_REASON, filtered_by="prefilter")
             db.session.commit()
-            return True  # We successfully processed it by deciding to filter it out
+            return True
+        db.session.commit()
+        
+        if verdict != prefilter.KEEP and filter_verdict != 'KEEP':
+            # FIRST STAGE: Determine if the article is worth keeping with GPT-3.5
+            filter_result = call_filter_model(filter_prompt, article.content, settings.openai_api_key)
+            if not filter_result:
+                return fail_article(article, article_retry.FILTER_FAILED, f"Error calling OpenAI filter model for article {article_id}")
+            
+            # Check if the article should be kept
+            if not filter_says_keep(filter_result):
+                logger.info(f"Article {article_id} filtered out by GPT-3.5")
+                mark_filtered_out(article)
+                db.session.commit()
+                return True  # We successfully processed it by deciding to filter it out
         
         # SECOND STAGE: Process the article in detail
         logger.info(f"Article {article_id} deemed relevant, processing with detailed analysis")
         
-        # Extract IOCs using regex
-        iocs_regex = regex_extract_iocs(article.content)
-        
-        # Prepare messages for detailed analysis
-        parse_messages = [
-            {"role": "system", "content": "You are a concise CTI analyst assistant."},
-            {"role": "user", "content": f"{parse_prompt.content} Article: {truncated_content}"}
-        ]
-        
         # Call the more powerful model for detailed analysis
-        result_parse = call_openai(parse_prompt.model, parse_messages, settings.openai_api_key)
+        result_parse = call_parse_model(parse_prompt, article.content, settings.openai_api_key)
         if not result_parse:
-            logger.error(f"Error calling OpenAI parse model for article {article_id}")
-            return False
+            return fail_article(article, article_retry.PARSE_FAILED, f"Error calling OpenAI parse model for article {article_id}")
         
-        # Try to parse the result as JSON
-        try:
-            summary_data = json.loads(result_parse)
-        except json.JSONDecodeError:
-            summary_data = {"summary": result_parse, "tags": ["cti"], "iocs": iocs_regex}
-        
-        # Ensure IOCs are included
-        if "iocs" not in summary_data:
-            summary_data["iocs"] = iocs_regex
-        
-        # Add the title
-        summary_data["title"] = article.title
-        summary_data["filtered_out"] = False
-        
-        # Save summary to article
-        article.summary = json.dumps(summary_data)
-        article.processed = True
-        db.session.commit()
-        
-        # Format the content for Joplin
-        joplin_content = f"# {summary_data['title']}\n\n"
-        
-        # Add publication date and link near the top
-        if article.published:
-            formatted_date = article.published.strftime('%Y-%m-%d %H:%M UTC')
-            joplin_content += f"*Published on: {formatted_date}*  \n"
-        joplin_content += f"*Source: [{article.url.split('/')[2]}]({article.url})*\n\n"
-        
-        joplin_content += f"## Summary\n{summary_data.get('summary', 'No summary available')}\n\n"
-        joplin_content += f"## Source Details\n[Original Article]({article.url})\n\n"
-        
-        joplin_content += "## IOCs\n"
-        for k, v in summary_data['iocs'].items():
-            if v:  # Only add if there are values
-                joplin_content += f"- {k.upper()}: {', '.join(v)}\n"
-        
-        if summary_data.get("ttp"):
-            joplin_content += f"\n## TTPs\n- {' '.join(summary_data['ttp'])}\n"
-        
-        if summary_data.get("threat_groups"):
-            joplin_content += f"\n## Threat Groups\n- {' '.join(summary_data['threat_groups'])}\n"
-        
-        # Send to Joplin if enabled and configured
-        if settings.joplin_enabled and settings.joplin_api_url and settings.joplin_token:
-            logger.info(f"Sending article {article_id} to Joplin")
-            joplin_response = send_to_joplin(
-                summary_data["title"], 
-                joplin_content, 
-                settings.joplin_api_url, 
-                settings.joplin_token
-            )
-            
-            if joplin_response:
-                article.sent_to_joplin = True
-                if 'id' in joplin_response:
-                    article.joplin_id = joplin_response['id']
-                db.session.commit()
-                logger.info(f"Successfully sent article {article_id} to Joplin")
-        else:
-            if not settings.joplin_enabled:
-                logger.info(f"Joplin integration disabled, skipping send for article {article_id}")
-            else:
-                logger.info(f"Joplin API URL or token not configured, skipping send for article {article_id}")
-        
-        # Mark as processed and reset processing flag
-        article.processed = True
-        article.processing = False
-        db.session.commit()
-        
-        return True
+        return save_parse_result(article, result_parse, settings)
     except Exception as e:
         logger.error(f"Error processing article {article_id}: {str(e)}")
-        # Reset processing flag on error
+        # Schedule the next attempt
         try:
+            db.session.rollback()
             article = Article.query.get(article_id)
             if article:
-                article.processing = False
+                article_retry.record_failure(article, article_retry.EXCEPTION, f"{type(e).__name__}: {str(e)}")
                 db.session.commit()
         except Exception as inner_e:
-            logger.error(f"Error resetting processing flag for article {article_id}: {str(inner_e)}")
+            logger.error(f"Error recording the failure of article {article_id}: {str(inner_e)}")
         return False
 
 def check_feed(feed_id):
@@ -307,165 +494,633 @@ def check_feed(feed_id):
             return False
         
         # Fetch the feed
-        feed_data = fetch_feed(feed.url)
+        started = time.monotonic()
+        feed_data = fetch_feed(feed.url, etag=feed.etag, modified=feed.modified)
+        feed.last_fetch_duration = time.monotonic() - started
         if not feed_data:
             logger.error(f"Could not fetch feed {feed.url}")
+            schedule_next_check(feed)
+            db.session.commit()
             return False
         
+        result = apply_feed_data(feed, feed_data)
+        if result:
+            prefetch_article_content([feed.id])
+        return result
+    except Exception as e:
+        logger.error(f"Error checking feed {feed_id}: {str(e)}")
+        return False
+
+def entry_guid(entry):
+    """Generate a stable GUID based on the entry URL and title"""
+    title = entry.get('title')
+    link = entry.get('link')
+    if not title or not link:
+        return None
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{link}|{title}"))
+
+def entry_timestamp(entry):
+    """Return when an entry was published (or updated) as a naive UTC datetime"""
+    parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+    if not parsed:
+        return None
+    try:
+        return datetime(*parsed[:6])
+    except (TypeError, ValueError):
+        return None
+
+def entries_since_high_water_mark(feed, entries):
+    """Return the entries that are newer than the feed's high-water mark.
+    
+    Feeds are normally ordered newest-first, so we stop at the first entry we
+    have already seen. If the feed is not ordered by date, or the mark has
+    scrolled out of the feed, every entry is returned for a full scan.
+    """
+    timestamps = [entry_timestamp(entry) for entry in entries]
+    ordered = all(ts is not None for ts in timestamps) and \
+        all(newer >= older for newer, older in zip(timestamps, timestamps[1:]))
+    
+    if not ordered:
+        logger.debug(f"Feed {feed.name} is not ordered newest-first, scanning all entries")
+        return entries
+    if not feed.last_entry_guid and not feed.last_entry_published:
+        return entries
+    
+    for index, entry in enumerate(entries):
+        if feed.last_entry_guid and entry_guid(entry) == feed.last_entry_guid:
+            return entries[:index]
+        if feed.last_entry_published and timestamps[index] < feed.last_entry_published:
+            return entries[:index]
+    return entries
+
+def update_high_water_mark(feed, entries):
+    """Remember the newest entry of the feed for the next poll"""
+    dated = [(entry_timestamp(entry), entry) for entry in entries]
+    dated = [(ts, entry) for ts, entry in dated if ts is not None]
+    if dated:
+        newest_ts, newest = max(dated, key=lambda item: item[0])
+    elif entries:
+        newest_ts, newest = None, entries[0]
+    else:
+        return
+    feed.last_entry_guid = entry_guid(newest)
+    feed.last_entry_published = newest_ts
+
+def entry_to_row(entry, feed_id):
+    """Turn a feedparser entry into a dict of Article column values"""
+    guid = entry_guid(entry)
+    if not guid:
+        return None
+    
+    # Parse published date
+    published = None
+    if hasattr(entry, 'published'):
+        try:
+            published = date_parser.parse(entry.published)
+        except:
+            pass
+    
+    # Extract content if available in the feed
+    content = None
+    if hasattr(entry, 'content'):
+        content = entry.content[0].value
+    elif hasattr(entry, 'summary'):
+        content = entry.summary
+    
+    return {
+        'guid': guid,
+        'title': entry.title,
+        'url': entry.link,
+        'content': content,
+        'published': published,
+        'feed_id': feed_id
+    }
+
+def apply_feed_data(feed, feed_data):
+    """Store new articles from already fetched feed data"""
+    try:
         # Update last checked time
         feed.last_checked = datetime.utcnow()
+        
+        # Nothing changed since the last poll, skip the entry loop entirely
+        if feed_data.get('status') == 304:
+            feed.not_modified_count = (feed.not_modified_count or 0) + 1
+            postpone_next_check(feed)
+            db.session.commit()
+            logger.info(f"Feed {feed.name} not modified since last check")
+            return True
+        
+        # Remember the validators for the next conditional GET
+        feed.fetched_count = (feed.fetched_count or 0) + 1
+        feed.etag = feed_data.get('etag')
+        feed.modified = feed_data.get('modified')
         db.session.commit()
         
-        # Process entries
-        new_articles = 0
-        for entry in feed_data.entries:
-            # Generate a stable GUID based on the article URL and title
-            article_guid = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{entry.link}|{entry.title}"))
-            
-            # Check if article already exists by GUID, URL, or title
-            existing = Article.query.filter(
-                (Article.guid == article_guid) |
-                (Article.url == entry.link) | 
-                (Article.title == entry.title)
-            ).first()
-            if existing:
-                logger.debug(f"Skipping duplicate article: {entry.title} (GUID: {article_guid})")
+        # Only look at entries newer than what we saw on the previous poll
+        entries = entries_since_high_water_mark(feed, feed_data.entries)
+        update_high_water_mark(feed, feed_data.entries)
+        logger.debug(f"Feed {feed.name}: {len(entries)} of {len(feed_data.entries)} entries are past the high-water mark")
+        
+        # Build candidate rows, dropping duplicates within the feed itself
+        rows = []
+        seen_guids, seen_urls, seen_titles = set(), set(), set()
+        for entry in entries:
+            row = entry_to_row(entry, feed.id)
+            if not row:
                 continue
-            
-            # Parse published date
-            published = None
-            if hasattr(entry, 'published'):
-                try:
-                    published = date_parser.parse(entry.published)
-                except:
-                    pass
-            
-            # Create new article with the generated GUID
-            article = Article(
-                guid=article_guid,
-                title=entry.title,
-                url=entry.link,
-                published=published,
-                feed_id=feed.id
-            )
-            
-            # Extract content if available in the feed
-            if hasattr(entry, 'content'):
-                article.content = entry.content[0].value
-            elif hasattr(entry, 'summary'):
-                article.content = entry.summary
-            
-            db.session.add(article)
-            new_articles += 1
+            if row['guid'] in seen_guids or row['url'] in seen_urls or row['title'] in seen_titles:
+                continue
+            seen_guids.add(row['guid'])
+            seen_urls.add(row['url'])
+            seen_titles.add(row['title'])
+            rows.append(row)
+        
+        # Resolve articles we already have with a few set-based lookups
+        existing_guids = existing_values(Article.guid, seen_guids)
+        existing_urls = existing_values(Article.url, seen_urls)
+        existing_titles = existing_values(Article.title, seen_titles)
+        new_rows = [
+            row for row in rows
+            if row['guid'] not in existing_guids
+            and row['url'] not in existing_urls
+            and row['title'] not in existing_titles
+        ]
+        logger.debug(f"Skipping {len(rows) - len(new_rows)} duplicate articles from feed {feed.name}")
+        
+        # Insert all new articles in one statement; rows that raced in meanwhile are ignored
+        new_articles = 0
+        if new_rows:
+            result = db.session.execute(insert_ignore(Article.__table__), new_rows)
+            new_articles = result.rowcount if result.rowcount is not None and result.rowcount >= 0 else len(new_rows)
         
+        # Work out when this feed is next due based on its publishing history
+        schedule_next_check(feed)
         db.session.commit()
         logger.info(f"Added {new_articles} new articles from feed {feed.name}")
         return True
     except Exception as e:
-        logger.error(f"Error checking feed {feed_id}: {str(e)}")
+        logger.error(f"Error checking feed {feed.id}: {str(e)}")
+        db.session.rollback()
         return False
 
-def check_all_feeds():
-    """Check all active feeds for new articles"""
-    feeds = Feed.query.filter_by(active=True).all()
+def check_feeds(feeds):
+    """Fetch the given feeds concurrently, then apply the results in one pass.
+    
+    Returns a list of (feed, success, FetchResult) tuples in the order of feeds.
+    """
+    config = current_app.config
+    fetches = fetch_feeds(
+        [(feed.id, feed.url, feed.etag, feed.modified) for feed in feeds],
+        fetch_feed,
+        max_workers=config.get('FEED_FETCH_WORKERS', 16),
+        per_host=config.get('FEED_FETCH_PER_HOST', 2)
+    )
+    log_fetch_timings(fetches)
+    
+    results = []
+    for feed, fetch in zip(feeds, fetches):
+        feed.last_fetch_duration = fetch.elapsed
+        if not fetch.ok:
+            logger.error(f"Could not fetch feed {feed.url}: {fetch.error}")
+            schedule_next_check(feed)
+            db.session.commit()
+            results.append((feed, False, fetch))
+            continue
+        results.append((feed, apply_feed_data(feed, fetch.data), fetch))
+    
+    # Download bodies of the new articles now so the LLM stage never waits on page fetches
+    prefetch_article_content([feed.id for feed, success, _ in results if success])
+    return results
+
+def prefetch_article_content(feed_ids):
+    """Download and extract the content of unprocessed articles that have none yet.
+    
+    Pages are fetched concurrently with a per-domain limit so we stay polite
+    to publishers; the results are then written back in a single bulk update.
+    Articles that fail are left for process_article to retry later.
+    """
+    if not feed_ids:
+        return 0
+    
+    config = current_app.config
+    limit = config.get('PREFETCH_LIMIT', 200)
+    if limit <= 0:
+        return 0
+    
+    pending = db.session.query(Article.id, Article.url) \
+        .filter(Article.feed_id.in_(feed_ids)) \
+        .filter(Article.processed == False) \
+        .filter(Article.content == None) \
+        .filter(Article.content_error == None) \
+        .order_by(Article.id.desc()) \
+        .limit(limit) \
+        .all()
+    if not pending:
+        return 0
+    
+    def _fetch(article):
+        try:
+            return {'id': article.id, 'content': extract_content(article.url)}
+        except ContentRejected as e:
+            logger.info(f"Rejected content of article {article.id} ({article.url}): {e.reason}")
+            return {'id': article.id, 'content_error': e.reason}
+    
+    started = time.monotonic()
+    fetched = run_concurrently(
+        pending,
+        _fetch,
+        url_of=lambda article: article.url,
+        max_workers=config.get('PREFETCH_WORKERS', 8),
+        per_host=config.get('PREFETCH_PER_HOST', 2),
+        name='prefetch'
+    )
+    
+    contents = [row for row in fetched if row.get('content')]
+    rejected = [row for row in fetched if row.get('content_error')]
+    if contents:
+        db.session.execute(update(Article), contents)
+    if rejected:
+        db.session.execute(update(Article), rejected)
+    db.session.commit()
+    logger.info(f"Prefetched content for {len(contents)} of {len(pending)} articles in {time.monotonic() - started:.2f}s"
+                f" ({len(rejected)} rejected)")
+    return len(contents)
+
+def check_all_feeds(due_only=False):
+    """Check all active feeds for new articles.
+    
+    When due_only is set, only feeds whose adaptive next check time has
+    passed (or that have never been scheduled) are polled.
+    """
+    query = Feed.query.filter_by(active=True)
+    if due_only:
+        query = query.filter((Feed.next_check_at == None) | (Feed.next_check_at <= datetime.utcnow()))
+    feeds = query.all()
     logger.info(f"Found {len(feeds)} active feeds to check")
     
     if not feeds:
+        if due_only:
+            logger.info("No feeds are due for a check")
+            return True  # Not an error if nothing is due yet
         logger.warning("No active feeds found to check")
         return False
-        
-    results = []
-    for feed in feeds:
-        logger.info(f"Checking feed {feed.id}: {feed.name}")
-        result = check_feed(feed.id)
-        results.append(result)
+    
+    results = [success for _, success, _ in check_feeds(feeds)]
         
     success_count = results.count(True)
     logger.info(f"Completed checking {len(feeds)} feeds. {success_count} succeeded, {len(feeds) - success_count} failed")
     return any(results)  # Return True if at least one feed check succeeded
 
-def process_pending_articles():
-    """Process all unprocessed articles"""
-    # Create a set to track processed GUIDs in this session
-    processed_guids = set()
+def run_grouped_filter(articles, group_size):
+    """Run the pre-filter and the filter stage ahead of the workers, several articles per request.
+    
+    articles is a list of (id, guid, title) tuples; only those with content
+    are classified. Articles filtered out are marked processed here. Returns
+    a dict of article id -> 'KEEP' or 'DISCARD'.
+    """
+    settings = Settings.query.first()
+    filter_prompt = Prompt.query.filter_by(name='filter_prompt').first()
+    if not settings or not settings.openai_api_key or not filter_prompt:
+        return {}
     
+    ids = [article_id for article_id, _, _ in articles]
+    loaded = []
+    for chunk in chunked(ids):
+        loaded.extend(Article.query
+                      .options(load_only(Article.id, Article.content), lazyload(Article.tags))
+                      .filter(Article.id.in_(chunk), Article.content.isnot(None))
+                      .all())
+    
+    verdicts = {}
+    undecided = []
+    for article in loaded:
+        verdict = prefilter.classify(article)
+        if verdict == prefilter.DISCARD:
+            mark_filtered_out(article, PREFILTER_REASON, filtered_by="prefilter")
+            verdicts[article.id] = 'DISCARD'
+        elif verdict == prefilter.KEEP:
+            verdicts[article.id] = 'KEEP'
+        else:
+            undecided.append(article)
+    db.session.commit()
+    
+    model_verdicts = filter_articles_grouped(undecided, filter_prompt, settings.openai_api_key, group_size)
+    for article in undecided:
+        if model_verdicts.get(article.id) == 'DISCARD':
+            mark_filtered_out(article)
+    db.session.commit()
+    verdicts.update(model_verdicts)
+    return verdicts
+
+def run_article_workers(articles, filter_verdicts=None, stop=None):
+    """Process articles on a bounded pool of worker threads.
+    
+    articles is a list of (id, guid, title) tuples whose job leases the
+    caller holds. Each worker gets its own app context (and so its own
+    database session); the per-model rate limiters in call_openai keep the
+    pool within the API budgets. Once the stop event is set, articles not
+    started yet are skipped (their result is None) and in-flight ones finish.
+    """
+    app = current_app._get_current_object()
+    workers = max(1, min(app.config.get('LLM_WORKERS', 4), len(articles) or 1))
+    
+    def _process(article):
+        article_id, guid, title = article
+        if stop is not None and stop.is_set():
+            return None
+        with app.app_context():
+            logger.info(f"Processing article {article_id} (GUID: {guid}): {title}")
+            try:
+                return process_article(article_id, claimed=True,
+                                       filter_verdict=(filter_verdicts or {}).get(article_id))
+            finally:
+                db.session.remove()
+    
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='llm-worker') as executor:
+        return list(executor.map(_process, articles))
+
+def run_cached_batch(client, prompt, prompt_text, articles, make_input, build_messages, poll_interval, timeout, stage):
+    """Answer what the response cache already knows and submit the rest as one batch.
+    
+    make_input packs an article's content for the stage and build_messages
+    turns its text into the request messages. Returns the answers by article id;
+    articles the batch failed on are left out. Token counts reported by the
+    batch are recorded in the usage table.
+    """
+    inputs = {article.id: make_input(article.content) for article in articles}
+    answers = {}
+    to_submit = []
+    for article in articles:
+        cached = llm_cache.lookup(prompt.model, prompt_text, inputs[article.id].text)
+        if cached is not None:
+            answers[article.id] = cached
+            usage.record(prompt.model, stage, cache_hit=True, article_ids=[article.id])
+        else:
+            to_submit.append(article)
+    if answers:
+        logger.info(f"{len(answers)} {prompt.name} answers served from the LLM cache")
+    
+    requests = []
+    for article in to_submit:
+        messages = build_messages(inputs[article.id].text)
+        response_format = structured_output.response_format(prompt.model, messages) if stage == llm_client.PARSE else None
+        requests.append(make_request(f"{prompt.name}-{article.id}", prompt.model, messages, response_format=response_format))
+    prompt_budget.record_sent(*[inputs[article.id] for article in to_submit])
+    batch_usage = {}
+    batch_answers = run_batch(client, requests, poll_interval=poll_interval, timeout=timeout, usage=batch_usage)
+    
+    for article in to_submit:
+        custom_id = f"{prompt.name}-{article.id}"
+        if custom_id in batch_usage:
+            prompt_tokens, completion_tokens = batch_usage[custom_id]
+            usage.record(prompt.model, stage, prompt_tokens, completion_tokens, article_ids=[article.id])
+        answer = batch_answers.get(custom_id)
+        if answer:
+            llm_cache.store(prompt.name, prompt.model, prompt_text, inputs[article.id].text, answer)
+            answers[article.id] = answer
+    return answers
+
+def process_articles_batch(articles, client=None):
+    """Run the filter and parse stages for many articles as two Batch API jobs.
+    
+    articles is a list of (id, guid, title) tuples. All filter requests go out
+    as one batch; the KEEP set then goes out as a second batch for parsing.
+    Articles without extracted content are handed to the regular workers.
+    client defaults to the OpenAI Batch API and can be swapped for a
+    LocalBatchClient to run offline.
+    """
+    settings = Settings.query.first()
+    filter_prompt = Prompt.query.filter_by(name='filter_prompt').first()
+    parse_prompt = Prompt.query.filter_by(name='parse_prompt').first()
+    if not settings or not settings.openai_api_key or not filter_prompt or not parse_prompt:
+        logger.error("OpenAI API key or prompts not configured")
+        return [False] * len(articles)
+    
+    config = current_app.config
+    poll_interval = config.get('BATCH_POLL_INTERVAL', 30)
+    timeout = config.get('BATCH_TIMEOUT', 24 * 3600)
+    if client is None:
+        client = OpenAIBatchClient(settings.openai_api_key)
+    
+    ids = [article_id for article_id, _, _ in articles]
+    # What the stages and save_parse_result read; anything else loads on first use
+    by_id = {}
+    for chunk in chunked(ids):
+        by_id.update((article.id, article) for article in Article.query
+                     .options(load_only(Article.id, Article.title, Article.url, Article.published,
+                                        Article.content, Article.attempts),
+                              lazyload(Article.tags))
+                     .filter(Article.id.in_(chunk))
+                     .all())
+    ready = [by_id[article_id] for article_id in ids if article_id in by_id and by_id[article_id].content]
+    ready_ids = {article.id for article in ready}
+    results = {}
+    
+    # Clear keeps and clear rejects are decided locally and never enter the filter batch
+    keep = []
+    undecided = []
+    for article in ready:
+        verdict = prefilter.classify(article)
+        if verdict == prefilter.KEEP:
+            keep.append(article)
+        elif verdict == prefilter.DISCARD:
+            mark_filtered_out(article, PREFILTER_REASON, filtered_by="prefilter")
+            results[article.id] = True
+        else:
+            undecided.append(article)
+    db.session.commit()
+    
+    # FIRST STAGE: one batch of KEEP/DISCARD requests
+    answers = run_cached_batch(client, filter_prompt, filter_prompt_text(), undecided,
+                               lambda content: filter_input(filter_prompt, content), build_filter_messages,
+                               poll_interval, timeout, llm_client.FILTER)
+    
+    for article in undecided:
+        answer = answers.get(article.id)
+        if not answer:
+            # Leave it for a later run
+            article_retry.record_failure(article, article_retry.BATCH_FAILED, "No answer from the filter batch")
+            results[article.id] = False
+        elif filter_says_keep(answer):
+            keep.append(article)
+        else:
+            mark_filtered_out(article)
+            results[article.id] = True
+    db.session.commit()
+    logger.info(f"Batch filter: {len(keep)} kept, {list(results.values()).count(True)} filtered out, {list(results.values()).count(False)} unanswered")
+    
+    # SECOND STAGE: one batch of detailed parse requests for the KEEP set
+    answers = run_cached_batch(client, parse_prompt, parse_prompt_text(parse_prompt), keep,
+                               lambda content: parse_input(parse_prompt, content),
+                               lambda article_text: build_parse_messages(parse_prompt, article_text),
+                               poll_interval, timeout, llm_client.PARSE)
+    
+    for article in keep:
+        answer = answers.get(article.id)
+        if not answer:
+            article_retry.record_failure(article, article_retry.BATCH_FAILED, "No answer from the parse batch")
+            db.session.commit()
+            results[article.id] = False
+            continue
+        try:
+            results[article.id] = save_parse_result(article, answer, settings)
+        except Exception as e:
+            logger.error(f"Error saving batch result for article {article.id}: {str(e)}")
+            db.session.rollback()
+            article_retry.record_failure(article, article_retry.EXCEPTION, f"{type(e).__name__}: {str(e)}")
+            db.session.commit()
+            results[article.id] = False
+    
+    # Articles whose content still has to be downloaded go through the regular path
+    remaining = [article for article in articles if article[0] not in ready_ids]
+    if remaining:
+        logger.info(f"Processing {len(remaining)} articles without extracted content individually")
+        results.update(zip([article[0] for article in remaining], run_article_workers(remaining)))
+    
+    return [results.get(article_id, False) for article_id in ids]
+
+def process_pending_articles(use_batch=False, batch_client=None, stop=None):
+    """Process all unprocessed articles.
+    
+    Due articles are queued as jobs, then claimed in batches of
+    JOB_CLAIM_BATCH under a lease that a heartbeat keeps extending, so any
+    number of workers (threads, processes or hosts) can run this at once
+    without two of them paying for the same article. Leases of a worker
+    that died expire and are reclaimed by the next one.
+    
+    With use_batch the LLM stages are submitted through the Batch API
+    (see process_articles_batch), which is cheaper but can take hours;
+    everything queued is then claimed as one batch.
+    
+    Memory stays flat however large the article table grows: duplicates
+    and articles past the age limit are settled in SQL, and only one
+    claimed batch of articles is loaded at a time.
+    
+    Setting the stop event drains the run: no more batches are claimed,
+    articles already sent to the model are finished, and the jobs of the
+    rest are released for other workers.
+    """
     # Get max article age setting
     settings = Settings.query.first()
     max_article_age = settings.max_article_age if settings else 0
     
+    app = current_app._get_current_object()
+    worker = job_queue.new_worker_id()
+    
     try:
-        # First, get all previously processed GUIDs without locking
-        processed_articles = Article.query.filter_by(processed=True).all()
-        for processed_article in processed_articles:
-            processed_guids.add(processed_article.guid)
+        # Settle duplicates and articles past the age limit in SQL, without loading any rows
+        skip_duplicate_and_old_articles(max_article_age)
         
-        logger.info(f"Found {len(processed_guids)} previously processed article GUIDs")
+        # Queue the unprocessed articles that are due (not backing off after a failure, not dead-lettered)
+        queued = job_queue.enqueue_due()
+        if queued:
+            logger.info(f"Queued {queued} new article jobs")
         
-        # Get all unprocessed articles with row locking to prevent concurrent processing
-        articles = Article.query.filter_by(processed=False).with_for_update().all()
-        logger.info(f"Found {len(articles)} unprocessed articles")
+        results = []
+        with job_queue.Heartbeat(app, worker):
+            while stop is None or not stop.is_set():
+                claimed = job_queue.claim(worker, None if use_batch else job_queue.claim_batch())
+                if not claimed:
+                    break
+                logger.info(f"Worker {worker} claimed {len(claimed)} articles")
+                try:
+                    results += process_claimed_articles(claimed, use_batch, batch_client, stop)
+                finally:
+                    db.session.rollback()
+                    job_queue.release(claimed, worker)
         
-        if not articles:
+        skipped = results.count(None)
+        if skipped:
+            logger.info(f"Stopping: released {skipped} claimed articles that were not started")
+            results = [result for result in results if result is not None]
+        
+        if not results:
             logger.info("No pending articles to process")
             return True  # Not an error if there's nothing to process
         
-        # Mark all articles as being processed to prevent other processes from picking them up
-        current_time = datetime.utcnow()
-        for article in articles:
-            article.processing = True
-            article.processing_started = current_time
-        
-        # Commit the processing flag changes
-        db.session.commit()
-        
-        # Filter out any duplicate articles based on GUID and respect max_article_age setting
-        unique_articles = []
-        duplicate_count = 0
-        skipped_age_count = 0
-        current_time = datetime.utcnow()
-        
-        for article in articles:
-            # Skip if article is a duplicate
-            if article.guid in processed_guids:
-                duplicate_count += 1
-                logger.warning(f"Skipping duplicate article with GUID {article.guid}: {article.title}")
-                article.processed = True
-                continue
-                
-            # Skip if article is too old (when max_article_age > 0)
-            if max_article_age > 0 and article.published:
-                article_age_days = (current_time - article.published).days
-                if article_age_days > max_article_age:
-                    skipped_age_count += 1
-                    logger.info(f"Skipping article {article.id} due to age: {article_age_days} days old (max: {max_article_age} days): {article.title}")
-                    article.processed = True
-                    continue
-            
-            # Article passed all filters, add it to processing list
-            unique_articles.append(article)
-            processed_guids.add(article.guid)
-        
-        # Commit any changes to mark duplicates and age-filtered articles as processed
-        if duplicate_count > 0 or skipped_age_count > 0:
-            db.session.commit()
-            if duplicate_count > 0:
-                logger.info(f"Marked {duplicate_count} duplicate articles as processed")
-            if skipped_age_count > 0:
-                logger.info(f"Marked {skipped_age_count} articles as processed due to age limit ({max_article_age} days)")
-        
-        logger.info(f"Processing {len(unique_articles)} unique articles after filtering duplicates")
-        
-        results = []
-        for article in unique_articles:
-            logger.info(f"Processing article {article.id} (GUID: {article.guid}): {article.title}")
-            result = process_article(article.id, skip_processing_check=True)
-            results.append(result)
-        
         success_count = results.count(True)
-        logger.info(f"Completed processing {len(unique_articles)} articles. {success_count} succeeded, {len(unique_articles) - success_count} failed")
+        logger.info(f"Completed processing {len(results)} articles. {success_count} succeeded, {len(results) - success_count} failed")
         return any(results)  # Return True if at least one article was processed successfully
     except Exception as e:
         logger.error(f"Error during article processing: {str(e)}")
         # Make sure to roll back any pending changes if there's an error
         db.session.rollback()
         return False
+
+def skip_duplicate_and_old_articles(max_article_age):
+    """Mark due articles that need no model call as processed, with two UPDATE statements.
+    
+    Duplicates are pending articles whose GUID is already processed under
+    another row; old articles were published more than max_article_age
+    days ago (0 = no limit). Returns (duplicates, too_old).
+    """
+    pending = (Article.processed == False) & article_retry.due()
+    processed_twin = aliased(Article)
+    duplicate = (select(processed_twin.id)
+                 .where(processed_twin.guid == Article.guid, processed_twin.processed == True,
+                        processed_twin.id != Article.id)
+                 .exists())
+    duplicates = db.session.execute(
+        update(Article).where(pending, duplicate).values(processed=True),
+        execution_options={'synchronize_session': False}
+    ).rowcount
+    
+    too_old = 0
+    if max_article_age > 0:
+        # Whole days of age, as before: more than max_article_age days means at least one more day
+        cutoff = datetime.utcnow() - timedelta(days=max_article_age + 1)
+        too_old = db.session.execute(
+            update(Article).where(pending, Article.published.isnot(None), Article.published <= cutoff).values(processed=True),
+            execution_options={'synchronize_session': False}
+        ).rowcount
+    db.session.commit()
+    
+    if duplicates > 0:
+        logger.info(f"Marked {duplicates} duplicate articles as processed")
+    if too_old > 0:
+        logger.info(f"Marked {too_old} articles as processed due to age limit ({max_article_age} days)")
+    return duplicates, too_old
+
+def process_claimed_articles(article_ids, use_batch=False, batch_client=None, stop=None):
+    """Run the LLM stages for articles whose jobs this worker holds; returns one result per article (None if skipped on stop)"""
+    # Only what near-duplicate detection needs; the workers load each article in full themselves
+    articles = []
+    for chunk in chunked(article_ids):
+        articles.extend(Article.query
+                        .options(load_only(Article.id, Article.guid, Article.title, Article.content,
+                                           Article.content_signature, Article.canonical_id),
+                                 lazyload(Article.tags))
+                        .filter(Article.id.in_(chunk), Article.processed == False)
+                        .all())
+    
+    logger.info(f"Processing {len(articles)} claimed articles")
+    
+    # Sign the articles we already have content for, so near-duplicates wait for their original
+    # and then reuse its result instead of going through the LLM stages themselves
+    originals = []
+    duplicates = []
+    for article in articles:
+        if near_dup.index_article(article):
+            duplicates.append((article.id, article.guid, article.title))
+        else:
+            originals.append((article.id, article.guid, article.title))
+    db.session.commit()
+    if duplicates:
+        logger.info(f"Found {len(duplicates)} near-duplicate articles, processing them after their originals")
+    
+    group_size = current_app.config.get('FILTER_GROUP_SIZE', 1)
+    if use_batch:
+        results = process_articles_batch(originals, client=batch_client)
+    elif group_size > 1:
+        # Classify several articles per filter request, then parse the kept ones on the workers
+        verdicts = run_grouped_filter(originals, group_size)
+        discarded = [article for article in originals if verdicts.get(article[0]) == 'DISCARD']
+        results = [True] * len(discarded)
+        results += run_article_workers([article for article in originals if verdicts.get(article[0]) != 'DISCARD'], verdicts, stop)
+    else:
+        results = run_article_workers(originals, stop=stop)
+    avoided_before = near_dup.calls_avoided()
+    results += run_article_workers(duplicates, stop=stop)
+    if duplicates:
+        logger.info(f"Near-duplicate detection avoided {near_dup.calls_avoided() - avoided_before} LLM calls")
+    return results
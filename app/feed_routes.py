@@ -2,8 +2,8 @@ import json
 from datetime import datetime, timedelta
 from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, current_app
 from app.models import Feed, Article, Settings, Tag
-from app import db
-from app.feed_processor import check_feed, process_article
+from app import article_retry, db
+from app.feed_processor import check_feed, check_feeds, process_article
 from app.scheduler import update_feed_check_interval
 from datetime import datetime
 import json
@@ -83,13 +83,14 @@ def check_feed_now(feed_id):
 def check_all_feeds():
     """Check all active feeds immediately"""
     feeds = Feed.query.filter_by(active=True).all()
-    success = 0
-    
-    for feed in feeds:
-        if check_feed(feed.id):
-            success += 1
+    results = check_feeds(feeds)
+    success = sum(1 for _, ok, _ in results if ok)
     
-    flash(f'Checked {success} out of {len(feeds)} feeds', 'success')
+    message = f'Checked {success} out of {len(feeds)} feeds'
+    if results:
+        slowest = max(results, key=lambda result: result[2].elapsed)
+        message += f' (slowest: {slowest[0].name}, {slowest[2].elapsed:.1f}s)'
+    flash(message, 'success')
     return redirect(url_for('feeds.feed_list'))
 
 @feeds.route('/feeds/update_interval', methods=['POST'])
@@ -152,6 +153,10 @@ def article_list():
         query = query.filter(Article.processed == True)
     elif processed == 'no':
         query = query.filter(Article.processed == False)
+    elif processed == 'retrying':
+        query = query.filter(Article.processed == False, Article.dead_lettered_at.is_(None), Article.attempts > 0)
+    elif processed == 'dead':
+        query = query.filter(Article.processed == False, Article.dead_lettered_at.isnot(None))
     
     if sent_to_joplin == 'yes':
         query = query.filter(Article.sent_to_joplin == True)
@@ -207,10 +212,13 @@ def article_list():
         tag.article_count = Article.query.filter(Article.tags.any(Tag.id == tag.id)).count()
         tags.append(tag)
     
+    dead_letter_count = Article.query.filter(Article.processed == False, Article.dead_lettered_at.isnot(None)).count()
+    
     # Render template with articles and filter values
     return render_template(
         'articles.html',
         articles=articles,
+        dead_letter_count=dead_letter_count,
         feeds=feeds,
         tags=tags,
         current_feed_id=int(feed_id) if feed_id.isdigit() else None,
@@ -254,13 +262,65 @@ def process_article_now(article_id):
 
 @feeds.route('/articles/process_pending', methods=['POST'])
 def process_pending():
-    """Process all pending articles"""
-    articles = Article.query.filter_by(processed=False).all()
+    """Process all pending articles that are due (not backing off or dead-lettered)"""
+    article_ids = [article_id for (article_id,) in
+                   db.session.query(Article.id).filter(Article.processed == False, article_retry.due())]
     success = 0
     
-    for article in articles:
-        if process_article(article.id):
+    for article_id in article_ids:
+        if process_article(article_id):
             success += 1
     
-    flash(f'Processed {success} out of {len(articles)} articles', 'success')
+    flash(f'Processed {success} out of {len(article_ids)} articles', 'success')
     return redirect(url_for('feeds.article_list'))
+
+@feeds.route('/articles/<int:article_id>/requeue', methods=['POST'])
+def requeue_article(article_id):
+    """Give a failed or dead-lettered article a fresh set of attempts"""
+    article = Article.query.get_or_404(article_id)
+    article_retry.requeue(article)
+    db.session.commit()
+    flash('Article requeued, it will be processed in the next run', 'success')
+    return redirect(request.referrer or url_for('feeds.article_detail', article_id=article_id))
+
+@feeds.route('/articles/requeue_dead', methods=['POST'])
+def requeue_dead_articles():
+    """Requeue every article in the dead-letter queue"""
+    articles = Article.query.filter(Article.processed == False, Article.dead_lettered_at.isnot(None)).all()
+    for article in articles:
+        article_retry.requeue(article)
+    db.session.commit()
+    flash(f'Requeued {len(articles)} dead-lettered articles', 'success')
+    return redirect(url_for('feeds.article_list'))
+
+def article_retry_state(article):
+    return {
+        'id': article.id,
+        'title': article.title,
+        'url': article.url,
+        'feed_id': article.feed_id,
+        'attempts': article.attempts or 0,
+        'error_class': article.error_class,
+        'last_error': article.last_error,
+        'next_attempt_at': article.next_attempt_at.isoformat() if article.next_attempt_at else None,
+        'dead_lettered_at': article.dead_lettered_at.isoformat() if article.dead_lettered_at else None,
+    }
+
+@feeds.route('/api/articles/dead-letter', methods=['GET'])
+def api_dead_letter():
+    """Return the articles in the dead-letter queue as JSON"""
+    articles = (Article.query
+                .filter(Article.processed == False, Article.dead_lettered_at.isnot(None))
+                .order_by(Article.dead_lettered_at.desc())
+                .all())
+    return jsonify([article_retry_state(article) for article in articles])
+
+@feeds.route('/api/articles/<int:article_id>/requeue', methods=['POST'])
+def api_requeue_article(article_id):
+    """Requeue a failed or dead-lettered article via AJAX"""
+    article = Article.query.get_or_404(article_id)
+    if article.processed:
+        return jsonify({'status': 'error', 'message': 'Article is already processed'}), 400
+    article_retry.requeue(article)
+    db.session.commit()
+    return jsonify({'status': 'success', 'article': article_retry_state(article)})
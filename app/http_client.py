@@ -0,0 +1,247 @@
+import re
+import codecs
+import random
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'CTI-Monitor/1.0 (+https://github.com/zero0byte/cti_rss_monitor)'
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Defaults, overridden from the app config by init_app
+_config = {
+    'connect_timeout': 5.0,
+    'read_timeout': 20.0,
+    'pool_size': 10,
+    'host_pool_sizes': {},
+    'retries': 3,
+    'backoff': 0.5,
+    'max_download_bytes': 5 * 1024 * 1024,
+    'html_content_types': ('text/html', 'application/xhtml+xml'),
+}
+
+# Size of each streamed chunk; charset detection only ever looks at the first one
+CHUNK_SIZE = 64 * 1024
+
+META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([a-zA-Z0-9_\-]+)', re.IGNORECASE)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class ContentRejected(Exception):
+    """Raised when a download is refused because of its size or content type"""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Download:
+    """Body of a bounded download plus the charset detected from its first chunk"""
+
+    def __init__(self, url, status_code, content, encoding=None, content_type=None):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding
+        self.content_type = content_type
+
+
+class JitteredRetry(Retry):
+    """Retry with exponential backoff plus random jitter so clients don't retry in lockstep"""
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return 0
+        return backoff + random.uniform(0, backoff)
+
+
+def parse_host_pool_sizes(value):
+    """Parse 'host=size,host=size' into a dict"""
+    sizes = {}
+    for item in (value or '').split(','):
+        host, _, size = item.strip().partition('=')
+        if host and size.strip().isdigit():
+            sizes[host.strip().lower()] = int(size)
+    return sizes
+
+
+def init_app(app):
+    """Configure the shared session from the Flask app config"""
+    global _session
+    config = app.config
+    _config.update({
+        'connect_timeout': config.get('HTTP_CONNECT_TIMEOUT', _config['connect_timeout']),
+        'read_timeout': config.get('HTTP_READ_TIMEOUT', _config['read_timeout']),
+        'pool_size': config.get('HTTP_POOL_SIZE', _config['pool_size']),
+        'host_pool_sizes': parse_host_pool_sizes(config.get('HTTP_HOST_POOL_SIZES', '')),
+        'retries': config.get('HTTP_RETRIES', _config['retries']),
+        'backoff': config.get('HTTP_BACKOFF', _config['backoff']),
+        'max_download_bytes': config.get('EXTRACT_MAX_BYTES', _config['max_download_bytes']),
+        'html_content_types': tuple(
+            t.strip().lower() for t in config.get('EXTRACT_CONTENT_TYPES', ','.join(_config['html_content_types'])).split(',')
+            if t.strip()
+        ),
+    })
+    # Rebuild the session on next use so the new settings apply
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def _make_adapter(pool_size):
+    retry = JitteredRetry(
+        total=_config['retries'],
+        connect=_config['retries'],
+        read=_config['retries'],
+        status=_config['retries'],
+        status_forcelist=RETRY_STATUSES,
+        backoff_factor=_config['backoff'],
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    return HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+
+def get_session():
+    """Return the process-wide keep-alive session, creating it on first use"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.headers['User-Agent'] = USER_AGENT
+                default_adapter = _make_adapter(_config['pool_size'])
+                session.mount('http://', default_adapter)
+                session.mount('https://', default_adapter)
+                # Hosts we talk to a lot (or must go easy on) get their own pool size
+                for host, size in _config['host_pool_sizes'].items():
+                    adapter = _make_adapter(size)
+                    session.mount(f'http://{host}', adapter)
+                    session.mount(f'https://{host}', adapter)
+                _session = session
+    return _session
+
+
+def default_timeout():
+    return (_config['connect_timeout'], _config['read_timeout'])
+
+
+def request(method, url, **kwargs):
+    """Send a request through the shared session with the configured timeouts"""
+    kwargs.setdefault('timeout', default_timeout())
+    return get_session().request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+def detect_charset(content_type, first_chunk):
+    """Work out a document's charset from its Content-Type header or the first chunk of the body"""
+    _, _, params = (content_type or '').partition(';')
+    for param in params.split(';'):
+        name, _, value = param.strip().partition('=')
+        if name.lower() == 'charset' and value:
+            return value.strip('"\' ').lower()
+
+    match = META_CHARSET.search(first_chunk)
+    if match:
+        return match.group(1).decode('ascii', 'ignore').lower()
+
+    # Most undeclared pages are UTF-8; the chunk may end mid-character, so decode incrementally
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(first_chunk, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    try:
+        from charset_normalizer import from_bytes
+        best = from_bytes(first_chunk).best()
+        return best.encoding if best else None
+    except ImportError:
+        return None
+
+
+def download(url, max_bytes=None, content_types=None, **kwargs):
+    """Stream a document with a size cap and a content-type check.
+
+    Raises ContentRejected when the server declares or sends more than
+    max_bytes, or a content type outside content_types. Non-200 responses
+    are returned with empty content so callers can treat them as transient.
+    """
+    max_bytes = max_bytes or _config['max_download_bytes']
+    content_types = content_types or _config['html_content_types']
+
+    with request('GET', url, stream=True, **kwargs) as response:
+        content_type = response.headers.get('Content-Type', '')
+        if response.status_code != 200:
+            return Download(url, response.status_code, b'', content_type=content_type)
+
+        # Reject obvious non-HTML (PDFs, video, archives) before reading the body
+        mime = content_type.split(';')[0].strip().lower()
+        if mime and mime not in content_types:
+            raise ContentRejected(f"content type {mime}")
+
+        declared = response.headers.get('Content-Length', '')
+        if declared.isdigit() and int(declared) > max_bytes:
+            raise ContentRejected(f"too large ({declared} bytes, limit {max_bytes})")
+
+        chunks = []
+        received = 0
+        encoding = None
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            if not chunk:
+                continue
+            if not chunks:
+                encoding = detect_charset(content_type, chunk)
+            received += len(chunk)
+            if received > max_bytes:
+                raise ContentRejected(f"too large (over {max_bytes} bytes)")
+            chunks.append(chunk)
+
+        return Download(url, response.status_code, b''.join(chunks), encoding=encoding, content_type=content_type)
+
+
+def pool_stats():
+    """Return connection pool hit/miss statistics per host.
+
+    A miss is a request that had to open a new connection; every other
+    request (a hit) reused a kept-alive connection from the pool.
+    """
+    stats = {}
+    session = _session
+    if session is None:
+        return stats
+
+    adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+    for adapter in adapters.values():
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = f"{pool.scheme}://{pool.host}:{pool.port}"
+            entry = stats.setdefault(host, {'requests': 0, 'misses': 0})
+            entry['requests'] += pool.num_requests
+            entry['misses'] += pool.num_connections
+
+    for entry in stats.values():
+        entry['hits'] = max(0, entry['requests'] - entry['misses'])
+        entry['hit_rate'] = round(entry['hits'] / entry['requests'], 3) if entry['requests'] else 0.0
+    return stats
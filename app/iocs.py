@@ -0,0 +1,11 @@
+import re
+
+
+def regex_extract_iocs(text):
+    """Extract IOCs using regex patterns"""
+    md5 = re.findall(r"\b[a-fA-F0-9]{32}\b", text)
+    sha1 = re.findall(r"\b[a-fA-F0-9]{40}\b", text)
+    sha256 = re.findall(r"\b[a-fA-F0-9]{64}\b", text)
+    ips = re.findall(r"\b(?:\d{1,3}\.){3}\d{1,3}\b", text)
+    domains = re.findall(r"\b[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b", text)
+    return {"md5": md5, "sha1": sha1, "sha256": sha256, "ips": ips, "domains": domains}
@@ -0,0 +1,206 @@
+import os
+import uuid
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, literal, or_, select, update
+from app import article_retry, db
+from app.db_utils import chunked, insert_ignore
+from app.models import Article, ArticleJob
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Defaults, overridden from the app config by init_app
+_config = {
+    'lease': 300,  # Seconds a claim is valid without a heartbeat
+    'heartbeat_interval': 60,
+    'claim_batch': 100,  # Jobs claimed at once by process_pending_articles
+}
+
+_counters = {'enqueued': 0, 'claimed': 0, 'reclaimed': 0, 'released': 0, 'lost_leases': 0, 'heartbeats': 0}
+_counters_lock = threading.Lock()
+
+
+def init_app(app):
+    """Configure leases and claim sizes from the Flask app config"""
+    config = app.config
+    _config.update({
+        'lease': config.get('JOB_LEASE_SECONDS', _config['lease']),
+        'heartbeat_interval': config.get('JOB_HEARTBEAT_INTERVAL', _config['heartbeat_interval']),
+        'claim_batch': config.get('JOB_CLAIM_BATCH', _config['claim_batch']),
+    })
+
+
+def claim_batch():
+    return _config['claim_batch']
+
+
+def _count(**increments):
+    with _counters_lock:
+        for key, value in increments.items():
+            _counters[key] += value
+
+
+def new_worker_id():
+    """Name a worker uniquely across hosts and processes; stored in ArticleJob.locked_by"""
+    return f"{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _claimable(now):
+    """Jobs nobody holds, or whose holder stopped heartbeating"""
+    return or_(ArticleJob.locked_until.is_(None), ArticleJob.locked_until < now)
+
+
+def _lease(worker, now):
+    return {
+        'locked_by': worker,
+        'locked_until': now + timedelta(seconds=_config['lease']),
+        'heartbeat_at': now,
+        'claims': ArticleJob.claims + 1,
+    }
+
+
+def enqueue_due(now=None):
+    """Add a job for every unprocessed article that is due and has none yet; returns the jobs added"""
+    now = now or datetime.utcnow()
+    pending = (select(Article.id, literal(0), literal(now))
+               .where(Article.processed == False, article_retry.due(now),
+                      ~select(ArticleJob.id).where(ArticleJob.article_id == Article.id).exists()))
+    # Jobs that raced in from another worker meanwhile are ignored
+    statement = insert_ignore(ArticleJob.__table__).from_select(['article_id', 'claims', 'created_at'], pending)
+    with db.engine.begin() as connection:
+        result = connection.execute(statement)
+    added = max(result.rowcount or 0, 0)
+    _count(enqueued=added)
+    return added
+
+
+def claim(worker, limit=None, now=None):
+    """Lease up to limit claimable jobs to worker in one statement; returns their article ids.
+
+    Where the database supports it this is a single UPDATE ... RETURNING, so
+    two workers never get the same job; the claimable check is repeated in
+    the outer WHERE so a job taken between the subquery and the update is
+    skipped rather than stolen. Expired leases are reclaimed the same way.
+    """
+    now = now or datetime.utcnow()
+    candidates = select(ArticleJob.id).where(_claimable(now)).order_by(ArticleJob.id)
+    if limit:
+        candidates = candidates.limit(limit)
+    # Rendered as FOR UPDATE SKIP LOCKED where supported, ignored on SQLite (whose writes are serialised)
+    candidates = candidates.with_for_update(skip_locked=True)
+
+    with db.engine.begin() as connection:
+        if db.engine.dialect.update_returning:
+            rows = connection.execute(
+                update(ArticleJob)
+                .where(ArticleJob.id.in_(candidates), _claimable(now))
+                .values(**_lease(worker, now))
+                .returning(ArticleJob.article_id, ArticleJob.claims)
+            ).all()
+        else:
+            # No RETURNING (e.g. MySQL): pick candidates, then tag them with our worker id and read them back
+            ids = connection.execute(candidates).scalars().all()
+            rows = []
+            for chunk in chunked(ids):
+                connection.execute(update(ArticleJob)
+                                   .where(ArticleJob.id.in_(chunk), _claimable(now))
+                                   .values(**_lease(worker, now)))
+                rows.extend(connection.execute(
+                    select(ArticleJob.article_id, ArticleJob.claims)
+                    .where(ArticleJob.id.in_(chunk), ArticleJob.locked_by == worker)
+                ).all())
+
+    reclaimed = sum(1 for _, claims in rows if claims > 1)
+    _count(claimed=len(rows), reclaimed=reclaimed)
+    if reclaimed:
+        logger.warning(f"Worker {worker} reclaimed {reclaimed} jobs whose lease had expired")
+    return [article_id for article_id, _ in rows]
+
+
+def claim_article(article_id, worker, now=None):
+    """Lease one article's job to worker, creating the job if needed; False if another worker holds it"""
+    now = now or datetime.utcnow()
+    with db.engine.begin() as connection:
+        connection.execute(insert_ignore(ArticleJob.__table__),
+                           [{'article_id': article_id, 'claims': 0, 'created_at': now}])
+        result = connection.execute(update(ArticleJob)
+                                    .where(ArticleJob.article_id == article_id, _claimable(now))
+                                    .values(**_lease(worker, now)))
+    claimed = result.rowcount == 1
+    if claimed:
+        _count(claimed=1)
+    return claimed
+
+
+def extend(worker, now=None):
+    """Push back the expiry of every lease worker holds; returns the leases extended"""
+    now = now or datetime.utcnow()
+    with db.engine.begin() as connection:
+        result = connection.execute(update(ArticleJob)
+                                    .where(ArticleJob.locked_by == worker)
+                                    .values(locked_until=now + timedelta(seconds=_config['lease']), heartbeat_at=now))
+    _count(heartbeats=1)
+    return max(result.rowcount or 0, 0)
+
+
+def release(article_ids, worker):
+    """Drop finished jobs held by worker; returns the jobs released.
+
+    A job whose lease was lost to another worker is left to that worker.
+    The article's own state (processed, or its retry schedule) decides
+    whether it is enqueued again.
+    """
+    article_ids = list(article_ids)
+    released = 0
+    with db.engine.begin() as connection:
+        for chunk in chunked(article_ids):
+            result = connection.execute(delete(ArticleJob)
+                                        .where(ArticleJob.article_id.in_(chunk), ArticleJob.locked_by == worker))
+            released += max(result.rowcount or 0, 0)
+    lost = len(article_ids) - released
+    _count(released=released, lost_leases=lost)
+    if lost:
+        logger.warning(f"Worker {worker} lost the lease on {lost} jobs before finishing them")
+    return released
+
+
+class Heartbeat:
+    """Extend a worker's leases from a background thread while the block runs"""
+
+    def __init__(self, app, worker, interval=None):
+        self.app = app
+        self.worker = worker
+        self.interval = interval or _config['heartbeat_interval']
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='job-heartbeat', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self.app.app_context():
+                try:
+                    extend(self.worker)
+                except Exception as e:
+                    logger.warning(f"Could not extend the leases of worker {self.worker}: {str(e)}")
+
+
+def stats():
+    with _counters_lock:
+        counters = dict(_counters)
+    now = datetime.utcnow()
+    counters['queued'] = db.session.query(func.count(ArticleJob.id)).filter(ArticleJob.locked_until.is_(None)).scalar()
+    counters['leased'] = db.session.query(func.count(ArticleJob.id)).filter(ArticleJob.locked_until >= now).scalar()
+    counters['expired'] = db.session.query(func.count(ArticleJob.id)).filter(ArticleJob.locked_until < now).scalar()
+    counters['lease_seconds'] = _config['lease']
+    return counters
@@ -0,0 +1,157 @@
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from sqlalchemy import delete, func, select, update
+from app import db, usage
+from app.db_utils import insert_ignore
+from app.models import LLMResponseCache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Defaults, overridden from the app config by init_app
+_config = {
+    'max_entries': 10000,  # 0 disables the cache
+}
+
+# Evict this fraction of the cache at once so we don't trim on every insert
+EVICT_FRACTION = 0.1
+
+_counters = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+_counters_lock = threading.Lock()
+_stores_since_sweep = 0
+
+
+def init_app(app):
+    """Configure the cache size from the Flask app config"""
+    _config['max_entries'] = app.config.get('LLM_CACHE_MAX_ENTRIES', _config['max_entries'])
+
+
+def enabled():
+    return _config['max_entries'] > 0
+
+
+def _sha256(text):
+    return hashlib.sha256((text or '').encode('utf-8')).hexdigest()
+
+
+def cache_key(model, prompt_text, content):
+    """Key for an answer: the model plus hashes of the prompt text and the (truncated) content sent"""
+    return _sha256(f"{model}\n{_sha256(prompt_text)}\n{_sha256(content)}")
+
+
+def _count(name, amount=1):
+    with _counters_lock:
+        _counters[name] += amount
+
+
+def lookup(model, prompt_text, content):
+    """Return the cached answer for this request, or None.
+
+    Runs on a connection of its own so the caller's session is never
+    committed or rolled back here.
+    """
+    if not enabled():
+        return None
+    key = cache_key(model, prompt_text, content)
+    with db.engine.begin() as connection:
+        response = connection.execute(
+            select(LLMResponseCache.response).where(LLMResponseCache.key == key)
+        ).scalar()
+        if response is not None:
+            connection.execute(
+                update(LLMResponseCache)
+                .where(LLMResponseCache.key == key)
+                .values(hits=LLMResponseCache.hits + 1, last_used_at=datetime.utcnow())
+            )
+    _count('hits' if response is not None else 'misses')
+    return response
+
+
+def _sweep_due():
+    """Whether enough answers were stored since the last size check to check again"""
+    global _stores_since_sweep
+    with _counters_lock:
+        _stores_since_sweep += 1
+        if _stores_since_sweep < max(1, int(_config['max_entries'] * EVICT_FRACTION)):
+            return False
+        _stores_since_sweep = 0
+        return True
+
+
+def store(prompt_name, model, prompt_text, content, response):
+    """Save an answer on a connection of its own, evicting the least recently used entries once the cache is full.
+
+    The size is only checked every max_entries * EVICT_FRACTION stores, so
+    the cache can briefly run over by that much per process.
+    """
+    if not enabled() or not response:
+        return
+    now = datetime.utcnow()
+    try:
+        # Another worker may have stored the same answer meanwhile; keep whichever came first
+        with db.engine.begin() as connection:
+            connection.execute(insert_ignore(LLMResponseCache.__table__), [{
+                'key': cache_key(model, prompt_text, content),
+                'prompt_name': prompt_name,
+                'model': model,
+                'response': response,
+                'hits': 0,
+                'created_at': now,
+                'last_used_at': now
+            }])
+        _count('stores')
+
+        if _sweep_due():
+            with db.engine.connect() as connection:
+                entries = connection.execute(select(func.count(LLMResponseCache.id))).scalar()
+            if entries > _config['max_entries']:
+                evict(entries - _config['max_entries'] + int(_config['max_entries'] * EVICT_FRACTION))
+    except Exception as e:
+        # A failed cache write must never lose the answer we paid for
+        logger.error(f"Error storing LLM response in cache: {str(e)}")
+
+
+def evict(count):
+    """Delete the count least recently used entries"""
+    stale = select(LLMResponseCache.id).order_by(LLMResponseCache.last_used_at.asc()).limit(count).subquery()
+    with db.engine.begin() as connection:
+        deleted = connection.execute(
+            delete(LLMResponseCache).where(LLMResponseCache.id.in_(select(stale.c.id)))
+        ).rowcount
+    _count('evictions', deleted)
+    logger.info(f"Evicted {deleted} entries from the LLM response cache")
+
+
+def invalidate(prompt_name):
+    """Drop every cached answer produced with a prompt, e.g. after it was edited"""
+    deleted = LLMResponseCache.query.filter_by(prompt_name=prompt_name).delete(synchronize_session=False)
+    db.session.commit()
+    logger.info(f"Invalidated {deleted} cached answers for {prompt_name}")
+    return deleted
+
+
+def cached_completion(prompt_name, model, prompt_text, content, call, stage=None):
+    """Return the cached answer for (model, prompt, content), or call() and cache its answer"""
+    cached = lookup(model, prompt_text, content)
+    if cached is not None:
+        logger.info(f"LLM cache hit for {prompt_name} ({model})")
+        usage.record(model, stage, cache_hit=True)
+        return cached
+    response = call()
+    store(prompt_name, model, prompt_text, content, response)
+    return response
+
+
+def stats():
+    with _counters_lock:
+        counters = dict(_counters)
+    lookups = counters['hits'] + counters['misses']
+    counters['hit_rate'] = round(counters['hits'] / lookups, 3) if lookups else 0.0
+    counters['max_entries'] = _config['max_entries']
+    try:
+        counters['entries'] = db.session.query(func.count(LLMResponseCache.id)).scalar()
+    except Exception:
+        counters['entries'] = None
+    return counters
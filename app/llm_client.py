@@ -0,0 +1,407 @@
+import time
+import random
+import logging
+import threading
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import openai
+import requests
+from requests.adapters import HTTPAdapter
+from flask import current_app
+from app import rate_limit, usage
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+FILTER = 'filter'
+PARSE = 'parse'
+
+# Errors worth retrying: the request may well succeed a moment later.
+# Rate limiting (429) is handled separately by the shared rate limiter.
+TRANSIENT_ERRORS = (openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open ended
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+
+# Recent latencies kept per model for percentiles, and how many are needed before hedging
+LATENCY_WINDOW = 500
+MIN_HEDGE_SAMPLES = 20
+
+# Defaults, overridden from the app config by init_app
+_config = {
+    'timeouts': {FILTER: 20.0, PARSE: 60.0},
+    'retries': 2,
+    'backoff': 1.0,
+    'hedge_percentile': 0,  # 0 = never hedge
+    'hedge_workers': 8,  # Hedged originals and duplicates in flight at once; twice LLM_WORKERS
+    'backend': 'openai',
+    'base_url': None,  # None = the backend's default
+    'api_key': None,  # None = the key from the settings page
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+_histograms = {}
+_histograms_lock = threading.Lock()
+_hedge_pool = None
+_hedge_pool_lock = threading.Lock()
+
+
+class Completion:
+    """Answer of a chat completion request"""
+
+    def __init__(self, content, prompt_tokens=None, completion_tokens=None):
+        self.content = content
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+
+class LLMBackend:
+    """Sends one chat completion request.
+
+    Backends raise openai's exception types (RateLimitError, APITimeoutError,
+    InternalServerError, ...) so timeouts, retries, hedging and rate limiting
+    work the same whichever backend is in use.
+    """
+
+    name = None
+
+    def send(self, api_key, model, messages, max_tokens, timeout, response_format=None):
+        raise NotImplementedError
+
+
+class OpenAIBackend(LLMBackend):
+    """The OpenAI chat completions API, or anything speaking its wire format at base_url"""
+
+    name = 'openai'
+
+    def __init__(self, base_url=None, api_key=None):
+        self.base_url = base_url
+        self.api_key = api_key
+        self._clients = {}
+        self._clients_lock = threading.Lock()
+
+    def get_client(self, api_key):
+        """Return the long-lived client for an API key, so its connection pool is reused"""
+        with self._clients_lock:
+            client = self._clients.get(api_key)
+            if client is None:
+                # Retries are ours: transient errors in create_completion, 429s through the rate limiter
+                client = openai.OpenAI(api_key=api_key, base_url=self.base_url, max_retries=0,
+                                       timeout=_config['timeouts'][PARSE])
+                self._clients[api_key] = client
+            return client
+
+    def send(self, api_key, model, messages, max_tokens, timeout, response_format=None):
+        extra = {'response_format': response_format} if response_format else {}
+        response = self.get_client(self.api_key or api_key).chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0.2,
+            max_tokens=max_tokens,
+            timeout=timeout,
+            **extra
+        )
+        usage = response.usage
+        return Completion(
+            response.choices[0].message.content,
+            usage.prompt_tokens if usage else None,
+            usage.completion_tokens if usage else None
+        )
+
+
+class OllamaBackend(LLMBackend):
+    """A local Ollama server's native chat API.
+
+    The key from the settings page is never sent here; a key configured with
+    LLM_API_KEY goes out as a bearer token, for servers behind an
+    authenticating proxy. HTTP errors are raised as the matching openai
+    exceptions, with the requests response in place of the SDK's.
+    """
+
+    name = 'ollama'
+    DEFAULT_BASE_URL = 'http://localhost:11434'
+
+    def __init__(self, base_url=None, api_key=None):
+        self.url = (base_url or self.DEFAULT_BASE_URL).rstrip('/') + '/api/chat'
+        self.session = requests.Session()
+        # One connection per request the hedge pool can have in flight
+        self.session.mount(self.url, HTTPAdapter(pool_maxsize=max(1, _config['hedge_workers'])))
+        if api_key:
+            self.session.headers['Authorization'] = f"Bearer {api_key}"
+
+    def send(self, api_key, model, messages, max_tokens, timeout, response_format=None):
+        payload = {
+            'model': model,
+            'messages': messages,
+            'stream': False,
+            'options': {'temperature': 0.2, 'num_predict': max_tokens},
+        }
+        if response_format:
+            payload['format'] = 'json'
+        try:
+            response = self.session.post(self.url, json=payload, timeout=timeout)
+        except requests.Timeout as e:
+            raise openai.APITimeoutError(request=e.request) from e
+        except requests.ConnectionError as e:
+            raise openai.APIConnectionError(request=e.request) from e
+
+        if response.status_code != 200:
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+            message = body.get('error') if isinstance(body, dict) else None
+            message = message or f"Ollama returned HTTP {response.status_code}"
+            if response.status_code == 429:
+                raise openai.RateLimitError(message, response=response, body=body)
+            if response.status_code >= 500:
+                raise openai.InternalServerError(message, response=response, body=body)
+            raise openai.APIStatusError(message, response=response, body=body)
+
+        data = response.json()
+        return Completion(data['message']['content'], data.get('prompt_eval_count'), data.get('eval_count'))
+
+
+BACKENDS = {
+    OpenAIBackend.name: OpenAIBackend,
+    OllamaBackend.name: OllamaBackend,
+}
+
+
+class LatencyHistogram:
+    """Call latencies of one model: fixed buckets since startup plus a window of recent calls"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=LATENCY_WINDOW)
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def observe(self, seconds, error=False):
+        with self.lock:
+            self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+            self.recent.append(seconds)
+            if error:
+                self.errors += 1
+
+    def percentile(self, percent):
+        """Latency below which percent of the recent calls finished, or None without data"""
+        with self.lock:
+            samples = sorted(self.recent)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * percent / 100))
+        return samples[index]
+
+    def stats(self):
+        with self.lock:
+            buckets = {f"<={bound}s": count for bound, count in zip(LATENCY_BUCKETS, self.buckets)}
+            buckets[f">{LATENCY_BUCKETS[-1]}s"] = self.buckets[-1]
+            result = {
+                'count': self.count,
+                'errors': self.errors,
+                'mean': round(self.total / self.count, 3) if self.count else None,
+                'buckets': buckets,
+                'hedged': self.hedged,
+                'hedge_wins': self.hedge_wins,
+            }
+        for percent in (50, 95, 99):
+            value = self.percentile(percent)
+            result[f'p{percent}'] = round(value, 3) if value is not None else None
+        return result
+
+
+def init_app(app):
+    """Configure the backend, timeouts, retries and hedging from the Flask app config"""
+    global _backend
+    config = app.config
+    _config.update({
+        'timeouts': {
+            FILTER: config.get('LLM_FILTER_TIMEOUT', _config['timeouts'][FILTER]),
+            PARSE: config.get('LLM_PARSE_TIMEOUT', _config['timeouts'][PARSE]),
+        },
+        'retries': config.get('LLM_RETRIES', _config['retries']),
+        'backoff': config.get('LLM_RETRY_BACKOFF', _config['backoff']),
+        'hedge_percentile': config.get('LLM_HEDGE_PERCENTILE', _config['hedge_percentile']),
+        'hedge_workers': 2 * config.get('LLM_WORKERS', _config['hedge_workers'] // 2),
+        'backend': config.get('LLM_BACKEND') or _config['backend'],
+        'base_url': config.get('LLM_BASE_URL') or None,
+        'api_key': config.get('LLM_API_KEY') or None,
+    })
+    # Build the backend again on next use so the new settings apply
+    with _backend_lock:
+        _backend = None
+
+
+def get_backend():
+    """Return the configured LLM backend, creating it on first use"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend_class = BACKENDS.get(_config['backend'])
+                if backend_class is None:
+                    logger.warning(f"Unknown LLM backend '{_config['backend']}', using openai")
+                    backend_class = OpenAIBackend
+                _backend = backend_class(base_url=_config['base_url'], api_key=_config['api_key'])
+    return _backend
+
+
+def set_backend(backend):
+    """Use a specific backend instance, e.g. a stand-in in tests and benchmarks"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def get_histogram(model):
+    with _histograms_lock:
+        histogram = _histograms.get(model)
+        if histogram is None:
+            histogram = _histograms[model] = LatencyHistogram()
+        return histogram
+
+
+def timeout_for(stage):
+    return _config['timeouts'].get(stage, _config['timeouts'][PARSE])
+
+
+def _get_hedge_pool():
+    """Threads racing a hedged request's original against its duplicate"""
+    global _hedge_pool
+    if _hedge_pool is None:
+        with _hedge_pool_lock:
+            if _hedge_pool is None:
+                _hedge_pool = ThreadPoolExecutor(max_workers=max(1, _config['hedge_workers']),
+                                                 thread_name_prefix='llm-hedge')
+    return _hedge_pool
+
+
+def _send(backend, api_key, model, messages, max_tokens, timeout, response_format):
+    """One timed request"""
+    histogram = get_histogram(model)
+    started = time.monotonic()
+    try:
+        response = backend.send(api_key, model, messages, max_tokens, timeout, response_format)
+    except Exception:
+        histogram.observe(time.monotonic() - started, error=True)
+        raise
+    histogram.observe(time.monotonic() - started)
+    return response
+
+
+def _hedge_delay(model):
+    """Seconds to wait before sending a duplicate request, or None if hedging is off"""
+    percentile = _config['hedge_percentile']
+    if not percentile:
+        return None
+    histogram = get_histogram(model)
+    if len(histogram.recent) < MIN_HEDGE_SAMPLES:
+        return None
+    return histogram.percentile(percentile)
+
+
+def _send_hedged(backend, api_key, model, messages, max_tokens, timeout, response_format, stage):
+    """Send a request; if it is still running after the hedge delay, race a duplicate against it.
+
+    Once hedging is on, the original runs on the hedge pool so this thread
+    can return whichever answer comes first. A duplicate is only sent when
+    the model's request and token budgets have room, and the tokens of the
+    answer that isn't used are still recorded.
+    """
+    delay = _hedge_delay(model)
+    if delay is None or delay >= timeout:
+        return _send(backend, api_key, model, messages, max_tokens, timeout, response_format)
+
+    pool = _get_hedge_pool()
+    started = {}
+    primary = pool.submit(_send, backend, api_key, model, messages, max_tokens, timeout, response_format)
+    started[primary] = time.monotonic()
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result()
+
+    # Only hedge when the model's budgets have room, so duplicates can't cause 429s
+    limiter = rate_limit.get_limiter(model)
+    if limiter.requests.try_acquire(1):
+        return primary.result()
+    if limiter.tokens.try_acquire(rate_limit.estimate_tokens(messages, max_tokens)):
+        limiter.requests.refund(1)
+        return primary.result()
+
+    histogram = get_histogram(model)
+    with histogram.lock:
+        histogram.hedged += 1
+    logger.info(f"{model} request still running after {delay:.1f}s, sending a hedged duplicate")
+    hedge = pool.submit(_send, backend, api_key, model, messages, max_tokens, timeout, response_format)
+    started[hedge] = time.monotonic()
+
+    app = current_app._get_current_object()
+    article_ids = usage.attributed()
+
+    def _record_unused(future):
+        if future.exception() is not None:
+            return
+        response = future.result()
+        with app.app_context():
+            usage.record(model, stage, response.prompt_tokens, response.completion_tokens,
+                         latency=time.monotonic() - started[future], article_ids=article_ids)
+
+    pending = {primary, hedge}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                response = future.result()
+            except Exception as e:
+                error = e
+                continue
+            if future is hedge:
+                with histogram.lock:
+                    histogram.hedge_wins += 1
+            # The other request was paid for too
+            (hedge if future is primary else primary).add_done_callback(_record_unused)
+            return response
+    raise error
+
+
+def create_completion(api_key, model, messages, max_tokens=500, stage=PARSE, response_format=None):
+    """Chat completion through the shared client with the stage's timeout.
+
+    Timeouts, connection errors and 5xx responses are retried with jittered
+    exponential backoff; other errors (including 429) are raised to the
+    caller. Returns a Completion; its token counts are recorded in the
+    usage table against the articles set with usage.attribute().
+    """
+    backend = get_backend()
+    timeout = timeout_for(stage)
+    retries = _config['retries']
+    started = time.monotonic()
+    for attempt in range(retries + 1):
+        try:
+            response = _send_hedged(backend, api_key, model, messages, max_tokens, timeout, response_format, stage)
+            usage.record(model, stage, response.prompt_tokens, response.completion_tokens,
+                         latency=time.monotonic() - started)
+            return response
+        except TRANSIENT_ERRORS as e:
+            if attempt == retries:
+                raise
+            backoff = _config['backoff'] * (2 ** attempt)
+            delay = backoff + random.uniform(0, backoff)
+            logger.warning(f"{model} {stage} request failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def stats():
+    with _histograms_lock:
+        histograms = dict(_histograms)
+    return {model: histogram.stats() for model, histogram in histograms.items()}
@@ -30,6 +30,15 @@ class Feed(db.Model):
     category = db.Column(db.String(50), default='general')
     last_checked = db.Column(db.DateTime, default=datetime.utcnow)
     active = db.Column(db.Boolean, default=True)
+    last_fetch_duration = db.Column(db.Float, nullable=True)  # Seconds the last fetch took
+    etag = db.Column(db.String(255), nullable=True)  # ETag returned by the last full fetch
+    modified = db.Column(db.String(100), nullable=True)  # Last-Modified returned by the last full fetch
+    fetched_count = db.Column(db.Integer, default=0)  # Polls that returned a full body (200)
+    not_modified_count = db.Column(db.Integer, default=0)  # Polls answered with 304 Not Modified
+    poll_interval = db.Column(db.Integer, nullable=True)  # Learned minutes between polls
+    next_check_at = db.Column(db.DateTime, nullable=True)  # When the feed is next due (None = due now)
+    last_entry_guid = db.Column(db.String(36), nullable=True)  # GUID of the newest entry seen (high-water mark)
+    last_entry_published = db.Column(db.DateTime, nullable=True)  # Publish time of the newest entry seen
     articles = db.relationship('Article', backref='feed', lazy=True, cascade="all, delete-orphan")
     
     def __repr__(self):
@@ -47,18 +56,27 @@ class Tag(db.Model):
 class Article(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     guid = db.Column(db.String(36), default=lambda: str(uuid.uuid4()), nullable=False, unique=True)
-    title = db.Column(db.String(255), nullable=False)
+    title = db.Column(db.String(255), nullable=False, index=True)
     url = db.Column(db.String(500), nullable=False, unique=True)
     content = db.Column(db.Text, nullable=True)
+    content_error = db.Column(db.String(255), nullable=True)  # Why the page download was refused (too large, not HTML)
     summary = db.Column(db.Text, nullable=True)
     published = db.Column(db.DateTime, nullable=True)
     processed = db.Column(db.Boolean, default=False)
-    processing = db.Column(db.Boolean, default=False)  # Flag to indicate article is currently being processed
-    processing_started = db.Column(db.DateTime, nullable=True)  # Timestamp when processing started
     sent_to_joplin = db.Column(db.Boolean, default=False)
     joplin_id = db.Column(db.String(100), nullable=True)
     feed_id = db.Column(db.Integer, db.ForeignKey('feed.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    content_signature = db.Column(db.Text, nullable=True)  # MinHash signature of the content (hex)
+    canonical_id = db.Column(db.Integer, db.ForeignKey('article.id', ondelete='SET NULL'), nullable=True, index=True)  # Original this article near-duplicates
+    attempts = db.Column(db.Integer, default=0)  # Failed processing attempts
+    next_attempt_at = db.Column(db.DateTime, nullable=True, index=True)  # Not retried before this time
+    error_class = db.Column(db.String(30), nullable=True)  # Kind of the last failure, e.g. extraction or parse_failed
+    last_error = db.Column(db.String(255), nullable=True)
+    dead_lettered_at = db.Column(db.DateTime, nullable=True, index=True)  # Set once retries are exhausted; requeue to retry
+    
+    # LSH buckets of the signature, only present for canonical articles
+    lsh_buckets = db.relationship('ArticleLSHBucket', lazy=True, cascade="all, delete-orphan")
     
     # Many-to-many relationship with Tag
     tags = db.relationship('Tag', secondary=article_tags, lazy='subquery',
@@ -66,3 +84,78 @@ class Article(db.Model):
     
     def __repr__(self):
         return f'<Article {self.title}>'
+
+class LLMResponseCache(db.Model):
+    """Model answers keyed by (model, prompt text hash, truncated content hash)"""
+    __tablename__ = 'llm_response_cache'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(64), nullable=False, unique=True)  # sha256 of model, prompt hash and content hash
+    prompt_name = db.Column(db.String(50), nullable=False, index=True)  # Prompt the answer belongs to, for invalidation
+    model = db.Column(db.String(50), nullable=False)
+    response = db.Column(db.Text, nullable=False)
+    hits = db.Column(db.Integer, default=0)  # Times the cached answer was reused
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # Least recently used entries are evicted first
+    
+    def __repr__(self):
+        return f'<LLMResponseCache {self.prompt_name} {self.model}>'
+
+class ArticleLSHBucket(db.Model):
+    """LSH index over article MinHash signatures: one row per band of a canonical article"""
+    __tablename__ = 'article_lsh_bucket'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    bucket = db.Column(db.String(16), nullable=False, index=True)  # Hash of the band number and its signature values
+    article_id = db.Column(db.Integer, db.ForeignKey('article.id', ondelete='CASCADE'), nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<ArticleLSHBucket {self.bucket} {self.article_id}>'
+
+class PrefilterDecision(db.Model):
+    """Audit log of articles kept or discarded by the local pre-filter without asking the filter model"""
+    __tablename__ = 'prefilter_decision'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    article_id = db.Column(db.Integer, db.ForeignKey('article.id', ondelete='CASCADE'), nullable=False, unique=True)  # Latest decision only
+    decision = db.Column(db.String(10), nullable=False)  # keep or discard
+    score = db.Column(db.Float, nullable=False)
+    reasons = db.Column(db.Text, nullable=True)  # JSON of the strongest signals and their contribution
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    article = db.relationship('Article', backref=db.backref('prefilter_decisions', lazy=True, cascade="all, delete-orphan"))
+    
+    def __repr__(self):
+        return f'<PrefilterDecision {self.article_id} {self.decision}>'
+
+class LLMUsage(db.Model):
+    """One model call (or cache hit) with its token counts for one article, for cost accounting"""
+    __tablename__ = 'llm_usage'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    model = db.Column(db.String(50), nullable=False)
+    stage = db.Column(db.String(10), nullable=True)  # filter or parse
+    prompt_tokens = db.Column(db.Integer, nullable=True)
+    completion_tokens = db.Column(db.Integer, nullable=True)
+    latency = db.Column(db.Float, nullable=True)  # Seconds, including retries
+    article_id = db.Column(db.Integer, db.ForeignKey('article.id', ondelete='SET NULL'), nullable=True, index=True)
+    cache_hit = db.Column(db.Boolean, default=False)
+    request_id = db.Column(db.String(32), nullable=True, index=True)  # Shared by the rows of one grouped request
+
+class ArticleJob(db.Model):
+    """Queue entry of an article waiting to be processed, leased to one worker at a time"""
+    __tablename__ = 'article_job'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    article_id = db.Column(db.Integer, db.ForeignKey('article.id', ondelete='CASCADE'), nullable=False, unique=True)
+    locked_by = db.Column(db.String(64), nullable=True)  # Worker holding the lease
+    locked_until = db.Column(db.DateTime, nullable=True, index=True)  # Lease expiry; claimable again once passed
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # Last time the worker extended the lease
+    claims = db.Column(db.Integer, default=0)  # Times the job was claimed (more than one = reclaimed after a lost lease)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    article = db.relationship('Article', backref=db.backref('job', uselist=False, lazy=True, cascade="all, delete-orphan"))
+    
+    def __repr__(self):
+        return f'<ArticleJob {self.article_id} {self.locked_by}>'
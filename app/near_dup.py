@@ -0,0 +1,216 @@
+import re
+import json
+import zlib
+import random
+import hashlib
+import logging
+import threading
+from app import db
+from app.db_utils import chunked
+from app.models import Article, ArticleLSHBucket
+from app.prompt_budget import main_text
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# MinHash signature length, split into BANDS bands of ROWS values each for LSH.
+# 16 bands of 4 rows make articles with a Jaccard similarity around 0.5 or
+# more very likely to share a bucket; candidates are then checked exactly.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Words per shingle, and the minimum number of shingles worth signing: shorter
+# texts (teasers, stubs) match each other too easily to reuse a summary on
+SHINGLE_SIZE = 3
+MIN_SHINGLES = 50
+
+# Only the start of very long articles is signed
+MAX_SIGNED_CHARS = 20000
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+# Fixed seed so signatures stay comparable across processes and restarts
+_rng = random.Random(20240601)
+PERMUTATIONS = [(_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(0, MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+WORD = re.compile(r'\w+')
+
+# Defaults, overridden from the app config by init_app
+_config = {
+    'threshold': 0.7,  # Estimated Jaccard similarity above which articles are near-duplicates (0 = disabled)
+}
+
+_counters = {'indexed': 0, 'duplicates': 0, 'unconfirmed': 0, 'llm_calls_avoided': 0}
+_counters_lock = threading.Lock()
+
+
+def init_app(app):
+    """Configure the similarity threshold from the Flask app config"""
+    _config['threshold'] = app.config.get('NEAR_DUP_THRESHOLD', _config['threshold'])
+
+
+def enabled():
+    return _config['threshold'] > 0
+
+
+def _count(name, amount=1):
+    with _counters_lock:
+        _counters[name] += amount
+
+
+def shingles(text):
+    """Set of hashed word n-grams of a text"""
+    words = WORD.findall(text[:MAX_SIGNED_CHARS].lower())
+    return {
+        zlib.crc32(' '.join(words[i:i + SHINGLE_SIZE]).encode('utf-8'))
+        for i in range(max(0, len(words) - SHINGLE_SIZE + 1))
+    }
+
+
+def signature(text):
+    """MinHash signature of a text's main content, or None if it is too short to compare reliably"""
+    hashes = shingles(main_text(text or ''))
+    if len(hashes) < MIN_SHINGLES:
+        return None
+    return [min(((a * h + b) % MERSENNE_PRIME) & MAX_HASH for h in hashes) for a, b in PERMUTATIONS]
+
+
+def encode_signature(values):
+    return ''.join(f'{value:08x}' for value in values)
+
+
+def decode_signature(value):
+    return [int(value[i:i + 8], 16) for i in range(0, len(value), 8)]
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity: the fraction of matching MinHash values"""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERM
+
+
+def jaccard(text_a, text_b):
+    """Exact Jaccard similarity of the shingles of two texts' main content"""
+    a, b = shingles(main_text(text_a or '')), shingles(main_text(text_b or ''))
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def buckets(sig):
+    """One LSH bucket per band; the band number is part of the hash so bands never collide"""
+    return [
+        hashlib.md5(f"{band}:{sig[band * ROWS:(band + 1) * ROWS]}".encode('ascii')).hexdigest()[:16]
+        for band in range(BANDS)
+    ]
+
+
+def find_canonical(article_id, sig):
+    """Return the id of the most similar canonical article above the threshold, or None"""
+    candidate_ids = {
+        candidate_id for (candidate_id,) in db.session.query(ArticleLSHBucket.article_id)
+        .filter(ArticleLSHBucket.bucket.in_(buckets(sig)), ArticleLSHBucket.article_id != article_id)
+        .distinct()
+    }
+    best_id, best_score = None, 0.0
+    for chunk in chunked(candidate_ids):
+        rows = db.session.query(Article.id, Article.content_signature) \
+            .filter(Article.id.in_(chunk), Article.content_signature.isnot(None)) \
+            .all()
+        for candidate_id, encoded in rows:
+            score = similarity(sig, decode_signature(encoded))
+            # Prefer the most similar article, and the oldest one on a tie
+            if best_id is None or score > best_score or (score == best_score and candidate_id < best_id):
+                best_id, best_score = candidate_id, score
+    if best_id is not None and best_score >= _config['threshold']:
+        logger.debug(f"Article {article_id} is a near-duplicate of {best_id} (similarity {best_score:.2f})")
+        return best_id
+    return None
+
+
+def index_article(article):
+    """Sign an article and link it to a canonical article if it is a near-duplicate.
+
+    Only canonical articles are added to the LSH buckets, so every match
+    points straight at an original. The caller commits. Returns the
+    canonical article id, or None if the article is itself canonical.
+    """
+    if not enabled() or article.content_signature or not article.content:
+        return article.canonical_id
+
+    sig = signature(article.content)
+    if sig is None:
+        return None
+    article.content_signature = encode_signature(sig)
+    _count('indexed')
+
+    canonical_id = find_canonical(article.id, sig)
+    if canonical_id:
+        article.canonical_id = canonical_id
+        _count('duplicates')
+    else:
+        db.session.add_all(ArticleLSHBucket(bucket=bucket, article_id=article.id) for bucket in buckets(sig))
+    # Later articles in the same batch must be able to match this one
+    db.session.flush()
+    return canonical_id
+
+
+def reuse_canonical_summary(article):
+    """Copy the canonical article's result onto a near-duplicate; the caller commits.
+
+    The MinHash estimate is confirmed with the exact Jaccard similarity of
+    both texts first; an article that doesn't pass is unlinked and goes
+    through the LLM stages itself. Returns the number of LLM calls this
+    saved (0 when the canonical was discarded by the pre-filter), or None
+    if there is nothing to reuse.
+    """
+    canonical = Article.query.get(article.canonical_id) if article.canonical_id else None
+    if not canonical or not canonical.processed or not canonical.summary:
+        return None
+
+    score = jaccard(article.content, canonical.content)
+    if score < _config['threshold']:
+        logger.info(f"Article {article.id} is only {score:.2f} similar to article {canonical.id}, not reusing its summary")
+        article.canonical_id = None
+        if article.content_signature:
+            # It is an original after all, so later articles can match it
+            db.session.add_all(ArticleLSHBucket(bucket=bucket, article_id=article.id)
+                               for bucket in buckets(decode_signature(article.content_signature)))
+        _count('unconfirmed')
+        return None
+
+    try:
+        summary_data = json.loads(canonical.summary)
+    except json.JSONDecodeError:
+        summary_data = {"summary": canonical.summary}
+    if not isinstance(summary_data, dict):
+        summary_data = {"summary": canonical.summary}
+    summary_data["title"] = article.title
+    summary_data["duplicate_of"] = canonical.id
+
+    article.summary = json.dumps(summary_data)
+    article.processed = True
+
+    # A pre-filter discard cost no call, a filter model discard one and a kept original both stages
+    if summary_data.get("filtered_by") == "prefilter":
+        saved = 0
+    else:
+        saved = 1 if summary_data.get("filtered_out") else 2
+    _count('llm_calls_avoided', saved)
+    return saved
+
+
+def calls_avoided():
+    """LLM calls saved by reusing canonical results since startup"""
+    with _counters_lock:
+        return _counters['llm_calls_avoided']
+
+
+def stats():
+    with _counters_lock:
+        counters = dict(_counters)
+    counters['threshold'] = _config['threshold']
+    try:
+        counters['duplicate_articles'] = Article.query.filter(Article.canonical_id.isnot(None)).count()
+    except Exception:
+        counters['duplicate_articles'] = None
+    return counters
@@ -0,0 +1,93 @@
+import logging
+from datetime import datetime, timedelta
+from statistics import median
+from flask import current_app
+from app import db
+from app.models import Article, Settings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Number of recent articles used to learn a feed's publishing cadence
+HISTORY_SIZE = 20
+
+# Minimum number of dated articles needed before we trust the learned cadence
+MIN_HISTORY = 3
+
+# Poll twice per expected publishing gap so new posts are picked up early
+CADENCE_FACTOR = 0.5
+
+
+def get_poll_bounds():
+    """Return the (min, max) polling interval in minutes"""
+    config = current_app.config
+    min_interval = config.get('POLL_MIN_INTERVAL', 15)
+    max_interval = max(min_interval, config.get('POLL_MAX_INTERVAL', 720))
+    return min_interval, max_interval
+
+
+def learn_publish_gap(feed_id, now=None):
+    """Return the typical gap between posts of a feed, or None without enough history"""
+    now = now or datetime.utcnow()
+    rows = db.session.query(Article.published, Article.created_at) \
+        .filter(Article.feed_id == feed_id) \
+        .order_by(Article.id.desc()) \
+        .limit(HISTORY_SIZE) \
+        .all()
+
+    # Prefer the publisher's timestamp and fall back to when we first saw the article
+    timestamps = sorted((published or created_at).replace(tzinfo=None)
+                        for published, created_at in rows if published or created_at)
+    timestamps = [ts for ts in timestamps if ts <= now]
+    if len(timestamps) < MIN_HISTORY:
+        return None
+
+    gaps = [(later - earlier).total_seconds() / 60
+            for earlier, later in zip(timestamps, timestamps[1:])]
+    gaps = [gap for gap in gaps if gap > 0]
+    if not gaps:
+        return None
+
+    # A feed that has gone quiet is polled less often the longer it stays quiet
+    since_last = (now - timestamps[-1]).total_seconds() / 60
+    return max(median(gaps), since_last)
+
+
+def compute_poll_interval(feed, now=None):
+    """Return the number of minutes to wait before polling a feed again"""
+    min_interval, max_interval = get_poll_bounds()
+
+    gap = learn_publish_gap(feed.id, now=now)
+    if gap is None:
+        # Not enough history yet, fall back to the global check interval
+        settings = Settings.query.first()
+        interval = settings.check_interval if settings and settings.check_interval else 60
+    else:
+        interval = gap * CADENCE_FACTOR
+
+    return int(min(max(interval, min_interval), max_interval))
+
+
+def schedule_next_check(feed, now=None):
+    """Set when a feed is next due; the caller is responsible for committing"""
+    now = now or datetime.utcnow()
+    interval = compute_poll_interval(feed, now=now)
+    feed.poll_interval = interval
+    feed.next_check_at = now + timedelta(minutes=interval)
+    logger.debug(f"Feed {feed.name} next due in {interval} minutes at {feed.next_check_at}")
+    return feed.next_check_at
+
+
+def postpone_next_check(feed, now=None):
+    """Push a feed's next check out by its stored interval, for polls that brought nothing new.
+
+    A 304 adds no articles, so the learned cadence can't have changed and
+    the article history isn't read again. Feeds without a stored interval
+    yet are scheduled from scratch. The caller is responsible for committing.
+    """
+    if not feed.poll_interval:
+        return schedule_next_check(feed, now=now)
+    now = now or datetime.utcnow()
+    feed.next_check_at = now + timedelta(minutes=feed.poll_interval)
+    logger.debug(f"Feed {feed.name} not modified, next due in {feed.poll_interval} minutes at {feed.next_check_at}")
+    return feed.next_check_at
@@ -0,0 +1,156 @@
+import re
+import json
+import math
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+from app import db
+from app.iocs import regex_extract_iocs
+from app.models import PrefilterDecision
+from app.prompt_budget import main_text
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+KEEP = 'keep'
+DISCARD = 'discard'
+
+# Weighted terms: positive ones point at threat intelligence, negative ones at
+# marketing, events and company news. Matched case-insensitively on word boundaries.
+TERM_WEIGHTS = {
+    # Threats and tooling
+    'ransomware': 3.0, 'malware': 2.5, 'backdoor': 2.5, 'trojan': 2.5, 'botnet': 2.5,
+    'infostealer': 2.5, 'stealer': 2.0, 'loader': 1.0, 'rootkit': 2.5, 'wiper': 2.0,
+    'spyware': 2.5, 'webshell': 2.5, 'rat': 1.0, 'exploit': 2.0, 'exploited': 2.5,
+    'zero-day': 3.0, '0-day': 3.0, 'vulnerability': 2.0, 'vulnerabilities': 2.0,
+    'phishing': 2.0, 'payload': 2.0, 'dropper': 2.5, 'command and control': 2.5, 'c2': 2.5,
+    # Actors and tradecraft
+    'threat actor': 3.0, 'threat actors': 3.0, 'apt': 2.5, 'campaign': 1.5,
+    'ttps': 2.5, 'mitre att&ck': 3.0, 'att&ck': 2.5, 'lateral movement': 2.5,
+    'persistence': 1.5, 'exfiltration': 2.5, 'privilege escalation': 2.5,
+    'indicators of compromise': 3.0, 'iocs': 3.0, 'yara': 2.5, 'sigma rule': 2.5,
+    'attribution': 1.5, 'nation-state': 2.5, 'breach': 1.5, 'compromised': 1.5,
+    # Marketing, events and company news
+    'webinar': -3.0, 'register now': -3.0, 'register today': -3.0, 'save your seat': -3.0,
+    'sign up': -1.0, 'free trial': -3.0, 'request a demo': -3.0, 'book a demo': -3.0,
+    'pricing': -1.5, 'discount': -2.0, 'sponsored': -2.5, 'press release': -1.5,
+    'award': -1.5, 'awards': -1.5, 'named a leader': -3.0, 'magic quadrant': -3.0,
+    'partnership': -1.5, 'partners with': -1.5, 'announces': -1.0, 'launches': -1.5,
+    'hiring': -2.5, 'we are hiring': -3.0, 'join our team': -3.0, 'careers': -2.0,
+    'job opening': -3.0, 'conference': -1.0, 'keynote': -1.5, 'podcast': -2.0,
+    'episode': -1.5, 'customer story': -2.5, 'case study': -1.5,
+}
+
+TERMS = re.compile(
+    r'(?<![\w-])(' + '|'.join(re.escape(term) for term in sorted(TERM_WEIGHTS, key=len, reverse=True)) + r')(?![\w-])',
+    re.IGNORECASE
+)
+CVE = re.compile(r'\bCVE-\d{4}-\d{4,}\b', re.IGNORECASE)
+
+# A term counts at most this many times its weight however often it is repeated, and all
+# terms together at most TERM_SCORE_CAP either way, so keywords alone never decide
+TERM_REPEAT_CAP = 2.0
+TERM_SCORE_CAP = 20.0
+
+# Weight of CVE identifiers and of hard indicators (hashes, IP addresses), each capped
+CVE_WEIGHT = 5.0
+IOC_WEIGHT = 6.0
+EVIDENCE_CAP = 15.0
+
+# Defaults, overridden from the app config by init_app
+_config = {
+    'enabled': True,
+    'keep_score': 30.0,
+    'discard_score': -8.0,
+}
+
+_counters = {KEEP: 0, DISCARD: 0, 'undecided': 0}
+_counters_lock = threading.Lock()
+
+
+def init_app(app):
+    """Configure the pre-filter thresholds from the Flask app config"""
+    config = app.config
+    _config.update({
+        'enabled': bool(config.get('PREFILTER_ENABLED', _config['enabled'])),
+        'keep_score': config.get('PREFILTER_KEEP_SCORE', _config['keep_score']),
+        'discard_score': config.get('PREFILTER_DISCARD_SCORE', _config['discard_score']),
+    })
+
+
+def score_text(text):
+    """Score an article's main text; returns the score, the signals behind it and whether it has hard evidence.
+
+    Only the main text counts: navigation, share bars and calls to action
+    around it are dropped first (see prompt_budget.main_text). Repeated
+    terms count logarithmically up to TERM_REPEAT_CAP times their weight,
+    and the keyword total is capped, so a long page can't win on volume.
+    Hard evidence is a CVE identifier, a hash or an IP address.
+    """
+    text = main_text(text or '')
+    terms = Counter(match.lower() for match in TERMS.findall(text))
+    reasons = {term: round(TERM_WEIGHTS[term] * min(1 + math.log(count), TERM_REPEAT_CAP), 2)
+               for term, count in terms.items()}
+    keyword_score = max(-TERM_SCORE_CAP, min(TERM_SCORE_CAP, sum(reasons.values())))
+
+    evidence = 0.0
+    cves = len(set(match.upper() for match in CVE.findall(text)))
+    if cves:
+        reasons['cve'] = round(min(EVIDENCE_CAP, CVE_WEIGHT * (1 + math.log(cves))), 2)
+        evidence += reasons['cve']
+
+    # Domains match too much ordinary text to count as evidence
+    iocs = regex_extract_iocs(text)
+    hard_iocs = sum(len(set(iocs.get(kind, []))) for kind in ('md5', 'sha1', 'sha256', 'ips'))
+    if hard_iocs:
+        reasons['iocs'] = round(min(EVIDENCE_CAP, IOC_WEIGHT * (1 + math.log(hard_iocs))), 2)
+        evidence += reasons['iocs']
+
+    return round(keyword_score + evidence, 2), reasons, evidence > 0
+
+
+def classify(article):
+    """Decide locally whether an article is a clear keep or a clear discard.
+
+    Returns KEEP, DISCARD or None (let the filter model decide). A local
+    KEEP needs hard evidence on top of the score, and an article with hard
+    evidence is never discarded locally. Local decisions are recorded in
+    the prefilter_decision audit table, one row per article; the caller
+    commits.
+    """
+    if not _config['enabled'] or not article.content:
+        return None
+
+    score, reasons, has_evidence = score_text(article.content)
+    if score >= _config['keep_score'] and has_evidence:
+        decision = KEEP
+    elif score <= _config['discard_score'] and not has_evidence:
+        decision = DISCARD
+    else:
+        decision = None
+
+    with _counters_lock:
+        _counters[decision or 'undecided'] += 1
+
+    if decision:
+        top = json.dumps(dict(sorted(reasons.items(), key=lambda item: abs(item[1]), reverse=True)[:10]))
+        # A retried article updates its row rather than adding another one
+        record = PrefilterDecision.query.filter_by(article_id=article.id).first()
+        if record is None:
+            db.session.add(PrefilterDecision(article_id=article.id, decision=decision, score=score, reasons=top))
+        else:
+            record.decision, record.score, record.reasons, record.created_at = decision, score, top, datetime.utcnow()
+        logger.info(f"Pre-filter: article {article.id} scored {score}, {decision} without calling the filter model")
+    else:
+        logger.debug(f"Pre-filter: article {article.id} scored {score}, leaving it to the filter model")
+    return decision
+
+
+def stats():
+    with _counters_lock:
+        counters = dict(_counters)
+    counters['keep_score'] = _config['keep_score']
+    counters['discard_score'] = _config['discard_score']
+    counters['enabled'] = _config['enabled']
+    return counters
@@ -0,0 +1,265 @@
+import re
+import math
+import logging
+import threading
+from app.iocs import regex_extract_iocs
+
+try:
+    import tiktoken
+except ImportError:  # Optional dependency, token counts are estimated without it
+    tiktoken = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+FILTER = 'filter'
+PARSE = 'parse'
+
+# Context window (tokens) by model name prefix; the longest matching prefix wins
+MODEL_CONTEXT = {
+    'gpt-3.5-turbo': 16385,
+    'gpt-3.5-turbo-instruct': 4096,
+    'gpt-4': 8192,
+    'gpt-4-32k': 32768,
+    'gpt-4-turbo': 128000,
+    'gpt-4-1106': 128000,
+    'gpt-4-0125': 128000,
+    'gpt-4o': 128000,
+}
+DEFAULT_CONTEXT = 8192
+
+# Reserved for the answer and for message framing
+RESPONSE_TOKENS = 500
+SAFETY_MARGIN = 100
+
+# Defaults, overridden from the app config by init_app
+_config = {
+    FILTER: 400,  # The KEEP/DISCARD decision only needs the gist of an article
+    PARSE: 2000,
+}
+
+CODE_FENCE = re.compile(r'^\s*(```|~~~)')
+HEADING = re.compile(r'^\s*#{1,6}\s')
+CVE = re.compile(r'\bCVE-\d{4}-\d{4,}\b', re.IGNORECASE)
+MARKDOWN_LINK = re.compile(r'\[[^\]]*\]\([^)]*\)')
+BOILERPLATE = re.compile(
+    r'\b(cookies?|subscribe|newsletter|share (this|on)|follow us|all rights reserved|privacy policy|'
+    r'terms of (use|service)|sign up|log ?in|related (posts|articles)|read more|advertisement)\b',
+    re.IGNORECASE
+)
+CALL_TO_ACTION = re.compile(
+    r'\b(request a demo|book a demo|schedule a demo|free trial|register (now|today|for)|save your seat|'
+    r'webinar|contact (us|sales)|talk to an expert|download the (report|whitepaper|e-?book)|get started)\b',
+    re.IGNORECASE
+)
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+_counters = {stage: {'calls': 0, 'tokens_available': 0, 'tokens_sent': 0} for stage in (FILTER, PARSE)}
+_counters_lock = threading.Lock()
+
+
+def init_app(app):
+    """Configure the per-stage input budgets from the Flask app config"""
+    _config[FILTER] = app.config.get('FILTER_INPUT_TOKENS', _config[FILTER])
+    _config[PARSE] = app.config.get('PARSE_INPUT_TOKENS', _config[PARSE])
+
+
+def _encoder(model):
+    with _encoders_lock:
+        encoder = _encoders.get(model)
+        if encoder is None:
+            try:
+                encoder = tiktoken.encoding_for_model(model or '')
+            except KeyError:
+                encoder = tiktoken.get_encoding('cl100k_base')
+            _encoders[model] = encoder
+        return encoder
+
+
+def count_tokens(text, model=None):
+    """Number of tokens in a text; about 4 characters per token when tiktoken isn't installed"""
+    if not text:
+        return 0
+    if tiktoken is not None:
+        return len(_encoder(model).encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text, budget, model=None):
+    """Cut a text down to at most budget tokens"""
+    if tiktoken is not None:
+        encoder = _encoder(model)
+        return encoder.decode(encoder.encode(text, disallowed_special=())[:budget])
+    return text[:budget * 4]
+
+
+def context_size(model):
+    matches = [prefix for prefix in MODEL_CONTEXT if (model or '').startswith(prefix)]
+    return MODEL_CONTEXT[max(matches, key=len)] if matches else DEFAULT_CONTEXT
+
+
+def input_budget(model, stage, prompt_text=''):
+    """Tokens of article text to send for a stage, capped by what fits in the model's context"""
+    available = context_size(model) - count_tokens(prompt_text, model) - RESPONSE_TOKENS - SAFETY_MARGIN
+    return max(0, min(_config[stage], available))
+
+
+def split_sections(content):
+    """Split markdown into (kind, text) blocks: headings, fenced code blocks and paragraphs"""
+    sections = []
+    paragraph = []
+    code = None
+
+    def flush():
+        if paragraph:
+            sections.append(('paragraph', '\n'.join(paragraph)))
+            paragraph.clear()
+
+    for line in content.splitlines():
+        if code is not None:
+            code.append(line)
+            if CODE_FENCE.match(line):
+                sections.append(('code', '\n'.join(code)))
+                code = None
+        elif CODE_FENCE.match(line):
+            flush()
+            code = [line]
+        elif HEADING.match(line):
+            flush()
+            sections.append(('heading', line.strip()))
+        elif not line.strip():
+            flush()
+        else:
+            paragraph.append(line)
+    flush()
+    if code:
+        sections.append(('code', '\n'.join(code)))
+    return sections
+
+
+def mostly_links(text):
+    link_chars = sum(len(link) for link in MARKDOWN_LINK.findall(text))
+    return link_chars > 0.5 * len(text)
+
+
+def stock_phrase(text):
+    """Short text built around a cookie notice, share bar, newsletter box or call to action"""
+    return len(text) < 300 and bool(BOILERPLATE.search(text) or CALL_TO_ACTION.search(text))
+
+
+def main_text(content):
+    """An article without its navigation, share bars, cookie notices and calls to action.
+
+    Falls back to the whole content if nothing else is left.
+    """
+    sections = split_sections(content or '')
+    kept = [text for kind, text in sections
+            if kind == 'code' or not (mostly_links(text) or stock_phrase(text))]
+    return '\n\n'.join(kept) if kept else (content or '')
+
+
+def score_section(kind, text, index):
+    """How much a section is worth sending; sections scoring 0 or less are never sent"""
+    score = 1.0
+    # The lead of an article usually says what it is about
+    score += 2.0 if index < 3 else 1.0 / (1 + index / 10)
+    if kind == 'heading':
+        score += 1.5
+    elif kind == 'code':
+        score += 1.5
+
+    iocs = regex_extract_iocs(text)
+    hits = sum(len(iocs[key]) for key in ('md5', 'sha1', 'sha256', 'ips')) + len(CVE.findall(text))
+    if hits:
+        score += 2.0 * math.sqrt(hits)
+
+    # Navigation, share bars, cookie notices and calls to action are mostly links and stock
+    # phrases (penalised more than the lead bonus, since pages often start with them)
+    if mostly_links(text):
+        score -= 3.5
+    if stock_phrase(text):
+        score -= 3.5
+    if kind == 'paragraph' and len(text) < 40:
+        score -= 0.5
+    return score
+
+
+def pack_content(content, budget, model=None):
+    """Pick the most valuable sections of an article that fit in budget tokens.
+
+    Sections are ranked by score_section and packed greedily, then joined
+    in their original order. Returns (text, tokens sent, tokens in the
+    whole article).
+    """
+    content = content or ''
+    total = count_tokens(content, model)
+    if total <= budget:
+        return content, total, total
+
+    sections = split_sections(content)
+    costs = [count_tokens(text, model) + 1 for _, text in sections]
+    scores = [score_section(kind, text, index) for index, (kind, text) in enumerate(sections)]
+    ranked = sorted(range(len(sections)), key=lambda index: (-scores[index], index))
+
+    chosen = set()
+    used = 0
+    for index in ranked:
+        if scores[index] <= 0:
+            break
+        if used + costs[index] <= budget:
+            chosen.add(index)
+            used += costs[index]
+
+    if not chosen and ranked:
+        # Even the best section is too long on its own; send as much of it as fits
+        text = truncate_to_tokens(sections[ranked[0]][1], budget, model)
+        return text, count_tokens(text, model), total
+
+    text = '\n\n'.join(sections[index][1] for index in sorted(chosen))
+    return text, used, total
+
+
+class PackedInput:
+    """Article text packed for one stage, with the token counts reported once it is sent"""
+
+    def __init__(self, text, stage, model, sent, total, budget):
+        self.text = text
+        self.stage = stage
+        self.model = model
+        self.sent = sent
+        self.total = total
+        self.budget = budget
+
+
+def build_input(content, stage, model, prompt_text=''):
+    """Article text to send to a model for a stage, packed to the stage's token budget.
+
+    Returns a PackedInput. Nothing is counted until record_sent, so inputs
+    answered from the response cache don't show up in the stats.
+    """
+    budget = input_budget(model, stage, prompt_text)
+    text, sent, total = pack_content(content, budget, model)
+    return PackedInput(text, stage, model, sent, total, budget)
+
+
+def record_sent(*inputs):
+    """Count packed inputs that go out to a model, once per request they are part of"""
+    with _counters_lock:
+        for packed in inputs:
+            counters = _counters[packed.stage]
+            counters['calls'] += 1
+            counters['tokens_available'] += packed.total
+            counters['tokens_sent'] += packed.sent
+    for packed in inputs:
+        logger.info(f"{packed.stage} input for {packed.model}: {packed.sent} of {packed.total} article tokens "
+                    f"(budget {packed.budget})")
+
+
+def stats():
+    with _counters_lock:
+        result = {stage: dict(counters) for stage, counters in _counters.items()}
+    for stage, counters in result.items():
+        counters['budget'] = _config[stage]
+    result['tokenizer'] = 'tiktoken' if tiktoken is not None else 'estimate'
+    return result
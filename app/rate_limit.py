@@ -0,0 +1,162 @@
+import time
+import random
+import logging
+import threading
+from app.prompt_budget import count_tokens
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Defaults, overridden from the app config by init_app
+_config = {
+    'default_rpm': 60,
+    'default_tpm': 40000,
+    'model_limits': {},
+    'share': 1.0,  # Fraction of every budget this process may use (several processes share one API key)
+}
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at rate_per_minute"""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, amount):
+        """Take amount tokens if available; otherwise return the seconds to wait"""
+        # Requests bigger than the whole bucket would never fit, so cap them
+        amount = min(amount, self.capacity)
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return 0
+            return (amount - self.tokens) / self.rate if self.rate > 0 else 1.0
+
+    def refund(self, amount):
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class ModelRateLimiter:
+    """Requests-per-minute and tokens-per-minute budgets for one model, with adaptive 429 backoff"""
+
+    def __init__(self, model, rpm, tpm):
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.lock = threading.Lock()
+        self.cooldown_until = 0.0
+        self.backoff = 0.0
+        self.rate_limited = 0
+
+    def acquire(self, tokens):
+        """Block until a request of roughly `tokens` tokens fits in both budgets"""
+        while True:
+            with self.lock:
+                cooldown = self.cooldown_until - time.monotonic()
+            if cooldown > 0:
+                time.sleep(cooldown)
+                continue
+
+            wait = self.requests.try_acquire(1)
+            if wait:
+                time.sleep(min(wait, 5))
+                continue
+            wait = self.tokens.try_acquire(tokens)
+            if wait:
+                self.requests.refund(1)
+                time.sleep(min(wait, 5))
+                continue
+            return
+
+    def on_success(self):
+        with self.lock:
+            # Ease off the backoff again once requests go through
+            self.backoff = self.backoff / 2 if self.backoff > 1 else 0.0
+
+    def on_rate_limited(self, retry_after=None):
+        """Pause every worker using this model after a 429"""
+        with self.lock:
+            self.rate_limited += 1
+            self.backoff = min(60.0, max(1.0, self.backoff * 2))
+            delay = max(retry_after or 0, self.backoff) + random.uniform(0, self.backoff / 2)
+            self.cooldown_until = max(self.cooldown_until, time.monotonic() + delay)
+        logger.warning(f"Rate limited on {self.model}, pausing requests for {delay:.1f}s")
+        return delay
+
+    def stats(self):
+        return {
+            'rpm': round(self.requests.rate * 60),
+            'tpm': round(self.tokens.rate * 60),
+            'rate_limited': self.rate_limited,
+            'backoff': round(self.backoff, 2),
+        }
+
+
+def parse_model_limits(value):
+    """Parse 'model=rpm:tpm,model=rpm:tpm' into a dict of (rpm, tpm)"""
+    limits = {}
+    for item in (value or '').split(','):
+        model, _, budget = item.strip().partition('=')
+        rpm, _, tpm = budget.partition(':')
+        if model and rpm.strip().isdigit() and tpm.strip().isdigit():
+            limits[model.strip()] = (int(rpm), int(tpm))
+    return limits
+
+
+def init_app(app):
+    """Configure the rate limits from the Flask app config"""
+    config = app.config
+    _config.update({
+        'default_rpm': config.get('LLM_DEFAULT_RPM', _config['default_rpm']),
+        'default_tpm': config.get('LLM_DEFAULT_TPM', _config['default_tpm']),
+        'model_limits': parse_model_limits(config.get('LLM_RATE_LIMITS', '')),
+        'share': config.get('LLM_RATE_LIMIT_SHARE', _config['share']),
+    })
+    with _limiters_lock:
+        _limiters.clear()
+
+
+def get_limiter(model):
+    """Return the shared rate limiter for a model"""
+    with _limiters_lock:
+        limiter = _limiters.get(model)
+        if limiter is None:
+            rpm, tpm = _config['model_limits'].get(model, (_config['default_rpm'], _config['default_tpm']))
+            share = _config['share']
+            limiter = ModelRateLimiter(model, max(1, int(rpm * share)), max(1, int(tpm * share)))
+            _limiters[model] = limiter
+        return limiter
+
+
+def retry_after(error):
+    """Seconds the API asked us to wait in a 429 response, if it said"""
+    response = getattr(error, 'response', None)
+    value = response.headers.get('retry-after') if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def estimate_tokens(messages, max_tokens=0):
+    """Token estimate of a request (messages plus the largest possible answer) for budgeting"""
+    return sum(count_tokens(message.get('content') or '') for message in messages) + max_tokens
+
+
+def stats():
+    with _limiters_lock:
+        return {model: limiter.stats() for model, limiter in _limiters.items()}
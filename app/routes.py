@@ -1,35 +1,36 @@
 import os
 import re
 import json
+import logging
 import openai
-import requests
 from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
 from app.models import Settings, Prompt
-from app import db
+from app.iocs import regex_extract_iocs
+from app import article_retry, db, http_client, job_queue, llm_cache, llm_client, near_dup, prefilter, prompt_budget, rate_limit, structured_output, usage
 
 main = Blueprint('main', __name__)
 
-def regex_extract_iocs(text):
-    md5 = re.findall(r"\b[a-fA-F0-9]{32}\b", text)
-    sha1 = re.findall(r"\b[a-fA-F0-9]{40}\b", text)
-    sha256 = re.findall(r"\b[a-fA-F0-9]{64}\b", text)
-    ips = re.findall(r"\b(?:\d{1,3}\.){3}\d{1,3}\b", text)
-    domains = re.findall(r"\b[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b", text)
-    return {"md5": md5, "sha1": sha1, "sha256": sha256, "ips": ips, "domains": domains}
+# Configure logging
+logger = logging.getLogger(__name__)
 
-def call_openai(model, messages):
+def call_openai(model, messages, stage=llm_client.PARSE, response_format=None):
     settings = Settings.query.first()
     if not settings or not settings.openai_api_key:
         raise ValueError("OpenAI API key not configured")
     
-    client = openai.OpenAI(api_key=settings.openai_api_key)
-    response = client.chat.completions.create(
-        model=model,
-        messages=messages,
-        temperature=0.2,
-        max_tokens=500
-    )
-    return response.choices[0].message.content
+    # Share the per-model rate limits and the client pool with the background workers
+    limiter = rate_limit.get_limiter(model)
+    limiter.acquire(rate_limit.estimate_tokens(messages, 500))
+    try:
+        response = llm_client.create_completion(settings.openai_api_key, model, messages, max_tokens=500, stage=stage,
+                                                response_format=response_format)
+    except openai.RateLimitError as e:
+        limiter.on_rate_limited(rate_limit.retry_after(e))
+        raise
+    limiter.on_success()
+    if response.prompt_tokens is not None:
+        logger.info(f"{model}: sent {response.prompt_tokens} prompt tokens, received {response.completion_tokens}")
+    return response.content
 
 def send_to_joplin(title, content):
     settings = Settings.query.first()
@@ -46,7 +47,7 @@ def send_to_joplin(title, content):
         "tags": ["cti", "openai"]
     }
     
-    response = requests.post(url, params=params, json=data)
+    response = http_client.post(url, params=params, json=data)
     return response.json()
 
 @main.route('/')
@@ -82,6 +83,9 @@ def prompts_page():
     parse_prompt = Prompt.query.filter_by(name='parse_prompt').first()
     
     if request.method == 'POST':
+        # Remember the old prompts so cached answers can be dropped for the ones that changed
+        previous = {prompt.name: (prompt.content, prompt.model) for prompt in (filter_prompt, parse_prompt)}
+        
         filter_prompt.content = request.form.get('filter_prompt')
         filter_prompt.model = request.form.get('filter_model')
         
@@ -89,6 +93,10 @@ def prompts_page():
         parse_prompt.model = request.form.get('parse_model')
         
         db.session.commit()
+        
+        for prompt in (filter_prompt, parse_prompt):
+            if previous[prompt.name] != (prompt.content, prompt.model):
+                llm_cache.invalidate(prompt.name)
         flash('Prompts updated successfully!', 'success')
         return redirect(url_for('main.prompts_page'))
     
@@ -106,37 +114,60 @@ def process():
     if not filter_prompt or not parse_prompt:
         return jsonify({"status": "error", "message": "Prompts not configured"}), 500
     
-    # Extract the first 3000 characters to limit input size
-    truncated_content = content[:3000]
+    # Send the most valuable parts of the article that fit in each stage's token budget
+    system_prompt = "You are a concise CTI analyst assistant."
+    filter_prompt_text = f"{system_prompt}\n{filter_prompt.content}"
+    filter_input = prompt_budget.build_input(content, prompt_budget.FILTER, filter_prompt.model, filter_prompt_text)
     
     # Prepare the message for OpenAI
     messages = [
-        {"role": "system", "content": "You are a concise CTI analyst assistant."},
-        {"role": "user", "content": f"{filter_prompt.content} Article: {truncated_content}"}
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"{filter_prompt.content} Article: {filter_input.text}"}
     ]
     
+    def send_filter():
+        prompt_budget.record_sent(filter_input)
+        return call_openai(filter_prompt.model, messages, stage=llm_client.FILTER)
+    
     try:
-        # Call the filter model (usually GPT-3.5)
-        result_filter = call_openai(filter_prompt.model, messages)
+        # Call the filter model (usually GPT-3.5), unless the same content was seen before
+        result_filter = llm_cache.cached_completion(
+            filter_prompt.name, filter_prompt.model, filter_prompt_text, filter_input.text, send_filter,
+            stage=llm_client.FILTER
+        )
         
         # Extract IOCs using regex
         iocs_regex = regex_extract_iocs(content)
         
         # Check if we need to use the more powerful model
         if any(kw in result_filter.lower() for kw in ["threat_group", "ttp"]):
+            parse_prompt_text = f"{system_prompt}\n{parse_prompt.content}"
+            parse_input = prompt_budget.build_input(content, prompt_budget.PARSE, parse_prompt.model, parse_prompt_text)
             messages = [
-                {"role": "system", "content": "You are a concise CTI analyst assistant."},
-                {"role": "user", "content": f"{parse_prompt.content} Article: {truncated_content}"}
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": f"{parse_prompt.content} Article: {parse_input.text}"}
             ]
-            result_parse = call_openai(parse_prompt.model, messages)
+            
+            def send_parse():
+                prompt_budget.record_sent(parse_input)
+                return call_openai(parse_prompt.model, messages,
+                                   response_format=structured_output.response_format(parse_prompt.model, messages))
+            
+            result_parse = llm_cache.cached_completion(
+                parse_prompt.name, parse_prompt.model, parse_prompt_text, parse_input.text, send_parse,
+                stage=llm_client.PARSE
+            )
             final_result = result_parse
+            summary_data = structured_output.parse_summary(result_parse)
         else:
             final_result = result_filter
+            try:
+                summary_data = json.loads(final_result)
+            except json.JSONDecodeError:
+                summary_data = None
         
-        # Try to parse the result as JSON
-        try:
-            summary_data = json.loads(final_result)
-        except json.JSONDecodeError:
+        # Fall back to the raw answer as the summary
+        if not isinstance(summary_data, dict):
             summary_data = {"summary": final_result, "tags": ["cti"], "iocs": iocs_regex}
         
         # Ensure IOCs are included
@@ -176,18 +207,36 @@ def process():
         return jsonify({"status": "error", "message": f"Error processing content: {str(e)}"}), 500
 
 @main.route('/usage', methods=['GET'])
-def usage():
+def usage_report():
+    """Return LLM token and cost totals by day, stage, model and feed (?days=30)"""
+    # The index and settings pages also use this to check that the API key is set
     settings = Settings.query.first()
     if not settings or not settings.openai_api_key:
         return jsonify({"status": "error", "message": "OpenAI API key not configured"}), 500
     
     try:
-        # The new OpenAI client doesn't have a direct billing.usage method
-        # Instead, we'll return a message explaining this limitation
-        return jsonify({
-            "status": "info", 
-            "message": "Usage data is not available through the API in this version. Please check your OpenAI dashboard for usage information.",
-            "dashboard_url": "https://platform.openai.com/usage"
-        })
+        days = max(1, int(request.args.get('days', 30)))
+    except ValueError:
+        return jsonify({"status": "error", "message": "days must be a number"}), 400
+    
+    try:
+        return jsonify({"status": "success", **usage.summary(days)})
     except Exception as e:
         return jsonify({"status": "error", "message": f"Error retrieving usage data: {str(e)}"}), 500
+
+@main.route('/api/stats', methods=['GET'])
+def stats():
+    """Return runtime statistics of the HTTP pools, LLM calls and article pipeline"""
+    return jsonify({
+        "http": http_client.pool_stats(),
+        "rate_limits": rate_limit.stats(),
+        "llm_cache": llm_cache.stats(),
+        "near_duplicates": near_dup.stats(),
+        "prefilter": prefilter.stats(),
+        "input_tokens": prompt_budget.stats(),
+        "llm_latency": llm_client.stats(),
+        "usage_writer": usage.stats(),
+        "parse_output": structured_output.stats(),
+        "article_retries": article_retry.stats(),
+        "job_queue": job_queue.stats()
+    })
@@ -115,52 +115,29 @@ def get_feed_check_interval():
         settings = Settings.query.first()
         return settings.check_interval if settings else 60  # Default to 60 minutes
 
+# Function to get how often the scheduler looks for feeds that are due
+def get_feed_check_tick(check_interval):
+    """Feeds are polled on their own adaptive schedule; the job only needs to
+    run often enough to honour the shortest allowed per-feed interval."""
+    min_interval = app_instance.config.get('POLL_MIN_INTERVAL', 15) if app_instance else 15
+    return max(1, min(check_interval, min_interval))
+
 # Job function to check feeds
 def check_feeds_job():
     with app_instance.app_context():
         logger.info("Running scheduled feed check")
-        result = check_all_feeds()
+        result = check_all_feeds(due_only=True)
         logger.info(f"Feed check completed: {result}")
         return result
 
 # Job function to process pending articles
 def process_articles_job():
-    # Create a lock file to prevent concurrent processing
-    lock_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'article_processing.lock')
-    
-    # Check if a lock file exists (another process is running)
-    if os.path.exists(lock_file):
-        # Check if the lock is stale (older than 10 minutes)
-        lock_time = os.path.getmtime(lock_file)
-        current_time = time.time()
-        if current_time - lock_time > 600:  # 10 minutes in seconds
-            logger.warning("Found stale article processing lock file. Removing it.")
-            try:
-                os.remove(lock_file)
-            except Exception as e:
-                logger.error(f"Failed to remove stale lock file: {str(e)}")
-                return False
-        else:
-            logger.info("Article processing already in progress. Skipping this run.")
-            return False
-    
-    try:
-        # Create the lock file
-        with open(lock_file, 'w') as f:
-            f.write(f"Article processing started at {datetime.utcnow().isoformat()}")
-        
-        with app_instance.app_context():
-            logger.info("Processing pending articles")
-            result = process_pending_articles()
-            logger.info(f"Article processing completed: {result}")
-            return result
-    finally:
-        # Always remove the lock file when done
-        if os.path.exists(lock_file):
-            try:
-                os.remove(lock_file)
-            except Exception as e:
-                logger.error(f"Failed to remove lock file: {str(e)}")
+    # Runs overlapping with a slow previous run (or another process) are safe: each claims its own article jobs
+    with app_instance.app_context():
+        logger.info("Processing pending articles")
+        result = process_pending_articles()
+        logger.info(f"Article processing completed: {result}")
+        return result
 
 
 # Function to add jobs to the scheduler
@@ -181,12 +158,13 @@ def add_jobs(app):
     
     # Get feed check interval from settings
     check_interval = get_feed_check_interval()
-    logger.info(f"Setting up feed check job with interval of {check_interval} minutes")
+    check_tick = get_feed_check_tick(check_interval)
+    logger.info(f"Setting up feed check job to look for due feeds every {check_tick} minutes (default feed interval {check_interval} minutes)")
     
-    # Add job to check feeds
+    # Add job to check feeds that are due
     scheduler.add_job(
         func=check_feeds_job,
-        trigger=IntervalTrigger(minutes=check_interval),
+        trigger=IntervalTrigger(minutes=check_tick),
         id='check_feeds',
         name='Check all active feeds',
         replace_existing=True
@@ -257,6 +235,10 @@ def init_scheduler(app, connect_only=False):
         # Register cleanup function
         atexit.register(cleanup)
         
+        # The scheduled jobs parse article HTML: fork the extraction pool before the scheduler's threads exist
+        from app import extraction
+        extraction.start_pool()
+        
         # Start the scheduler
         scheduler.start()
         logger.info("Scheduler started successfully")
@@ -325,19 +307,20 @@ def update_feed_check_interval(minutes):
     # If we have a scheduler in this process, update the job directly
     if scheduler and scheduler.running:
         try:
-            job = scheduler.get_job('feed_check')
+            check_tick = get_feed_check_tick(minutes)
+            job = scheduler.get_job('check_feeds')
             if job:
-                job.reschedule(trigger='interval', minutes=minutes)
-                logger.info(f"Feed check job rescheduled with interval: {minutes} minutes")
+                job.reschedule(trigger='interval', minutes=check_tick)
+                logger.info(f"Feed check job rescheduled with interval: {check_tick} minutes")
             else:
                 scheduler.add_job(
-                    id='feed_check',
+                    id='check_feeds',
                     func=check_feeds_job,
                     trigger='interval',
-                    minutes=minutes,
+                    minutes=check_tick,
                     replace_existing=True
                 )
-                logger.info(f"Feed check job added with interval: {minutes} minutes")
+                logger.info(f"Feed check job added with interval: {check_tick} minutes")
             return True
         except Exception as e:
             logger.error(f"Error updating scheduler job: {str(e)}")
@@ -0,0 +1,295 @@
+import re
+import json
+import logging
+import threading
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+AUTO = 'auto'
+JSON_OBJECT = 'json_object'
+JSON_SCHEMA = 'json_schema'
+NONE = 'none'
+
+# Models (by name prefix) that accept response_format={"type": "json_object"}
+JSON_MODE_MODELS = ('gpt-3.5-turbo-1106', 'gpt-3.5-turbo-0125', 'gpt-4-turbo', 'gpt-4-1106', 'gpt-4-0125', 'gpt-4o')
+JSON_MODE_ALIASES = ('gpt-3.5-turbo',)
+
+# What the parse stage answers with; iocs are optional since they are also extracted locally
+LIST_FIELDS = ('threat_groups', 'ttp', 'tags')
+SUMMARY_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'summary': {'type': 'string'},
+        'threat_groups': {'type': 'array', 'items': {'type': 'string'}},
+        'ttp': {'type': 'array', 'items': {'type': 'string'}},
+        'tags': {'type': 'array', 'items': {'type': 'string'}},
+    },
+    'required': ['summary', 'threat_groups', 'ttp', 'tags'],
+    'additionalProperties': False,
+}
+
+# Stands in for a missing summary so the answer's other fields are still saved
+DEFAULT_SUMMARY = 'No summary available'
+
+CODE_FENCE = re.compile(r'```[a-zA-Z]*\s*(.*?)(?:```|$)', re.DOTALL)
+
+# Defaults, overridden from the app config by init_app
+_config = {
+    'mode': AUTO,
+}
+
+REPAIRS = ('fence', 'extract', 'trailing_comma', 'truncated', 'coerced', 'summary_missing')
+_counters = {'valid': 0, 'repaired': 0, 'failed': 0, **{repair: 0 for repair in REPAIRS}}
+_counters_lock = threading.Lock()
+
+
+def init_app(app):
+    """Configure the response format of the parse stage from the Flask app config"""
+    mode = (app.config.get('PARSE_RESPONSE_FORMAT') or AUTO).lower()
+    if mode not in (AUTO, JSON_OBJECT, JSON_SCHEMA, NONE):
+        logger.warning(f"Unknown PARSE_RESPONSE_FORMAT '{mode}', using {AUTO}")
+        mode = AUTO
+    _config['mode'] = mode
+
+
+def supports_json_mode(model):
+    model = model or ''
+    return model in JSON_MODE_ALIASES or model.startswith(JSON_MODE_MODELS)
+
+
+def response_format(model, messages):
+    """response_format to request for a parse call, or None to rely on the prompt alone.
+
+    JSON mode is only asked for when the messages mention JSON, which the
+    API requires. json_schema (structured outputs) pins the answer to
+    SUMMARY_SCHEMA, so it has to be chosen explicitly: prompts asking for
+    more fields would have them dropped.
+    """
+    mode = _config['mode']
+    if mode == NONE or not any('json' in (message.get('content') or '').lower() for message in messages):
+        return None
+    if mode == JSON_SCHEMA:
+        return {'type': 'json_schema', 'json_schema': {'name': 'cti_summary', 'strict': True, 'schema': SUMMARY_SCHEMA}}
+    if mode == JSON_OBJECT or supports_json_mode(model):
+        return {'type': 'json_object'}
+    return None
+
+
+def _scan(text):
+    """Walk JSON text outside strings.
+
+    Returns the containers still open at the end, whether the text ends
+    inside a string, and the position of every comma with the containers
+    open at that point.
+    """
+    stack = []
+    commas = []
+    in_string = False
+    escaped = False
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            stack.append(char)
+        elif char in '}]':
+            if stack:
+                stack.pop()
+        elif char == ',':
+            commas.append((index, list(stack)))
+    return stack, in_string, commas
+
+
+def _strip_trailing_commas(text):
+    """Drop commas directly before a closing bracket, leaving strings alone"""
+    result = []
+    in_string = False
+    escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '}]':
+            while result and result[-1].isspace():
+                result.pop()
+            if result and result[-1] == ',':
+                result.pop()
+        result.append(char)
+    return ''.join(result)
+
+
+def _close(stack):
+    return ''.join('}' if opener == '{' else ']' for opener in reversed(stack))
+
+
+def _complete_truncated(text):
+    """Close an answer cut off mid-way (max_tokens), dropping the unfinished last item if needed"""
+    stack, in_string, commas = _scan(text)
+    if not stack and not in_string:
+        return None
+    candidate = text + ('"' if in_string else '')
+    candidate = candidate.rstrip().rstrip(',')
+    if candidate.endswith(':'):
+        candidate += ' null'
+    closed = [candidate + _close(stack)]
+    # Cut back to the last complete item, one comma at a time
+    cuts = [text[:index] + _close(open_stack) for index, open_stack in reversed(commas[-50:])]
+    # A string cut off mid-way is usually a half-written item; only keep it if nothing complete is left
+    attempts = cuts + closed if in_string else closed + cuts
+    for attempt in attempts:
+        try:
+            return json.loads(attempt)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+def repair_json(text):
+    """Parse almost-JSON from a model; returns (value or None, repairs applied)"""
+    repairs = []
+    text = (text or '').strip()
+    try:
+        return json.loads(text), repairs
+    except json.JSONDecodeError:
+        pass
+
+    fenced = CODE_FENCE.search(text)
+    if fenced:
+        text = fenced.group(1).strip()
+        repairs.append('fence')
+    start = text.find('{')
+    if start > 0:
+        text = text[start:]
+        repairs.append('extract')
+    try:
+        return json.loads(text), repairs
+    except json.JSONDecodeError:
+        pass
+
+    # Prose after the object
+    try:
+        value, end = json.JSONDecoder().raw_decode(text)
+        if text[end:].strip():
+            return value, repairs + ['extract']
+    except json.JSONDecodeError:
+        pass
+
+    cleaned = _strip_trailing_commas(text)
+    if cleaned != text:
+        repairs.append('trailing_comma')
+        try:
+            return json.loads(cleaned), repairs
+        except json.JSONDecodeError:
+            pass
+
+    value = _complete_truncated(cleaned)
+    if value is not None:
+        return value, repairs + ['truncated']
+    return None, repairs
+
+
+def validate(data):
+    """Problems of a parsed answer against SUMMARY_SCHEMA (extra fields are allowed); empty if valid"""
+    if not isinstance(data, dict):
+        return ['answer is not a JSON object']
+    errors = []
+    if not isinstance(data.get('summary'), str):
+        errors.append('summary is not a string')
+    for field in LIST_FIELDS:
+        value = data.get(field)
+        if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+            errors.append(f'{field} is not a list of strings')
+    iocs = data.get('iocs')
+    if iocs is not None and (not isinstance(iocs, dict) or not all(isinstance(v, list) for v in iocs.values())):
+        errors.append('iocs is not an object of lists')
+    return errors
+
+
+def _as_text(item):
+    if isinstance(item, dict):
+        return ' '.join(str(value) for value in item.values() if value not in (None, ''))
+    return str(item)
+
+
+def coerce(data):
+    """Bend a near-miss answer into the schema: lists from strings, text from objects, missing lists as []"""
+    if isinstance(data.get('summary'), list):
+        data['summary'] = ' '.join(_as_text(item) for item in data['summary'])
+    elif data.get('summary') is not None and not isinstance(data['summary'], str):
+        data['summary'] = _as_text(data['summary'])
+    for field in LIST_FIELDS:
+        value = data.get(field)
+        if value is None:
+            data[field] = []
+        elif isinstance(value, str):
+            data[field] = [value] if value.strip() else []
+        elif isinstance(value, list):
+            data[field] = [item if isinstance(item, str) else _as_text(item) for item in value if item is not None]
+        else:
+            data[field] = [_as_text(value)]
+    iocs = data.get('iocs')
+    if iocs is not None:
+        if isinstance(iocs, dict):
+            data['iocs'] = {key: value if isinstance(value, list) else [value] for key, value in iocs.items()}
+        else:
+            del data['iocs']
+    return data
+
+
+def parse_summary(text):
+    """Turn a parse-stage answer into a dict matching SUMMARY_SCHEMA, or None if it can't be saved.
+
+    Clean JSON is used as is. Otherwise code fences, surrounding prose,
+    trailing commas and truncated output are repaired locally and fields
+    are coerced to the schema before giving up. An answer with the other
+    fields but no summary keeps them, with DEFAULT_SUMMARY as its summary.
+    Outcomes are counted.
+    """
+    data, repairs = repair_json(text)
+    if isinstance(data, dict) and validate(data):
+        if data.get('summary') is None and any(data.get(field) for field in LIST_FIELDS + ('iocs',)):
+            data['summary'] = DEFAULT_SUMMARY
+            repairs.append('summary_missing')
+        coerce(data)
+        repairs.append('coerced')
+
+    if not isinstance(data, dict) or validate(data):
+        outcome = 'failed'
+    elif repairs:
+        outcome = 'repaired'
+    else:
+        outcome = 'valid'
+
+    with _counters_lock:
+        _counters[outcome] += 1
+        for repair in repairs:
+            _counters[repair] += 1
+
+    if outcome == 'failed':
+        logger.warning(f"Parse answer is not usable JSON even after repair ({', '.join(repairs) or 'no repair applied'})")
+        return None
+    if repairs:
+        logger.info(f"Parse answer repaired locally: {', '.join(repairs)}")
+    return data
+
+
+def stats():
+    with _counters_lock:
+        counters = dict(_counters)
+    answers = counters['valid'] + counters['repaired'] + counters['failed']
+    counters['repair_rate'] = round(counters['repaired'] / answers, 3) if answers else 0.0
+    counters['mode'] = _config['mode']
+    return counters
@@ -0,0 +1,277 @@
+import time
+import uuid
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import String, case, cast, func, insert
+from app import db
+from app.models import Article, Feed, LLMUsage
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Dollars per million (prompt, completion) tokens by model name prefix; the longest matching prefix wins
+MODEL_PRICES = {
+    'gpt-3.5-turbo': (0.50, 1.50),
+    'gpt-4': (30.00, 60.00),
+    'gpt-4-32k': (60.00, 120.00),
+    'gpt-4-turbo': (10.00, 30.00),
+    'gpt-4-1106': (10.00, 30.00),
+    'gpt-4-0125': (10.00, 30.00),
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4o-mini': (0.15, 0.60),
+}
+
+# Rows kept in memory when the database can't be written, before new ones are dropped
+MAX_BUFFER = 10000
+
+# Defaults, overridden from the app config by init_app
+_config = {
+    'flush_size': 200,
+    'flush_interval': 10.0,
+    'prices': {},
+}
+
+_buffer = []
+_buffer_lock = threading.Lock()
+_last_flush = time.monotonic()
+_counters = {'calls': 0, 'cache_hits': 0, 'recorded': 0, 'written': 0, 'dropped': 0}
+_local = threading.local()
+
+
+def parse_prices(value):
+    """Parse 'model=prompt:completion,...' (dollars per million tokens) into a dict of pairs"""
+    prices = {}
+    for item in (value or '').split(','):
+        model, _, pair = item.strip().partition('=')
+        prompt, _, completion = pair.partition(':')
+        try:
+            prices[model.strip()] = (float(prompt), float(completion))
+        except ValueError:
+            continue
+    return {model: pair for model, pair in prices.items() if model}
+
+
+def init_app(app):
+    """Configure the writer and prices from the Flask app config, and flush on exit"""
+    config = app.config
+    _config.update({
+        'flush_size': config.get('USAGE_FLUSH_SIZE', _config['flush_size']),
+        'flush_interval': config.get('USAGE_FLUSH_INTERVAL', _config['flush_interval']),
+        'prices': parse_prices(config.get('LLM_PRICES', '')),
+    })
+    atexit.register(_flush_at_exit, app)
+
+
+def _flush_at_exit(app):
+    with app.app_context():
+        flush()
+
+
+@contextmanager
+def attribute(*article_ids):
+    """Attribute the model calls made by this thread inside the block to these articles"""
+    previous = getattr(_local, 'article_ids', ())
+    _local.article_ids = tuple(article_ids)
+    try:
+        yield
+    finally:
+        _local.article_ids = previous
+
+
+def attributed():
+    """The articles this thread's model calls are attributed to"""
+    return getattr(_local, 'article_ids', ())
+
+
+def record(model, stage, prompt_tokens=None, completion_tokens=None, latency=None, cache_hit=False, article_ids=None):
+    """Buffer one model call or cache hit; rows are written in bulk by flush.
+
+    article_ids defaults to the articles set with attribute(). A request
+    covering several articles is split into one row per article, with the
+    tokens shared out evenly, so per-article and per-feed sums still add up;
+    the rows share a request id so the request is still counted once.
+    """
+    if article_ids is None:
+        article_ids = attributed()
+    article_ids = list(article_ids) or [None]
+    count = len(article_ids)
+    now = datetime.utcnow()
+    request_id = uuid.uuid4().hex
+
+    def share(tokens, index):
+        if tokens is None:
+            return None
+        return tokens // count + (1 if index < tokens % count else 0)
+
+    rows = [{
+        'created_at': now,
+        'model': model,
+        'stage': stage,
+        'prompt_tokens': share(prompt_tokens, index),
+        'completion_tokens': share(completion_tokens, index),
+        'latency': latency,
+        'article_id': article_id,
+        'cache_hit': cache_hit,
+        'request_id': request_id,
+    } for index, article_id in enumerate(article_ids)]
+
+    with _buffer_lock:
+        _buffer.extend(rows)
+        _counters['cache_hits' if cache_hit else 'calls'] += 1
+        _counters['recorded'] += len(rows)
+        due = (len(_buffer) >= _config['flush_size']
+               or time.monotonic() - _last_flush >= _config['flush_interval'])
+    if due:
+        flush()
+
+
+def flush():
+    """Write the buffered rows in one insert on a connection of its own; returns the rows written"""
+    global _last_flush
+    with _buffer_lock:
+        rows = _buffer[:]
+        _buffer.clear()
+        _last_flush = time.monotonic()
+    if not rows:
+        return 0
+
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(insert(LLMUsage), rows)
+    except Exception as e:
+        with _buffer_lock:
+            room = max(0, MAX_BUFFER - len(_buffer))
+            _buffer[:0] = rows[:room]
+            _counters['dropped'] += len(rows) - room
+        logger.warning(f"Could not write {len(rows)} LLM usage rows, will retry: {str(e)}")
+        return 0
+
+    with _buffer_lock:
+        _counters['written'] += len(rows)
+    return len(rows)
+
+
+def prices_for(model):
+    """(prompt, completion) dollars per million tokens, or None for an unknown model"""
+    if model in _config['prices']:
+        return _config['prices'][model]
+    matches = [prefix for prefix in MODEL_PRICES if (model or '').startswith(prefix)]
+    return MODEL_PRICES[max(matches, key=len)] if matches else None
+
+
+def _totals(rows, key):
+    """Fold (key..., model, calls, cache_hits, prompt_tokens, completion_tokens) rows across models"""
+    totals = {}
+    for row in rows:
+        group = key(row)
+        model, calls, cache_hits, prompt_tokens, completion_tokens = row[-5:]
+        entry = totals.setdefault(group, {'calls': 0, 'cache_hits': 0, 'prompt_tokens': 0,
+                                          'completion_tokens': 0, 'cost': 0.0})
+        prompt_tokens, completion_tokens = prompt_tokens or 0, completion_tokens or 0
+        entry['calls'] += calls or 0
+        entry['cache_hits'] += cache_hits or 0
+        entry['prompt_tokens'] += prompt_tokens
+        entry['completion_tokens'] += completion_tokens
+        prices = prices_for(model)
+        if prices:
+            entry['cost'] += (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1e6
+    for entry in totals.values():
+        _finish(entry)
+    return totals
+
+
+def _finish(entry):
+    entry['total_tokens'] = entry['prompt_tokens'] + entry['completion_tokens']
+    entry['cost'] = round(entry['cost'], 4)
+    answered = entry['calls'] + entry['cache_hits']
+    entry['cache_hit_rate'] = round(entry['cache_hits'] / answered, 3) if answered else 0.0
+    return entry
+
+
+def summary(days=30):
+    """Token and cost totals of the last days, by day, stage, model and feed.
+
+    calls counts model requests (a grouped request once, however many
+    articles it covered) and cache_hits the answers served from the cache.
+    """
+    flush()
+    since = datetime.utcnow() - timedelta(days=days)
+    # Rows written before request ids existed count as a request each
+    request = func.coalesce(LLMUsage.request_id, cast(LLMUsage.id, String))
+    hit = func.coalesce(LLMUsage.cache_hit, False)
+    measures = (
+        LLMUsage.model,
+        func.count(func.distinct(case((~hit, request)))),
+        func.count(func.distinct(case((hit, request)))),
+        func.sum(LLMUsage.prompt_tokens),
+        func.sum(LLMUsage.completion_tokens),
+    )
+    recent = LLMUsage.created_at >= since
+
+    day = func.date(LLMUsage.created_at)
+    by_day = _totals(db.session.query(day, *measures).filter(recent).group_by(day, LLMUsage.model).all(),
+                     lambda row: str(row[0]))
+    by_stage = _totals(db.session.query(LLMUsage.stage, *measures).filter(recent)
+                       .group_by(LLMUsage.stage, LLMUsage.model).all(),
+                       lambda row: row[0] or 'unknown')
+    by_model = _totals(db.session.query(*measures).filter(recent).group_by(LLMUsage.model).all(),
+                       lambda row: row[0])
+    total = _finish({key: sum(entry[key] for entry in by_model.values())
+                     for key in ('calls', 'cache_hits', 'prompt_tokens', 'completion_tokens', 'cost')})
+
+    # Per feed: tokens, and how many of the articles they were spent on were kept
+    feed_rows = (db.session.query(Feed.id, Feed.name, *measures)
+                 .select_from(LLMUsage)
+                 .join(Article, Article.id == LLMUsage.article_id)
+                 .join(Feed, Feed.id == Article.feed_id)
+                 .filter(recent)
+                 .group_by(Feed.id, Feed.name, LLMUsage.model)
+                 .all())
+    by_feed = _totals(feed_rows, lambda row: (row[0], row[1]))
+    kept = Article.processed.is_(True) & Article.summary.isnot(None) & ~Article.summary.like('%"filtered_out": true%')
+    article_counts = (db.session.query(Article.feed_id,
+                                       func.count(func.distinct(Article.id)),
+                                       func.count(func.distinct(case((kept, Article.id)))))
+                      .join(LLMUsage, LLMUsage.article_id == Article.id)
+                      .filter(recent)
+                      .group_by(Article.feed_id)
+                      .all())
+    article_counts = {feed_id: (articles, kept_articles) for feed_id, articles, kept_articles in article_counts}
+
+    feeds = []
+    for (feed_id, name), entry in by_feed.items():
+        articles, kept_articles = article_counts.get(feed_id, (0, 0))
+        entry.update({
+            'feed_id': feed_id,
+            'feed': name,
+            'articles': articles,
+            'kept_articles': kept_articles,
+            'tokens_per_kept_article': round(entry['total_tokens'] / kept_articles) if kept_articles else None,
+            'cost_per_kept_article': round(entry['cost'] / kept_articles, 4) if kept_articles else None,
+        })
+        feeds.append(entry)
+    # Feeds that cost the most per kept article first; feeds with nothing kept lead
+    feeds.sort(key=lambda entry: (entry['tokens_per_kept_article'] is not None,
+                                  -(entry['tokens_per_kept_article'] or entry['total_tokens'])))
+
+    return {
+        'days': days,
+        'since': since.isoformat(),
+        'total': total,
+        'by_day': [dict(entry, day=key) for key, entry in sorted(by_day.items())],
+        'by_stage': [dict(entry, stage=key) for key, entry in sorted(by_stage.items())],
+        'by_model': [dict(entry, model=key, priced=prices_for(key) is not None) for key, entry in sorted(by_model.items())],
+        'by_feed': feeds,
+    }
+
+
+def stats():
+    with _buffer_lock:
+        counters = dict(_counters)
+        counters['buffered'] = len(_buffer)
+    answered = counters['calls'] + counters['cache_hits']
+    counters['cache_hit_rate'] = round(counters['cache_hits'] / answered, 3) if answered else 0.0
+    return counters
@@ -0,0 +1,4 @@
+"""
+Standalone benchmarks for CTI Monitor.
+Run them from the project root, e.g. python -m benchmarks.bench_ingest
+"""
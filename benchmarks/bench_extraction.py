@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+Benchmark HTML extraction throughput.
+
+Runs html_to_markdown over a corpus of saved article HTML, first in a single
+thread and then on the extraction process pool (fed from several threads,
+the way the prefetch and processing stages use it).
+
+Usage: python -m benchmarks.bench_extraction [--corpus DIR] [--repeat 20] [--workers 0]
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), 'fixtures', 'html')
+
+
+def load_corpus(path):
+    """Load every .htm/.html file in a directory as raw bytes"""
+    documents = []
+    for name in sorted(os.listdir(path)):
+        if name.lower().endswith(('.html', '.htm')):
+            with open(os.path.join(path, name), 'rb') as f:
+                documents.append((name, f.read()))
+    return documents
+
+
+def report(label, elapsed, documents):
+    total_bytes = sum(len(raw) for _, raw in documents)
+    print(f"{label:<28} {elapsed:>8.2f}s {len(documents) / elapsed:>10.1f} docs/s "
+          f"{total_bytes / elapsed / 1024 / 1024:>8.2f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help='Directory of saved article HTML')
+    parser.add_argument('--repeat', type=int, default=20, help='Times the corpus is processed')
+    parser.add_argument('--workers', type=int, default=0, help='Pool processes (0 = one per CPU core)')
+    args = parser.parse_args()
+
+    from app import extraction
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        print(f"No HTML files found in {args.corpus}")
+        return 1
+    documents = corpus * args.repeat
+    workers = args.workers or os.cpu_count() or 1
+    print(f"{len(corpus)} documents x {args.repeat} = {len(documents)} extractions, {workers} pool workers")
+    print()
+
+    started = time.perf_counter()
+    inline_results = [extraction.html_to_markdown(raw) for _, raw in documents]
+    report('in-process (1 thread)', time.perf_counter() - started, documents)
+
+    extraction._pool_workers = workers
+    extraction.get_pool().submit(len, b'').result()  # Start the workers outside the timed section
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers * 2) as executor:
+        pool_results = list(executor.map(lambda doc: extraction.extract_markdown(doc[1]), documents))
+    report(f'process pool ({workers} procs)', time.perf_counter() - started, documents)
+    extraction.shutdown_pool()
+
+    mismatches = sum(1 for a, b in zip(inline_results, pool_results) if a != b)
+    print(f"\nOutput identical for {len(documents) - mismatches}/{len(documents)} documents")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+Compare HTML extraction backends.
+
+Each backend runs over the fixture corpus in its own child process so that
+peak memory is measured in isolation. Reports wall time, peak RSS growth,
+peak Python heap (tracemalloc) and how similar each backend's markdown is
+to the bs4 reference output.
+
+Usage: python -m benchmarks.bench_extraction_backends [--corpus DIR] [--repeat 10]
+"""
+import os
+import sys
+import time
+import difflib
+import argparse
+import resource
+import tracemalloc
+import multiprocessing
+
+from benchmarks.bench_extraction import DEFAULT_CORPUS, load_corpus
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KB (ru_maxrss is bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def run_backend(name, corpus, repeat, queue):
+    """Child process: time one backend and record its memory use"""
+    from app.extraction import get_backend
+    backend = get_backend(name)
+
+    # Warm up imports and the parser before taking the baseline
+    backend.extract(corpus[0][1])
+    rss_before = peak_rss_kb()
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    outputs = []
+    for _ in range(repeat):
+        outputs = [backend.extract(raw) or '' for _, raw in corpus]
+    elapsed = time.perf_counter() - started
+    _, heap_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    queue.put({
+        'backend': backend.name,
+        'elapsed': elapsed,
+        'rss_kb': peak_rss_kb() - rss_before,
+        'heap_kb': heap_peak // 1024,
+        'outputs': outputs,
+    })
+
+
+def measure(name, corpus, repeat):
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=run_backend, args=(name, corpus, repeat, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help='Directory of saved article HTML')
+    parser.add_argument('--repeat', type=int, default=10, help='Times the corpus is processed per backend')
+    parser.add_argument('--backends', default='bs4,lxml', help='Comma-separated backends; the first is the reference')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        print(f"No HTML files found in {args.corpus}")
+        return 1
+
+    names = [name.strip() for name in args.backends.split(',') if name.strip()]
+    results = [measure(name, corpus, args.repeat) for name in names]
+    reference = results[0]
+
+    documents = len(corpus) * args.repeat
+    print(f"{len(corpus)} documents x {args.repeat} runs per backend")
+    print()
+    print(f"{'backend':<8} {'seconds':>9} {'docs/s':>9} {'peak RSS +KB':>13} {'peak heap KB':>13} {'min sim':>8} {'mean sim':>9}")
+    for result in results:
+        similarities = [
+            difflib.SequenceMatcher(None, ref, out, autojunk=False).ratio() if ref or out else 1.0
+            for ref, out in zip(reference['outputs'], result['outputs'])
+        ]
+        print(f"{result['backend']:<8} {result['elapsed']:>9.3f} {documents / result['elapsed']:>9.1f} "
+              f"{result['rss_kb']:>13} {result['heap_kb']:>13} "
+              f"{min(similarities):>8.3f} {sum(similarities) / len(similarities):>9.3f}")
+
+    print("\nSimilarity is against the first backend's markdown (1.000 = identical).")
+    print("Peak heap only covers Python allocations; lxml's C parser shows up in peak RSS.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
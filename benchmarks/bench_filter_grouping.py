@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""
+Benchmark grouped filter prompts against one request per article.
+
+Runs filter_articles_grouped on short RSS-style summaries for several
+group sizes against a simulated model. The simulator counts the tokens of
+every request and answer and turns them into latency and cost, so the
+numbers show how much of each request is fixed overhead. No API calls are
+made; adjust the latency and price options to match your model.
+
+Usage: python -m benchmarks.bench_filter_grouping [--articles 200] [--sizes 1,5,10,20]
+"""
+import os
+import re
+import sys
+import random
+import shutil
+import argparse
+import tempfile
+
+THREAT_WORDS = ['ransomware', 'backdoor', 'phishing', 'exploit', 'botnet', 'zero-day', 'infostealer']
+FILLER_WORDS = ['update', 'release', 'company', 'customers', 'security', 'platform', 'report', 'team',
+                'new', 'week', 'announced', 'cloud', 'service', 'industry', 'data', 'users', 'today']
+
+
+def build_summaries(count, seed=7):
+    """Short RSS-style summaries; about a third mention a threat"""
+    rng = random.Random(seed)
+    summaries = []
+    for i in range(count):
+        words = [rng.choice(FILLER_WORDS) for _ in range(rng.randint(40, 80))]
+        if i % 3 == 0:
+            words[rng.randrange(len(words))] = rng.choice(THREAT_WORDS)
+        summaries.append(f"Item {i}: " + ' '.join(words) + '.')
+    return summaries
+
+
+class SimulatedModel:
+    """Stands in for call_openai: answers deterministically and accounts tokens, latency and cost"""
+
+    ITEM = re.compile(r'^\[(\d+)\] (.*)$', re.MULTILINE)
+
+    def __init__(self, args, count_tokens):
+        self.args = args
+        self.count_tokens = count_tokens
+        self.rng = random.Random(11)
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.seconds = 0.0
+
+    @staticmethod
+    def verdict(text):
+        return 'KEEP' if any(word in text for word in THREAT_WORDS) else 'DISCARD'
+
+    def __call__(self, model, messages, api_key, max_tokens=500):
+        prompt = messages[-1]['content']
+        items = self.ITEM.findall(prompt)
+        if items:
+            # Occasionally leave an item out to exercise the single-request fallback
+            lines = [f"{number}: {self.verdict(text)}" for number, text in items
+                     if self.rng.random() >= self.args.drop_rate]
+            answer = '\n'.join(lines)
+        else:
+            answer = self.verdict(prompt)
+
+        # Each message carries a few tokens of framing on top of its content
+        input_tokens = sum(self.count_tokens(message['content']) + 4 for message in messages)
+        output_tokens = max(1, self.count_tokens(answer))
+        self.requests += 1
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.seconds += (self.args.request_latency
+                         + input_tokens * self.args.input_latency
+                         + output_tokens * self.args.output_latency)
+        return answer
+
+    def cost(self):
+        return (self.input_tokens * self.args.input_price + self.output_tokens * self.args.output_price) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--articles', type=int, default=200, help='Articles to classify per group size')
+    parser.add_argument('--sizes', default='1,5,10,20', help='Comma-separated group sizes to compare')
+    parser.add_argument('--request-latency', type=float, default=0.5, help='Fixed seconds per request')
+    parser.add_argument('--input-latency', type=float, default=0.0001, help='Seconds per input token')
+    parser.add_argument('--output-latency', type=float, default=0.015, help='Seconds per output token')
+    parser.add_argument('--input-price', type=float, default=0.50, help='Dollars per million input tokens')
+    parser.add_argument('--output-price', type=float, default=1.50, help='Dollars per million output tokens')
+    parser.add_argument('--drop-rate', type=float, default=0.02, help='Fraction of grouped verdicts the model leaves out')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='cti_bench_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    # Every article should reach the model: no cache hits, no local decisions
+    os.environ['LLM_CACHE_MAX_ENTRIES'] = '0'
+    os.environ['PREFILTER_ENABLED'] = '0'
+
+    from app import create_app, db
+    from app.models import Feed, Article, Prompt
+    from app import feed_processor
+    from app.prompt_budget import count_tokens
+
+    app = create_app(init_scheduler=False)
+    try:
+        with app.app_context():
+            run(args, db, Feed, Article, Prompt, feed_processor, count_tokens)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+def run(args, db, Feed, Article, Prompt, feed_processor, count_tokens):
+    """Classify the same articles with each group size and report throughput and cost"""
+    feed = Feed(name='bench', url='https://example.com/bench.xml')
+    db.session.add(feed)
+    db.session.commit()
+    summaries = build_summaries(args.articles)
+    db.session.add_all(Article(title=f"Article {i}", url=f"https://example.com/{i}", content=text, feed_id=feed.id)
+                       for i, text in enumerate(summaries))
+    db.session.commit()
+    articles = Article.query.order_by(Article.id).all()
+    expected = {article.id: SimulatedModel.verdict(article.content) for article in articles}
+    filter_prompt = Prompt.query.filter_by(name='filter_prompt').first()
+
+    model = SimulatedModel(args, count_tokens)
+    feed_processor.call_openai = model
+    results = []
+    for size in [int(size) for size in args.sizes.split(',') if size.strip()]:
+        model.reset()
+        verdicts = feed_processor.filter_articles_grouped(articles, filter_prompt, 'sk-bench', size)
+        correct = sum(1 for article_id, verdict in verdicts.items() if expected[article_id] == verdict)
+        results.append((size, model.requests, model.input_tokens, model.output_tokens,
+                        model.seconds, model.cost(), len(verdicts), correct))
+
+    print()
+    print(f"Filter stage on {args.articles} short summaries (simulated model, sequential requests)")
+    print(f"{'group':>6} {'requests':>9} {'in tok':>9} {'out tok':>8} {'art/min':>9} {'art/$':>10} {'correct':>8}")
+    for size, requests, input_tokens, output_tokens, seconds, cost, classified, correct in results:
+        per_minute = classified / seconds * 60 if seconds else 0
+        per_dollar = classified / cost if cost else 0
+        print(f"{size:>6} {requests:>9} {input_tokens:>9} {output_tokens:>8} "
+              f"{per_minute:>9.0f} {per_dollar:>10.0f} {correct:>5}/{classified}")
+    if len(results) > 1 and results[0][5]:
+        best = max(results[1:], key=lambda row: row[6] / row[5] if row[5] else 0)
+        print(f"\nGroup size {best[0]}: {results[0][5] / best[5]:.1f}x cheaper and "
+              f"{results[0][4] / best[4]:.1f}x faster than one request per article")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+Benchmark feed ingest against a large article table.
+
+Compares the set-based duplicate check and bulk insert used by
+apply_feed_data with the previous per-entry query loop.
+
+Usage: python -m benchmarks.bench_ingest [--articles 100000] [--entries 500]
+"""
+import os
+import sys
+import time
+import uuid
+import shutil
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from feedparser import FeedParserDict
+
+
+def build_feed_data(count, existing_every=0):
+    """Build a fake parsed feed with count entries.
+
+    When existing_every is N > 0, every Nth entry refers to an article that is
+    already in the seeded table so the duplicate path is exercised too.
+    """
+    entries = []
+    for i in range(count):
+        if existing_every and i % existing_every == 0:
+            link, title = f"https://example.com/seed/{i}", f"Seed article {i}"
+        else:
+            link, title = f"https://example.com/new/{uuid.uuid4()}", f"New article {uuid.uuid4()}"
+        entries.append(FeedParserDict(
+            title=title,
+            link=link,
+            published=(datetime(2024, 1, 1) + timedelta(minutes=i)).strftime('%a, %d %b %Y %H:%M:%S GMT'),
+            summary=f"Summary of {title}"
+        ))
+    return FeedParserDict(status=200, entries=entries)
+
+
+def seed_articles(db, Article, feed_id, count):
+    """Insert count articles in large batches"""
+    batch = []
+    for i in range(count):
+        link, title = f"https://example.com/seed/{i}", f"Seed article {i}"
+        batch.append({
+            'guid': str(uuid.uuid5(uuid.NAMESPACE_URL, f"{link}|{title}")),
+            'title': title,
+            'url': link,
+            'content': 'x' * 200,
+            'feed_id': feed_id
+        })
+        if len(batch) == 10000:
+            db.session.execute(Article.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(Article.__table__.insert(), batch)
+    db.session.commit()
+
+
+def legacy_apply(db, Article, feed, feed_data):
+    """The previous implementation: one OR query and one add per entry"""
+    from dateutil import parser as date_parser
+    new_articles = 0
+    for entry in feed_data.entries:
+        article_guid = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{entry.link}|{entry.title}"))
+        existing = Article.query.filter(
+            (Article.guid == article_guid) |
+            (Article.url == entry.link) |
+            (Article.title == entry.title)
+        ).first()
+        if existing:
+            continue
+        article = Article(guid=article_guid, title=entry.title, url=entry.link,
+                          published=date_parser.parse(entry.published), feed_id=feed.id,
+                          content=entry.summary)
+        db.session.add(article)
+        new_articles += 1
+    db.session.commit()
+    return new_articles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--articles', type=int, default=100000, help='Articles seeded into the table')
+    parser.add_argument('--entries', type=int, default=500, help='Entries in the benchmark feed')
+    parser.add_argument('--existing-every', type=int, default=5, help='Every Nth entry is already known (0 = none)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='cti_bench_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from app import create_app, db
+    from app.models import Feed, Article
+    from app.feed_processor import apply_feed_data
+
+    app = create_app(init_scheduler=False)
+    try:
+        with app.app_context():
+            run(args, db, Feed, Article, apply_feed_data)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+def run(args, db, Feed, Article, apply_feed_data):
+    """Seed the table, then time both ingest methods on fresh feeds"""
+    feeds = [Feed(name=name, url=f"https://example.com/{name}.xml") for name in ('seed', 'legacy', 'bulk')]
+    db.session.add_all(feeds)
+    db.session.commit()
+
+    print(f"Seeding {args.articles} articles...")
+    started = time.perf_counter()
+    seed_articles(db, Article, feeds[0].id, args.articles)
+    print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+    results = []
+    for label, feed, func in (('per-entry queries', feeds[1], legacy_apply), ('set-based bulk', feeds[2], None)):
+        feed_data = build_feed_data(args.entries, args.existing_every)
+        before = Article.query.count()
+        started = time.perf_counter()
+        if func:
+            func(db, Article, feed, feed_data)
+        else:
+            apply_feed_data(feed, feed_data)
+        elapsed = time.perf_counter() - started
+        inserted = Article.query.count() - before
+        results.append((label, elapsed, inserted))
+
+    print()
+    print(f"Ingest of a {args.entries}-entry feed into a {args.articles}-article table")
+    print(f"{'method':<20} {'seconds':>10} {'inserted':>10} {'entries/s':>12}")
+    for label, elapsed, inserted in results:
+        print(f"{label:<20} {elapsed:>10.3f} {inserted:>10} {args.entries / elapsed:>12.0f}")
+    if results[1][1] > 0:
+        print(f"\nSpeed-up: {results[0][1] / results[1][1]:.1f}x")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+"""
+Benchmark peak memory of process_pending_articles against the article table size.
+
+For each table size a database is seeded with that many processed articles
+(content and summary filled in, like a real archive) plus a fixed number of
+pending ones. A fresh process then runs process_pending_articles against the
+local mock LLM server and reports its peak RSS over the RSS it had before
+the run. With --full-load the cost of materialising every processed row as
+an ORM object, which the duplicate check used to do on every run, is
+measured in another fresh process for comparison.
+
+Usage: python -m benchmarks.bench_pending_memory [--sizes 1000,10000,50000] [--pending 200]
+"""
+import os
+import sys
+import json
+import uuid
+import random
+import shutil
+import logging
+import argparse
+import resource
+import tempfile
+import multiprocessing
+
+from benchmarks.mock_llm_server import MockLLMServer
+from benchmarks.bench_pipeline import FILLER_WORDS, THREAT_WORDS
+
+SEED_BATCH = 5000
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def current_rss_mb():
+    import psutil
+    return psutil.Process().memory_info().rss / 1024 / 1024
+
+
+def make_app(database_url, base_url):
+    os.environ.update({
+        'DATABASE_URL': database_url,
+        'LLM_BASE_URL': base_url,
+        'LLM_DEFAULT_RPM': '100000',
+        'LLM_DEFAULT_TPM': '100000000',
+        'LLM_CACHE_MAX_ENTRIES': '0',
+        'PREFILTER_ENABLED': '0',
+        'NEAR_DUP_THRESHOLD': '0',
+    })
+    logging.disable(logging.WARNING)
+    from app import create_app
+    return create_app(init_scheduler=False)
+
+
+def seed(database_url, processed, pending, content_chars):
+    """Child process: fill a fresh database"""
+    from app import db
+    from app.models import Feed, Article, Settings
+    app = make_app(database_url, '')
+    rng = random.Random(7)
+    paragraphs = [' '.join(rng.choice(FILLER_WORDS + THREAT_WORDS) for _ in range(80)) + '.' for _ in range(200)]
+
+    def content(index):
+        text = f"Article {index}.\n\n"
+        while len(text) < content_chars:
+            text += rng.choice(paragraphs) + '\n\n'
+        return text
+
+    summary = json.dumps({"summary": ' '.join(paragraphs[0].split()[:60]), "tags": ["cti"], "ttp": [],
+                          "threat_groups": [], "iocs": {"ips": [], "domains": []}, "filtered_out": False})
+    with app.app_context():
+        settings = Settings.query.first()
+        settings.openai_api_key = 'sk-mock'
+        settings.joplin_enabled = False
+        feed = Feed(name='bench', url='https://example.com/bench.xml')
+        db.session.add(feed)
+        db.session.commit()
+
+        rows = []
+        for index in range(processed + pending):
+            done = index < processed
+            rows.append({
+                'guid': str(uuid.uuid4()),
+                'title': f"Article {index}",
+                'url': f"https://example.com/{index}",
+                'content': content(index),
+                'summary': summary if done else None,
+                'processed': done,
+                'feed_id': feed.id,
+            })
+            if len(rows) == SEED_BATCH:
+                db.session.execute(Article.__table__.insert(), rows)
+                rows = []
+        if rows:
+            db.session.execute(Article.__table__.insert(), rows)
+        db.session.commit()
+
+
+def measure(database_url, base_url, full_load, results):
+    """Child process: peak RSS of one process_pending_articles run, or of the old full-row load"""
+    from app import db
+    from app.models import Article
+    from app.feed_processor import process_pending_articles
+    app = make_app(database_url, base_url)
+    with app.app_context():
+        db.session.execute(db.text('SELECT 1'))
+        before = current_rss_mb()
+        if full_load:
+            rows = len(Article.query.filter_by(processed=True).all())
+            done = rows
+        else:
+            process_pending_articles()
+            done = Article.query.filter(Article.summary.isnot(None), Article.processed == True).count()
+    results.put({'before': before, 'peak': peak_rss_mb(), 'done': done})
+
+
+def run_child(context, target, *args):
+    results = context.Queue()
+    process = context.Process(target=target, args=args + (results,))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,50000', help='Comma-separated counts of processed articles')
+    parser.add_argument('--pending', type=int, default=200, help='Pending articles processed in each run')
+    parser.add_argument('--content-chars', type=int, default=3000, help='Characters of content per article')
+    parser.add_argument('--full-load', action='store_true',
+                        help='Also measure loading every processed row as an ORM object (the old duplicate check)')
+    args = parser.parse_args()
+
+    server = MockLLMServer(latency=0.0, jitter=0.0, seed=1).start()
+    context = multiprocessing.get_context('spawn')
+    workdir = tempfile.mkdtemp(prefix='cti_bench_')
+    rows = []
+    try:
+        for size in (int(value) for value in args.sizes.split(',') if value.strip()):
+            database_url = f"sqlite:///{os.path.join(workdir, f'bench_{size}.db')}"
+            seeder = context.Process(target=seed, args=(database_url, size, args.pending, args.content_chars))
+            seeder.start()
+            seeder.join()
+
+            run = run_child(context, measure, database_url, server.base_url, False)
+            full = run_child(context, measure, database_url, server.base_url, True) if args.full_load else None
+            rows.append((size, run, full))
+            os.remove(os.path.join(workdir, f'bench_{size}.db'))
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print()
+    print(f"Peak RSS of process_pending_articles with {args.pending} pending articles "
+          f"({args.content_chars} characters of content each)")
+    header = f"{'processed rows':>15} {'RSS before':>11} {'peak':>9} {'growth':>9} {'done':>6}"
+    if args.full_load:
+        header += f" {'full load growth':>17}"
+    print(header)
+    for size, run, full in rows:
+        line = (f"{size:>15} {run['before']:>9.1f}MB {run['peak']:>7.1f}MB "
+                f"{run['peak'] - run['before']:>7.1f}MB {run['done'] - size:>6}")
+        if full:
+            line += f" {full['peak'] - full['before']:>15.1f}MB"
+        print(line)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
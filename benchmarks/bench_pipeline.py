@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""
+Benchmark process_pending_articles end to end against the local mock LLM server.
+
+Starts benchmarks.mock_llm_server in the background, points the app at it
+through LLM_BASE_URL and processes the same number of synthetic articles
+once per worker count. Everything real runs: the worker pool, rate
+limiters, timeouts, retries, the filter and parse stages and the database
+writes; only the model is simulated. Use the server options to add
+latency, slow requests, 5xx errors, 429 responses and almost-JSON answers.
+
+Usage: python -m benchmarks.bench_pipeline [--articles 200] [--workers 1,4,8] [--latency 0.5]
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import logging
+import argparse
+import tempfile
+
+from benchmarks.mock_llm_server import add_server_arguments, server_from_args
+
+THREAT_WORDS = ['ransomware', 'backdoor', 'phishing', 'exploit', 'botnet', 'zero-day', 'infostealer']
+FILLER_WORDS = ['update', 'release', 'company', 'customers', 'security', 'platform', 'report', 'team',
+                'new', 'week', 'announced', 'cloud', 'service', 'industry', 'data', 'users', 'today']
+
+
+def build_content(rng, index):
+    """A few paragraphs of article text, unique per article"""
+    paragraphs = []
+    for _ in range(rng.randint(3, 8)):
+        words = [rng.choice(FILLER_WORDS + THREAT_WORDS[:2]) for _ in range(rng.randint(40, 120))]
+        paragraphs.append(' '.join(words) + '.')
+    return f"Article {index} {rng.random():.12f}.\n\n" + '\n\n'.join(paragraphs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--articles', type=int, default=200, help='Articles to process per run')
+    parser.add_argument('--workers', default='1,4,8', help='Comma-separated LLM_WORKERS values to compare')
+    parser.add_argument('--group-size', type=int, default=1, help='FILTER_GROUP_SIZE for every run')
+    parser.add_argument('--rpm', type=int, default=100000, help='Requests per minute allowed per model')
+    parser.add_argument('--tpm', type=int, default=100000000, help='Tokens per minute allowed per model')
+    parser.add_argument('--verbose', action='store_true', help='Show the application log')
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = server_from_args(args).start()
+    workdir = tempfile.mkdtemp(prefix='cti_bench_')
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'LLM_BASE_URL': server.base_url,
+        'LLM_DEFAULT_RPM': str(args.rpm),
+        'LLM_DEFAULT_TPM': str(args.tpm),
+        'FILTER_GROUP_SIZE': str(args.group_size),
+        # Every article should reach the model: no cache hits, no local decisions, no reuse
+        'LLM_CACHE_MAX_ENTRIES': '0',
+        'PREFILTER_ENABLED': '0',
+        'NEAR_DUP_THRESHOLD': '0',
+    })
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+
+    from app import create_app, db, llm_client, structured_output
+    from app.models import Feed, Article, Settings
+    from app.feed_processor import process_pending_articles
+
+    app = create_app(init_scheduler=False)
+    try:
+        with app.app_context():
+            run(args, app, server, db, llm_client, structured_output, Feed, Article, Settings, process_pending_articles)
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+def run(args, app, server, db, llm_client, structured_output, Feed, Article, Settings, process_pending_articles):
+    """Process a fresh set of articles with each worker count and report throughput"""
+    settings = Settings.query.first()
+    settings.openai_api_key = 'sk-mock'
+    settings.joplin_enabled = False
+    feed = Feed(name='bench', url='https://example.com/bench.xml')
+    db.session.add(feed)
+    db.session.commit()
+
+    rng = random.Random(5)
+    results = []
+    for run_index, workers in enumerate(int(value) for value in args.workers.split(',') if value.strip()):
+        db.session.add_all(
+            Article(title=f"Run {run_index} article {i}", url=f"https://example.com/{run_index}/{i}",
+                    content=build_content(rng, i), feed_id=feed.id)
+            for i in range(args.articles)
+        )
+        db.session.commit()
+
+        app.config['LLM_WORKERS'] = workers
+        before = server.stats()
+        started = time.perf_counter()
+        process_pending_articles()
+        seconds = time.perf_counter() - started
+        after = server.stats()
+
+        db.session.expire_all()
+        done = Article.query.filter(Article.url.like(f"https://example.com/{run_index}/%"),
+                                    Article.summary.isnot(None)).count()
+        delta = {key: after[key] - before[key] for key in ('requests', 'errors', 'rate_limited')}
+        results.append((workers, seconds, done, delta, after['max_in_flight']))
+
+    latency = llm_client.stats()
+    print()
+    print(f"process_pending_articles on {args.articles} articles against the mock LLM server "
+          f"({args.latency}s + up to {args.jitter}s per request, group size {args.group_size})")
+    print(f"{'workers':>8} {'seconds':>8} {'art/min':>8} {'done':>9} {'requests':>9} {'5xx':>5} {'429':>5}")
+    for workers, seconds, done, delta, _ in results:
+        print(f"{workers:>8} {seconds:>8.1f} {done / seconds * 60:>8.0f} {done:>5}/{args.articles:<3} "
+              f"{delta['requests']:>9} {delta['errors']:>5} {delta['rate_limited']:>5}")
+    print(f"\nMost requests in flight at once: {results[-1][4] if results else 0}")
+    for model, histogram in latency.items():
+        print(f"{model}: {histogram['count']} calls, p50 {histogram['p50']}s, p95 {histogram['p95']}s, "
+              f"{histogram['errors']} errors")
+    parse = structured_output.stats()
+    print(f"Parse answers: {parse['valid']} valid, {parse['repaired']} repaired locally, {parse['failed']} unusable")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+"""
+Local stand-in for the OpenAI chat completions API.
+
+Answers POST /v1/chat/completions in the OpenAI wire format with canned
+answers: KEEP/DISCARD for filter prompts (one numbered line per article for
+grouped prompts) and a JSON summary for parse prompts, optionally sent as
+almost-JSON (fenced, trailing commas, cut off) unless JSON mode is requested. Verdicts depend only
+on the article text, so repeated runs classify the same articles the same
+way. Latency, 5xx errors and 429 responses are injected at configurable
+rates so throughput, retries, hedging and rate limiting can be exercised
+without an API key.
+
+Point the app at it with LLM_BASE_URL, e.g.:
+
+    python -m benchmarks.mock_llm_server --port 8099 --latency 0.5 --error-rate 0.02
+    LLM_BASE_URL=http://127.0.0.1:8099/v1 python run_process_articles.py
+
+GET /stats returns the request counters.
+
+Usage: python -m benchmarks.mock_llm_server [--port 8099] [--latency 0.5] [--keep-rate 0.4]
+"""
+import re
+import sys
+import json
+import time
+import zlib
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ITEM = re.compile(r'^\[(\d+)\] ', re.MULTILINE)
+ARTICLE = re.compile(r'Article:\s*(.*)', re.DOTALL)
+
+
+def verdict(text, keep_rate):
+    """KEEP for a stable keep_rate share of article texts"""
+    return 'KEEP' if zlib.crc32(text.encode('utf-8')) % 1000 < keep_rate * 1000 else 'DISCARD'
+
+
+def grouped_items(prompt):
+    """(number, text) of each article in a grouped filter prompt"""
+    matches = list(ITEM.finditer(prompt))
+    items = []
+    for index, match in enumerate(matches):
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(prompt)
+        items.append((int(match.group(1)), prompt[match.end():end].strip()))
+    return items
+
+
+def parse_answer(text):
+    """A JSON summary shaped like the answers the parse prompt asks for"""
+    sentence = re.split(r'(?<=[.!?])\s', text.strip(), maxsplit=1)[0][:300]
+    return json.dumps({
+        "summary": sentence or "No summary available",
+        "tags": ["cti", "mock"],
+        "iocs": {"ips": [], "domains": [], "md5": [], "sha1": [], "sha256": []},
+        "ttp": [],
+        "threat_groups": [],
+    })
+
+
+def malformed(text, rng):
+    """Almost-JSON the way models get it wrong: fenced, with trailing commas, or cut off"""
+    kind = rng.choice(('fence', 'trailing_comma', 'truncated', 'prose'))
+    if kind == 'fence':
+        return f"```json\n{text}\n```"
+    if kind == 'trailing_comma':
+        return text.replace(']', ',]').replace('}', ',}')
+    if kind == 'truncated':
+        return text[:rng.randint(len(text) // 2, len(text) - 2)]
+    return f"Here is the extracted information:\n{text}\nLet me know if you need more."
+
+
+def answer(prompt, keep_rate):
+    """Canned answer for the last user message of a request"""
+    items = grouped_items(prompt)
+    if items:
+        return '\n'.join(f"{number}: {verdict(text, keep_rate)}" for number, text in items)
+    match = ARTICLE.search(prompt)
+    article = match.group(1) if match else prompt
+    if 'KEEP' in prompt and 'DISCARD' in prompt:
+        return verdict(article, keep_rate)
+    return parse_answer(article)
+
+
+class MockLLMServer:
+    """Threaded HTTP server answering chat completion requests with canned responses"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.5, jitter=0.2, token_latency=0.0,
+                 slow_rate=0.0, slow_latency=10.0, error_rate=0.0, rate_limit_rate=0.0,
+                 keep_rate=0.4, malformed_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.token_latency = token_latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.keep_rate = keep_rate
+        self.malformed_rate = malformed_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters = {'requests': 0, 'answered': 0, 'errors': 0, 'rate_limited': 0, 'malformed': 0,
+                         'prompt_tokens': 0, 'completion_tokens': 0}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        """Serve from a background thread; returns the server"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='mock-llm', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def stats(self):
+        with self.lock:
+            result = dict(self.counters)
+            result['max_in_flight'] = self.max_in_flight
+        return result
+
+    def _draw(self):
+        """Outcome and delay of one request"""
+        with self.lock:
+            roll = self.rng.random()
+            slow = self.rng.random() < self.slow_rate
+            delay = self.latency + self.rng.uniform(0, self.jitter)
+        if slow:
+            delay += self.slow_latency
+        if roll < self.error_rate:
+            return 'error', delay
+        if roll < self.error_rate + self.rate_limit_rate:
+            return 'rate_limited', 0.0
+        return 'ok', delay
+
+    def _count(self, **increments):
+        with self.lock:
+            for key, value in increments.items():
+                self.counters[key] += value
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, body, headers=None):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.rstrip('/') == '/stats':
+                    self._send_json(200, server.stats())
+                else:
+                    self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b'{}')
+                except json.JSONDecodeError:
+                    self._send_json(400, {"error": {"message": "Invalid JSON", "type": "invalid_request_error"}})
+                    return
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+                    return
+
+                server._count(requests=1)
+                with server.lock:
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    self._complete(body)
+                finally:
+                    with server.lock:
+                        server.in_flight -= 1
+
+            def _complete(self, body):
+                outcome, delay = server._draw()
+                if outcome == 'rate_limited':
+                    server._count(rate_limited=1)
+                    self._send_json(429, {"error": {"message": "Rate limit reached (mock)", "type": "requests",
+                                                    "code": "rate_limit_exceeded"}},
+                                    headers={'Retry-After': '1'})
+                    return
+
+                messages = body.get('messages') or []
+                prompt = next((m.get('content') or '' for m in reversed(messages) if m.get('role') == 'user'), '')
+                content = answer(prompt, server.keep_rate)
+                # JSON mode and structured outputs always return valid JSON
+                if content.startswith('{') and not body.get('response_format'):
+                    with server.lock:
+                        broken = server.rng.random() < server.malformed_rate
+                        if broken:
+                            content = malformed(content, server.rng)
+                    if broken:
+                        server._count(malformed=1)
+                # Same 4-characters-per-token estimate the app uses without tiktoken
+                prompt_tokens = sum(len(m.get('content') or '') for m in messages) // 4 + 4 * len(messages)
+                completion_tokens = max(1, len(content) // 4)
+                time.sleep(delay + completion_tokens * server.token_latency)
+
+                if outcome == 'error':
+                    server._count(errors=1)
+                    self._send_json(500, {"error": {"message": "Internal server error (mock)", "type": "server_error"}})
+                    return
+
+                server._count(answered=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+                self._send_json(200, {
+                    "id": f"chatcmpl-mock-{time.monotonic_ns()}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get('model', 'mock'),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    },
+                })
+
+        return Handler
+
+
+def add_server_arguments(parser):
+    """Options shared by the standalone server and benchmarks that start one"""
+    parser.add_argument('--latency', type=float, default=0.5, help='Base seconds per request')
+    parser.add_argument('--jitter', type=float, default=0.2, help='Random extra seconds per request (uniform)')
+    parser.add_argument('--token-latency', type=float, default=0.0, help='Extra seconds per answer token')
+    parser.add_argument('--slow-rate', type=float, default=0.0, help='Fraction of requests that take --slow-latency longer')
+    parser.add_argument('--slow-latency', type=float, default=10.0, help='Extra seconds of a slow request')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with a 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of requests answered with a 429')
+    parser.add_argument('--keep-rate', type=float, default=0.4, help='Fraction of articles the filter keeps')
+    parser.add_argument('--malformed-rate', type=float, default=0.0,
+                        help='Fraction of JSON answers sent as almost-JSON when no response_format is requested')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for latency and error injection')
+
+
+def server_from_args(args, host='127.0.0.1', port=0):
+    return MockLLMServer(
+        host=host, port=port, latency=args.latency, jitter=args.jitter, token_latency=args.token_latency,
+        slow_rate=args.slow_rate, slow_latency=args.slow_latency, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, keep_rate=args.keep_rate, malformed_rate=args.malformed_rate,
+        seed=args.seed
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=8099, help='Port to listen on')
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = server_from_args(args, host=args.host, port=args.port)
+    print(f"Mock LLM server listening on {server.base_url} (set LLM_BASE_URL to this)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(json.dumps(server.stats()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
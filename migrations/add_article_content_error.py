@@ -0,0 +1,12 @@
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    """Add content_error column to Article table"""
+    with op.batch_alter_table('article') as batch_op:
+        batch_op.add_column(sa.Column('content_error', sa.String(255), nullable=True))
+
+def downgrade():
+    """Remove content_error column from Article table"""
+    with op.batch_alter_table('article') as batch_op:
+        batch_op.drop_column('content_error')
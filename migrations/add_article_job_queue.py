@@ -0,0 +1,29 @@
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    """Create the article_job lease queue and drop the processing flags it replaces"""
+    op.create_table(
+        'article_job',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('article_id', sa.Integer(), sa.ForeignKey('article.id', ondelete='CASCADE'), nullable=False, unique=True),
+        sa.Column('locked_by', sa.String(64), nullable=True),
+        sa.Column('locked_until', sa.DateTime(), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.Column('claims', sa.Integer(), nullable=True, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=True)
+    )
+    op.create_index('ix_article_job_locked_until', 'article_job', ['locked_until'])
+
+    with op.batch_alter_table('article') as batch_op:
+        batch_op.drop_column('processing_started')
+        batch_op.drop_column('processing')
+
+def downgrade():
+    """Restore the processing flags and drop the article_job table"""
+    with op.batch_alter_table('article') as batch_op:
+        batch_op.add_column(sa.Column('processing', sa.Boolean(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('processing_started', sa.DateTime(), nullable=True))
+
+    op.drop_index('ix_article_job_locked_until', table_name='article_job')
+    op.drop_table('article_job')
@@ -0,0 +1,31 @@
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    """Add MinHash signature and canonical article columns to Article table, and the LSH bucket table"""
+    with op.batch_alter_table('article') as batch_op:
+        batch_op.add_column(sa.Column('content_signature', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('canonical_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_article_canonical_id', 'article', ['canonical_id'], ['id'], ondelete='SET NULL')
+        batch_op.create_index('ix_article_canonical_id', ['canonical_id'])
+    
+    op.create_table(
+        'article_lsh_bucket',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('bucket', sa.String(16), nullable=False),
+        sa.Column('article_id', sa.Integer(), sa.ForeignKey('article.id', ondelete='CASCADE'), nullable=False)
+    )
+    op.create_index('ix_article_lsh_bucket_bucket', 'article_lsh_bucket', ['bucket'])
+    op.create_index('ix_article_lsh_bucket_article_id', 'article_lsh_bucket', ['article_id'])
+
+def downgrade():
+    """Remove the LSH bucket table and the near-duplicate columns from Article table"""
+    op.drop_index('ix_article_lsh_bucket_article_id', table_name='article_lsh_bucket')
+    op.drop_index('ix_article_lsh_bucket_bucket', table_name='article_lsh_bucket')
+    op.drop_table('article_lsh_bucket')
+    
+    with op.batch_alter_table('article') as batch_op:
+        batch_op.drop_index('ix_article_canonical_id')
+        batch_op.drop_constraint('fk_article_canonical_id', type_='foreignkey')
+        batch_op.drop_column('canonical_id')
+        batch_op.drop_column('content_signature')
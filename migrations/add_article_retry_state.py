@@ -0,0 +1,24 @@
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    """Add retry scheduling and dead-letter columns to Article table"""
+    with op.batch_alter_table('article') as batch_op:
+        batch_op.add_column(sa.Column('attempts', sa.Integer(), nullable=True, server_default='0'))
+        batch_op.add_column(sa.Column('next_attempt_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('error_class', sa.String(30), nullable=True))
+        batch_op.add_column(sa.Column('last_error', sa.String(255), nullable=True))
+        batch_op.add_column(sa.Column('dead_lettered_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_article_next_attempt_at', ['next_attempt_at'])
+        batch_op.create_index('ix_article_dead_lettered_at', ['dead_lettered_at'])
+
+def downgrade():
+    """Remove the retry scheduling and dead-letter columns from Article table"""
+    with op.batch_alter_table('article') as batch_op:
+        batch_op.drop_index('ix_article_dead_lettered_at')
+        batch_op.drop_index('ix_article_next_attempt_at')
+        batch_op.drop_column('dead_lettered_at')
+        batch_op.drop_column('last_error')
+        batch_op.drop_column('error_class')
+        batch_op.drop_column('next_attempt_at')
+        batch_op.drop_column('attempts')
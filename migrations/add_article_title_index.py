@@ -0,0 +1,9 @@
+from alembic import op
+
+def upgrade():
+    """Index Article.title so bulk duplicate checks by title avoid a table scan"""
+    op.create_index('ix_article_title', 'article', ['title'])
+
+def downgrade():
+    """Remove the Article.title index"""
+    op.drop_index('ix_article_title', table_name='article')
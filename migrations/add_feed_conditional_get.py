@@ -0,0 +1,18 @@
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    """Add conditional GET validators and response counters to Feed table"""
+    with op.batch_alter_table('feed') as batch_op:
+        batch_op.add_column(sa.Column('etag', sa.String(255), nullable=True))
+        batch_op.add_column(sa.Column('modified', sa.String(100), nullable=True))
+        batch_op.add_column(sa.Column('fetched_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('not_modified_count', sa.Integer(), nullable=False, server_default='0'))
+
+def downgrade():
+    """Remove conditional GET columns from Feed table"""
+    with op.batch_alter_table('feed') as batch_op:
+        batch_op.drop_column('not_modified_count')
+        batch_op.drop_column('fetched_count')
+        batch_op.drop_column('modified')
+        batch_op.drop_column('etag')
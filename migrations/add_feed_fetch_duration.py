@@ -0,0 +1,12 @@
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    """Add last_fetch_duration column to Feed table"""
+    with op.batch_alter_table('feed') as batch_op:
+        batch_op.add_column(sa.Column('last_fetch_duration', sa.Float(), nullable=True))
+
+def downgrade():
+    """Remove last_fetch_duration column from Feed table"""
+    with op.batch_alter_table('feed') as batch_op:
+        batch_op.drop_column('last_fetch_duration')
@@ -0,0 +1,14 @@
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    """Add high-water mark columns to Feed table"""
+    with op.batch_alter_table('feed') as batch_op:
+        batch_op.add_column(sa.Column('last_entry_guid', sa.String(36), nullable=True))
+        batch_op.add_column(sa.Column('last_entry_published', sa.DateTime(), nullable=True))
+
+def downgrade():
+    """Remove high-water mark columns from Feed table"""
+    with op.batch_alter_table('feed') as batch_op:
+        batch_op.drop_column('last_entry_published')
+        batch_op.drop_column('last_entry_guid')
@@ -0,0 +1,14 @@
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    """Add adaptive polling columns to Feed table"""
+    with op.batch_alter_table('feed') as batch_op:
+        batch_op.add_column(sa.Column('poll_interval', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('next_check_at', sa.DateTime(), nullable=True))
+
+def downgrade():
+    """Remove adaptive polling columns from Feed table"""
+    with op.batch_alter_table('feed') as batch_op:
+        batch_op.drop_column('next_check_at')
+        batch_op.drop_column('poll_interval')
@@ -0,0 +1,24 @@
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    """Create the llm_response_cache table"""
+    op.create_table(
+        'llm_response_cache',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('key', sa.String(64), nullable=False, unique=True),
+        sa.Column('prompt_name', sa.String(50), nullable=False),
+        sa.Column('model', sa.String(50), nullable=False),
+        sa.Column('response', sa.Text(), nullable=False),
+        sa.Column('hits', sa.Integer(), nullable=True, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_used_at', sa.DateTime(), nullable=True)
+    )
+    op.create_index('ix_llm_response_cache_prompt_name', 'llm_response_cache', ['prompt_name'])
+    op.create_index('ix_llm_response_cache_last_used_at', 'llm_response_cache', ['last_used_at'])
+
+def downgrade():
+    """Drop the llm_response_cache table"""
+    op.drop_index('ix_llm_response_cache_last_used_at', table_name='llm_response_cache')
+    op.drop_index('ix_llm_response_cache_prompt_name', table_name='llm_response_cache')
+    op.drop_table('llm_response_cache')
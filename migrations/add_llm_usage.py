@@ -0,0 +1,25 @@
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    """Create the llm_usage table of model calls and their token counts"""
+    op.create_table(
+        'llm_usage',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('model', sa.String(50), nullable=False),
+        sa.Column('stage', sa.String(10), nullable=True),
+        sa.Column('prompt_tokens', sa.Integer(), nullable=True),
+        sa.Column('completion_tokens', sa.Integer(), nullable=True),
+        sa.Column('latency', sa.Float(), nullable=True),
+        sa.Column('article_id', sa.Integer(), sa.ForeignKey('article.id', ondelete='SET NULL'), nullable=True),
+        sa.Column('cache_hit', sa.Boolean(), nullable=True)
+    )
+    op.create_index('ix_llm_usage_created_at', 'llm_usage', ['created_at'])
+    op.create_index('ix_llm_usage_article_id', 'llm_usage', ['article_id'])
+
+def downgrade():
+    """Drop the llm_usage table"""
+    op.drop_index('ix_llm_usage_article_id', table_name='llm_usage')
+    op.drop_index('ix_llm_usage_created_at', table_name='llm_usage')
+    op.drop_table('llm_usage')
@@ -0,0 +1,14 @@
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    """Add the request id shared by the usage rows of one model call"""
+    with op.batch_alter_table('llm_usage') as batch_op:
+        batch_op.add_column(sa.Column('request_id', sa.String(32), nullable=True))
+    op.create_index('ix_llm_usage_request_id', 'llm_usage', ['request_id'])
+
+def downgrade():
+    """Remove the request id from llm_usage"""
+    op.drop_index('ix_llm_usage_request_id', table_name='llm_usage')
+    with op.batch_alter_table('llm_usage') as batch_op:
+        batch_op.drop_column('request_id')
@@ -0,0 +1,20 @@
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    """Create the prefilter_decision audit table"""
+    op.create_table(
+        'prefilter_decision',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('article_id', sa.Integer(), sa.ForeignKey('article.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('decision', sa.String(10), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('reasons', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True)
+    )
+    op.create_index('ix_prefilter_decision_article_id', 'prefilter_decision', ['article_id'])
+
+def downgrade():
+    """Drop the prefilter_decision audit table"""
+    op.drop_index('ix_prefilter_decision_article_id', table_name='prefilter_decision')
+    op.drop_table('prefilter_decision')
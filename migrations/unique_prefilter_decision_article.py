@@ -0,0 +1,16 @@
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    """Keep only the latest pre-filter decision per article and make article_id unique"""
+    op.execute(
+        "DELETE FROM prefilter_decision WHERE id NOT IN "
+        "(SELECT MAX(id) FROM prefilter_decision GROUP BY article_id)"
+    )
+    op.drop_index('ix_prefilter_decision_article_id', table_name='prefilter_decision')
+    op.create_index('ix_prefilter_decision_article_id', 'prefilter_decision', ['article_id'], unique=True)
+
+def downgrade():
+    """Allow several pre-filter decisions per article again"""
+    op.drop_index('ix_prefilter_decision_article_id', table_name='prefilter_decision')
+    op.create_index('ix_prefilter_decision_article_id', 'prefilter_decision', ['article_id'])
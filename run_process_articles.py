@@ -1,34 +1,174 @@
 #!/usr/bin/env python
 import os
 import sys
+import time
+import signal
 import logging
-from app import create_app
+import argparse
+import threading
+import multiprocessing
+from app import create_app, extraction
 from app.feed_processor import process_pending_articles
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Seconds a worker process is given to drain after SIGTERM before it is killed
+DRAIN_TIMEOUT = 600
+
+# A worker that dies within QUICK_FAILURE seconds of starting is restarted after
+# RESTART_BACKOFF seconds, doubling up to MAX_RESTART_BACKOFF with each quick
+# failure in a row; after MAX_QUICK_FAILURES in a row the supervisor gives up
+QUICK_FAILURE = 60
+RESTART_BACKOFF = 1
+MAX_RESTART_BACKOFF = 300
+MAX_QUICK_FAILURES = 5
+
+def apply_overrides(args):
+    """Pass the command line overrides to create_app (and worker processes) through the environment.
+
+    Must run before create_app, whose init_app calls size their thread pools
+    from LLM_WORKERS.
+    """
+    if args.concurrency:
+        os.environ['LLM_WORKERS'] = str(args.concurrency)
+    if args.claim_batch:
+        os.environ['JOB_CLAIM_BATCH'] = str(args.claim_batch)
+
+def run_worker(args):
+    """Worker process: keep claiming and processing batches of articles until SIGTERM or SIGINT.
+
+    The first signal drains the worker (in-flight articles finish, the rest
+    is released); the app is created here, never inherited from the parent.
+    """
+    logging.basicConfig(level=logging.INFO, force=True,
+                        format='%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s')
+    stop = threading.Event()
+
+    def _drain(signum, frame):
+        if not stop.is_set():
+            logger.info(f"Received signal {signum}, finishing in-flight articles")
+        stop.set()
+    signal.signal(signal.SIGTERM, _drain)
+    signal.signal(signal.SIGINT, _drain)
+
+    app = create_app(init_scheduler=False)
+    extraction.start_pool()
+    logger.info(f"Worker started with {app.config['LLM_WORKERS']} concurrent pipelines")
+
+    with app.app_context():
+        while not stop.is_set():
+            process_pending_articles(use_batch=args.batch, stop=stop)
+            # The queue was drained; new articles arrive with the next feed check
+            stop.wait(args.poll_interval)
+
+        from app import usage
+        usage.flush()
+    logger.info("Worker stopped")
+
+def run_workers(args):
+    """Supervise args.workers worker processes, restarting any that die, until SIGTERM or SIGINT.
+
+    Returns 1 if a worker kept dying right after starting (see MAX_QUICK_FAILURES).
+    """
+    # Several processes on one API key: each gets its share of the rate limits
+    share = float(os.environ.get('LLM_RATE_LIMIT_SHARE', 1))
+    os.environ['LLM_RATE_LIMIT_SHARE'] = str(share / args.workers)
+    # ... and of the CPU cores for HTML extraction, unless a pool size was set
+    if int(os.environ.get('EXTRACTION_WORKERS', 0)) == 0:
+        os.environ['EXTRACTION_WORKERS'] = str(max(1, (os.cpu_count() or 1) // args.workers))
+
+    # Every process builds its own app and database connections
+    context = multiprocessing.get_context('spawn')
+    stopping = threading.Event()
+
+    def _stop(signum, frame):
+        stopping.set()
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    def _start(number):
+        process = context.Process(target=run_worker, args=(args,), name=f"worker-{number}")
+        process.start()
+        return {'process': process, 'started': time.monotonic(), 'failures': 0, 'restart_at': None}
+
+    slots = {number: _start(number) for number in range(1, args.workers + 1)}
+    logger.info(f"Started {args.workers} worker processes with {args.concurrency or 'LLM_WORKERS'} concurrent pipelines each")
+
+    exit_code = 0
+    while exit_code == 0 and not stopping.wait(1):
+        now = time.monotonic()
+        for number, slot in slots.items():
+            process = slot['process']
+            if process is not None and not process.is_alive():
+                # Consecutive quick failures back off; a worker that ran a while starts over at RESTART_BACKOFF
+                failures = slot['failures'] + 1 if now - slot['started'] < QUICK_FAILURE else 0
+                if failures >= MAX_QUICK_FAILURES:
+                    logger.error(f"Worker {number} exited with code {process.exitcode} right after starting "
+                                 f"{failures} times in a row, giving up")
+                    exit_code = 1
+                    break
+                delay = min(MAX_RESTART_BACKOFF, RESTART_BACKOFF * 2 ** failures)
+                logger.warning(f"Worker {number} exited with code {process.exitcode}, restarting it in {delay}s")
+                slot.update(process=None, failures=failures, restart_at=now + delay)
+            elif process is None and now >= slot['restart_at']:
+                slot.update(process=_start(number)['process'], started=now)
+
+    processes = [slot['process'] for slot in slots.values() if slot['process'] is not None]
+    logger.info("Stopping: waiting for workers to finish their in-flight articles")
+    for process in processes:
+        if process.is_alive():
+            os.kill(process.pid, signal.SIGTERM)
+    deadline = time.monotonic() + DRAIN_TIMEOUT
+    for process in processes:
+        process.join(max(0, deadline - time.monotonic()))
+        if process.is_alive():
+            logger.warning(f"{process.name} did not stop in time, killing it; its leases will expire and be reclaimed")
+            process.kill()
+            process.join()
+    logger.info("All workers stopped")
+    return exit_code
+
 def main():
     """Process pending articles immediately without using the scheduler"""
+    arg_parser = argparse.ArgumentParser(description=main.__doc__)
+    arg_parser.add_argument('--batch', action='store_true',
+                            help='Submit the LLM stages through the OpenAI Batch API (cheaper, but can take hours)')
+    arg_parser.add_argument('--workers', type=int, default=0,
+                            help='Keep running as this many worker processes that pull articles from the job queue '
+                                 'until SIGTERM (default: process the pending articles once and exit)')
+    arg_parser.add_argument('--concurrency', type=int, default=0,
+                            help='Articles processed concurrently by each process (default: LLM_WORKERS)')
+    arg_parser.add_argument('--claim-batch', type=int, default=0,
+                            help='Articles a process claims at once from the job queue (default: JOB_CLAIM_BATCH)')
+    arg_parser.add_argument('--poll-interval', type=float, default=30,
+                            help='Seconds a worker waits before looking for new articles once the queue is empty')
+    args = arg_parser.parse_args()
+    apply_overrides(args)
+
+    if args.workers > 0:
+        return run_workers(args)
+
     try:
         logger.info("Starting immediate article processing")
-        
+
         # Create app context
         app = create_app(init_scheduler=False)  # Don't initialize scheduler
-        
+        extraction.start_pool()
+
         # Process articles within app context
         with app.app_context():
             logger.info("Processing pending articles")
-            result = process_pending_articles()
-            
+            result = process_pending_articles(use_batch=args.batch)
+
             if result:
                 logger.info("Article processing completed successfully")
                 return 0
             else:
                 logger.error("Article processing failed or no articles were processed")
                 return 1
-                
+
     except Exception as e:
         logger.error(f"Error during article processing: {str(e)}")
         return 1
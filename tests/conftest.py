@@ -0,0 +1,30 @@
+import pytest
+
+from app import create_app, db
+from app.models import Feed, Settings
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """An app on a fresh SQLite database, with the optional pipeline stages switched off"""
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setenv('EXTRACTION_WORKERS', '-1')
+    monkeypatch.setenv('LLM_CACHE_MAX_ENTRIES', '0')
+    monkeypatch.setenv('PREFILTER_ENABLED', '0')
+    monkeypatch.setenv('NEAR_DUP_THRESHOLD', '0')
+    app = create_app(init_scheduler=False)
+    with app.app_context():
+        settings = Settings.query.first()
+        settings.openai_api_key = 'sk-test'
+        settings.joplin_enabled = False
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def feed(app):
+    feed = Feed(name='test', url='https://example.com/feed.xml')
+    db.session.add(feed)
+    db.session.commit()
+    return feed
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import article_retry, db
+from app.models import Article
+
+
+@pytest.fixture
+def article(feed, monkeypatch):
+    monkeypatch.setitem(article_retry._config, 'max_attempts', 3)
+    monkeypatch.setitem(article_retry._config, 'backoff', 60)
+    monkeypatch.setitem(article_retry._config, 'max_backoff', 100)
+    article = Article(title='Flaky', url='https://example.com/flaky', feed_id=feed.id)
+    db.session.add(article)
+    db.session.commit()
+    return article
+
+
+def due_ids(now=None):
+    return [article_id for (article_id,) in db.session.query(Article.id).filter(article_retry.due(now))]
+
+
+def test_backoff_doubles_up_to_the_maximum(article):
+    assert [article_retry.backoff_delay(attempts) for attempts in (1, 2, 3)] == [60, 100, 100]
+
+    before = datetime.utcnow()
+    article_retry.record_failure(article, article_retry.FILTER_FAILED, "timeout")
+    db.session.commit()
+    assert article.attempts == 1 and article.error_class == article_retry.FILTER_FAILED
+    assert article.next_attempt_at >= before + timedelta(seconds=60)
+    assert due_ids() == []
+    assert due_ids(article.next_attempt_at) == [article.id]
+
+
+def test_article_is_dead_lettered_after_its_last_attempt(article):
+    for _ in range(3):
+        article_retry.record_failure(article, article_retry.PARSE_FAILED, "bad JSON")
+    db.session.commit()
+    assert article.dead_lettered_at is not None and article.next_attempt_at is None
+    assert due_ids(datetime.utcnow() + timedelta(days=1)) == []
+
+    article_retry.requeue(article)
+    db.session.commit()
+    assert article.attempts == 0 and due_ids() == [article.id]
+
+
+def test_configuration_errors_are_not_counted(article):
+    for _ in range(5):
+        article_retry.record_failure(article, article_retry.CONFIG, "OpenAI API key not configured")
+    assert article.attempts == 0 and article.dead_lettered_at is None
+    assert article.next_attempt_at is not None
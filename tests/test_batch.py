@@ -0,0 +1,37 @@
+import json
+
+from app import db
+from app.batch import LocalBatchClient
+from app.feed_processor import FILTER_SYSTEM_PROMPT, process_articles_batch
+from app.models import Article
+
+
+def responder(body):
+    """Keep every article but 'discard-me', parse with a summary naming the article, fail 'no-answer'"""
+    text = body['messages'][-1]['content']
+    if 'no-answer' in text:
+        return None
+    if body['messages'][0]['content'] == FILTER_SYSTEM_PROMPT:
+        return 'DISCARD' if 'discard-me' in text else 'KEEP'
+    marker = next(word for word in text.split() if word.startswith('marker-'))
+    return json.dumps({"summary": marker, "threat_groups": [], "ttp": [], "tags": ["cti"]})
+
+
+def test_batch_results_map_back_to_articles(feed):
+    contents = ['marker-a malware', 'marker-b discard-me', 'marker-c no-answer', 'marker-d ransomware', None]
+    articles = [Article(title=f"Article {i}", url=f"https://example.com/{i}", content=content, feed_id=feed.id)
+                for i, content in enumerate(contents)]
+    db.session.add_all(articles)
+    db.session.commit()
+    # Submitted out of id order, so a result mapped by position would land on the wrong article
+    batch = [(article.id, article.guid, article.title) for article in reversed(articles[:4])]
+
+    results = process_articles_batch(batch, client=LocalBatchClient(responder))
+
+    assert results == [True, False, True, True]
+    db.session.expire_all()
+    a, b, c, d, _ = [db.session.get(Article, article.id) for article in articles]
+    assert json.loads(a.summary)['summary'] == 'marker-a'
+    assert json.loads(d.summary)['summary'] == 'marker-d'
+    assert json.loads(b.summary)['filtered_out'] is True
+    assert not c.processed and c.attempts == 1
@@ -0,0 +1,22 @@
+from app import extraction
+
+HTML = b"<html><body><nav>menu</nav><article><h1>Advisory</h1><p>Patch CVE-2024-0001 now.</p></article></body></html>"
+
+
+def test_pool_starts_only_when_asked(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'EXTRACTION_WORKERS', 1)
+    extraction.init_app(app)
+    try:
+        assert extraction._pool is None
+        assert 'CVE-2024-0001' in extraction.extract_markdown(HTML)  # In-process until started
+        assert extraction.start_pool() is extraction._pool is not None
+        assert 'CVE-2024-0001' in extraction.extract_markdown(HTML)
+    finally:
+        extraction.shutdown_pool(wait=True)
+        monkeypatch.setitem(app.config, 'EXTRACTION_WORKERS', -1)
+        extraction.init_app(app)
+
+
+def test_disabled_pool_is_not_started(app):
+    assert extraction.start_pool() is None
+    assert extraction._pool is None
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+import feedparser
+
+from app import poll_schedule
+from app.feed_processor import apply_feed_data, entries_since_high_water_mark
+from app.models import Article
+
+
+def rss(*items):
+    """An RSS document with (number, day of June 2024) items, in the order given"""
+    entries = ''.join(f"<item><title>Post {number}</title><link>https://example.com/{number}</link>"
+                      f"<pubDate>{day:02d} Jun 2024 10:00:00 GMT</pubDate></item>" for number, day in items)
+    return feedparser.parse(f"<rss version='2.0'><channel><title>t</title>{entries}</channel></rss>")
+
+
+def test_not_modified_keeps_the_stored_interval(feed, monkeypatch):
+    feed.poll_interval = 120
+    def no_history(*args, **kwargs):
+        raise AssertionError("a 304 must not read the article history")
+    monkeypatch.setattr(poll_schedule, 'learn_publish_gap', no_history)
+
+    before = datetime.utcnow()
+    assert apply_feed_data(feed, feedparser.FeedParserDict(status=304, entries=[]))
+
+    assert feed.not_modified_count == 1
+    assert feed.poll_interval == 120
+    assert before + timedelta(minutes=120) <= feed.next_check_at <= datetime.utcnow() + timedelta(minutes=120)
+
+
+def test_high_water_mark_stops_at_the_first_known_entry(feed):
+    assert apply_feed_data(feed, rss((3, 3), (2, 2), (1, 1)))
+    assert feed.last_entry_published == datetime(2024, 6, 3, 10, 0)
+
+    newer = rss((5, 5), (4, 4), (3, 3), (2, 2), (1, 1))
+    assert [entry.title for entry in entries_since_high_water_mark(feed, newer.entries)] == ['Post 5', 'Post 4']
+    assert apply_feed_data(feed, newer)
+    assert Article.query.filter_by(feed_id=feed.id).count() == 5
+    assert feed.last_entry_published == datetime(2024, 6, 5, 10, 0)
+
+
+def test_unordered_feed_is_scanned_in_full(feed):
+    assert apply_feed_data(feed, rss((2, 2), (1, 1)))
+    shuffled = rss((1, 1), (3, 3), (2, 2))
+    assert len(entries_since_high_water_mark(feed, shuffled.entries)) == 3
+    assert apply_feed_data(feed, shuffled)
+    assert Article.query.filter_by(feed_id=feed.id).count() == 3
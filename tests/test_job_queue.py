@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+from app import db, job_queue
+from app.models import Article, ArticleJob
+
+
+def add_articles(feed, count):
+    articles = [Article(title=f"Article {i}", url=f"https://example.com/{i}", feed_id=feed.id) for i in range(count)]
+    db.session.add_all(articles)
+    db.session.commit()
+    return [article.id for article in articles]
+
+
+def test_claim_leases_each_job_to_one_worker(feed):
+    ids = add_articles(feed, 3)
+    assert job_queue.enqueue_due() == 3
+
+    first = job_queue.claim('worker-a', limit=2)
+    second = job_queue.claim('worker-b')
+
+    assert first == ids[:2]
+    assert second == ids[2:]
+    assert job_queue.claim('worker-c') == []
+
+
+def test_expired_lease_is_taken_over(feed):
+    ids = add_articles(feed, 1)
+    job_queue.enqueue_due()
+    now = datetime.utcnow()
+    assert job_queue.claim('worker-a', now=now) == ids
+
+    # Still leased: nobody else gets it
+    assert job_queue.claim('worker-b', now=now + timedelta(seconds=job_queue._config['lease'] - 1)) == []
+
+    # worker-a stopped heartbeating, so worker-b takes the job over once the lease runs out
+    later = now + timedelta(seconds=job_queue._config['lease'] + 1)
+    assert job_queue.claim('worker-b', now=later) == ids
+    job = ArticleJob.query.filter_by(article_id=ids[0]).one()
+    assert job.locked_by == 'worker-b'
+    assert job.claims == 2
+
+    # The old holder can no longer release it; the new one can
+    assert job_queue.release(ids, 'worker-a') == 0
+    assert job_queue.release(ids, 'worker-b') == 1
+    assert ArticleJob.query.count() == 0
+
+
+def test_heartbeat_keeps_the_lease(feed):
+    ids = add_articles(feed, 1)
+    job_queue.enqueue_due()
+    now = datetime.utcnow()
+    job_queue.claim('worker-a', now=now)
+
+    lease = timedelta(seconds=job_queue._config['lease'])
+    assert job_queue.extend('worker-a', now=now + lease / 2) == 1
+    assert job_queue.claim('worker-b', now=now + lease + timedelta(seconds=1)) == []
+    assert job_queue.claim('worker-b', now=now + lease * 2) == ids
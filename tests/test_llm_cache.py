@@ -0,0 +1,49 @@
+import pytest
+
+from app import llm_cache
+from app.models import LLMResponseCache
+
+
+@pytest.fixture
+def cache(app, monkeypatch):
+    monkeypatch.setitem(llm_cache._config, 'max_entries', 10)
+    monkeypatch.setattr(llm_cache, '_stores_since_sweep', 0)
+    return llm_cache
+
+
+def test_identical_request_is_answered_from_the_cache(cache):
+    calls = []
+    def call():
+        calls.append(1)
+        return f"answer {len(calls)}"
+
+    assert cache.cached_completion('filter_prompt', 'gpt-x', 'prompt', 'article', call) == 'answer 1'
+    assert cache.cached_completion('filter_prompt', 'gpt-x', 'prompt', 'article', call) == 'answer 1'
+    # Any change to the model, prompt or content is a different request
+    assert cache.cached_completion('filter_prompt', 'gpt-x', 'prompt', 'other article', call) == 'answer 2'
+    assert cache.cached_completion('filter_prompt', 'gpt-y', 'prompt', 'article', call) == 'answer 3'
+    assert len(calls) == 3
+    assert LLMResponseCache.query.filter_by(key=cache.cache_key('gpt-x', 'prompt', 'article')).one().hits == 1
+
+
+def test_invalidate_drops_only_that_prompts_answers(cache):
+    cache.store('filter_prompt', 'gpt-x', 'prompt', 'article', 'KEEP')
+    cache.store('parse_prompt', 'gpt-x', 'parse', 'article', '{}')
+
+    assert cache.invalidate('filter_prompt') == 1
+    assert cache.lookup('gpt-x', 'prompt', 'article') is None
+    assert cache.lookup('gpt-x', 'parse', 'article') == '{}'
+
+
+def test_full_cache_evicts_the_least_recently_used(cache):
+    for number in range(10):
+        cache.store('filter_prompt', 'gpt-x', 'prompt', f"article {number}", 'KEEP')
+    assert cache.lookup('gpt-x', 'prompt', 'article 0') == 'KEEP'  # Now the most recently used
+
+    cache.store('filter_prompt', 'gpt-x', 'prompt', 'article 10', 'KEEP')
+
+    assert LLMResponseCache.query.count() == 9
+    assert cache.lookup('gpt-x', 'prompt', 'article 0') == 'KEEP'
+    assert cache.lookup('gpt-x', 'prompt', 'article 1') is None
+    assert cache.lookup('gpt-x', 'prompt', 'article 2') is None
+    assert cache.lookup('gpt-x', 'prompt', 'article 3') == 'KEEP'
@@ -0,0 +1,106 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+import pytest
+
+from app import llm_client, usage
+from app.models import LLMUsage
+
+
+class SlowFirstBackend(llm_client.LLMBackend):
+    """Answers warm-up requests at once; of a 'slow' request's two copies the first takes a second"""
+
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def send(self, api_key, model, messages, max_tokens, timeout, response_format=None):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+        if messages[0]['content'] == 'slow':
+            time.sleep(1.0 if call == llm_client.MIN_HEDGE_SAMPLES + 1 else 0.05)
+        return llm_client.Completion(f"answer {call}", 100, 10)
+
+
+def test_hedged_duplicate_answers_first_and_both_are_recorded(app, monkeypatch):
+    monkeypatch.setitem(llm_client._config, 'hedge_percentile', 50)
+    backend = SlowFirstBackend()
+    llm_client.set_backend(backend)
+    model = 'hedge-test-model'
+    try:
+        for _ in range(llm_client.MIN_HEDGE_SAMPLES):
+            llm_client.create_completion('sk-test', model, [{'role': 'user', 'content': 'fast'}])
+
+        started = time.monotonic()
+        response = llm_client.create_completion('sk-test', model, [{'role': 'user', 'content': 'slow'}])
+        elapsed = time.monotonic() - started
+    finally:
+        llm_client.set_backend(None)
+
+    # The duplicate (the second copy) won well before the original's second was up
+    assert response.content == f"answer {llm_client.MIN_HEDGE_SAMPLES + 2}"
+    assert elapsed < 0.5
+    histogram = llm_client.stats()[model]
+    assert histogram['hedged'] == 1 and histogram['hedge_wins'] == 1
+
+    # The original still finishes and its tokens are recorded too
+    time.sleep(1.0)
+    usage.flush()
+    assert LLMUsage.query.filter_by(model=model).count() == llm_client.MIN_HEDGE_SAMPLES + 2
+
+
+class OllamaHandler(BaseHTTPRequestHandler):
+    """Answers /api/chat like Ollama; a 'fail' message gets a 503"""
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append((self.path, self.headers.get('Authorization'), request))
+        if request['messages'][-1]['content'] == 'fail':
+            status, body = 503, {'error': 'model is loading'}
+        else:
+            status, body = 200, {'message': {'role': 'assistant', 'content': '{"summary": "ok"}'},
+                                 'prompt_eval_count': 42, 'eval_count': 7, 'done': True}
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def ollama_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), OllamaHandler)
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_ollama_backend(app, ollama_server, monkeypatch):
+    monkeypatch.setitem(llm_client._config, 'backend', 'ollama')
+    monkeypatch.setitem(llm_client._config, 'base_url', f"http://127.0.0.1:{ollama_server.server_port}")
+    monkeypatch.setitem(llm_client._config, 'api_key', 'proxy-key')
+    monkeypatch.setitem(llm_client._config, 'retries', 0)
+    llm_client.set_backend(None)
+    try:
+        response = llm_client.create_completion('sk-test', 'llama3', [{'role': 'user', 'content': 'hi'}],
+                                                max_tokens=50, response_format={'type': 'json_object'})
+        with pytest.raises(openai.InternalServerError):
+            llm_client.create_completion('sk-test', 'llama3', [{'role': 'user', 'content': 'fail'}])
+    finally:
+        llm_client.set_backend(None)
+
+    assert (response.content, response.prompt_tokens, response.completion_tokens) == ('{"summary": "ok"}', 42, 7)
+    path, authorization, request = ollama_server.requests[0]
+    # The settings key stays private; the configured key is the bearer token
+    assert path == '/api/chat' and authorization == 'Bearer proxy-key'
+    assert request['format'] == 'json' and request['options']['num_predict'] == 50 and not request['stream']
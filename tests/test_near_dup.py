@@ -0,0 +1,72 @@
+import json
+import random
+
+import pytest
+
+from app import db, near_dup
+from app.feed_processor import PREFILTER_REASON, mark_filtered_out
+from app.models import Article
+
+WORDS = ("ransomware loader phishing exploit botnet actor campaign payload beacon credential dropper "
+         "persistence lateral movement exfiltration domain server victim patch advisory").split()
+
+
+def text(seed, words=200):
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(WORDS) for _ in range(words)) + '.'
+
+
+@pytest.fixture
+def add_article(feed, monkeypatch):
+    monkeypatch.setitem(near_dup._config, 'threshold', 0.7)
+
+    def add(content):
+        number = Article.query.count()
+        article = Article(title=f"Article {number}", url=f"https://example.com/{number}", content=content,
+                          feed_id=feed.id)
+        db.session.add(article)
+        db.session.flush()
+        return article
+    return add
+
+
+def test_near_duplicate_is_linked_to_its_original(add_article):
+    original = add_article(text(1))
+    assert near_dup.index_article(original) is None
+
+    duplicate = add_article(text(1) + ' Updated with one more indicator.')
+    unrelated = add_article(text(2))
+    assert near_dup.index_article(duplicate) == original.id
+    assert near_dup.index_article(unrelated) is None
+
+
+@pytest.mark.parametrize('filtered_by, saved', [(None, 2), ('model', 1), ('prefilter', 0)])
+def test_reused_summary_counts_only_calls_the_original_made(add_article, filtered_by, saved):
+    original = add_article(text(1))
+    if filtered_by is None:
+        original.processed = True
+        original.summary = json.dumps({"summary": "Loader campaign", "filtered_out": False})
+    elif filtered_by == 'prefilter':
+        mark_filtered_out(original, PREFILTER_REASON, filtered_by='prefilter')
+    else:
+        mark_filtered_out(original)
+    near_dup.index_article(original)
+    duplicate = add_article(text(1) + ' Updated with one more indicator.')
+    near_dup.index_article(duplicate)
+
+    assert near_dup.reuse_canonical_summary(duplicate) == saved
+    assert duplicate.processed
+    assert json.loads(duplicate.summary)['duplicate_of'] == original.id
+
+
+def test_unconfirmed_match_is_unlinked(add_article, monkeypatch):
+    original = add_article(text(1))
+    original.processed = True
+    original.summary = json.dumps({"summary": "Loader campaign"})
+    near_dup.index_article(original)
+    duplicate = add_article(text(1) + ' Updated with one more indicator.')
+    near_dup.index_article(duplicate)
+    monkeypatch.setattr(near_dup, 'jaccard', lambda a, b: 0.5)
+
+    assert near_dup.reuse_canonical_summary(duplicate) is None
+    assert duplicate.canonical_id is None and not duplicate.processed
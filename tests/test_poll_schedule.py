@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Article
+from app.poll_schedule import compute_poll_interval, schedule_next_check
+
+NOW = datetime(2024, 6, 1, 12, 0)
+
+
+def add_articles(feed, *hours_ago):
+    db.session.add_all(Article(title=f"Post {hours}", url=f"https://example.com/{hours}", feed_id=feed.id,
+                               published=NOW - timedelta(hours=hours)) for hours in hours_ago)
+    db.session.commit()
+
+
+def test_hourly_feed_is_polled_twice_an_hour(feed):
+    add_articles(feed, 4, 3, 2, 1)
+    assert compute_poll_interval(feed, now=NOW) == 30
+
+    assert schedule_next_check(feed, now=NOW) == NOW + timedelta(minutes=30)
+    assert feed.poll_interval == 30
+
+
+def test_feed_without_history_uses_the_check_interval(feed):
+    add_articles(feed, 2)
+    assert compute_poll_interval(feed, now=NOW) == 60
+
+
+def test_quiet_feed_backs_off_to_the_maximum(feed):
+    add_articles(feed, 24 * 30, 24 * 31, 24 * 32)
+    assert compute_poll_interval(feed, now=NOW) == 720
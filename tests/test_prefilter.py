@@ -0,0 +1,51 @@
+import pytest
+
+from app import db, prefilter
+from app.models import Article, PrefilterDecision
+
+REPORT = """The threat actor behind the campaign used a loader to drop ransomware and a backdoor.
+The malware gains persistence, moves laterally and uses phishing lures to deliver the payload.
+Lateral movement and exfiltration were observed; the actors exploited CVE-2024-21412 and CVE-2024-3400.
+Indicators of compromise: 44d88612fea8a8f36de82e1278abb02f and 185.220.101.4 for command and control."""
+
+WEBINAR = """Join our webinar next week! Register now to save your seat. Our keynote speakers announce
+the awards and our named a leader position in the magic quadrant. Request a demo or start a free trial."""
+
+NEWS = "The company published its quarterly report today. Shares rose slightly after the announcement."
+
+
+@pytest.fixture
+def article(feed, monkeypatch):
+    monkeypatch.setitem(prefilter._config, 'enabled', True)
+
+    def add(content):
+        number = Article.query.count()
+        article = Article(title=f"Article {number}", url=f"https://example.com/{number}", content=content,
+                          feed_id=feed.id)
+        db.session.add(article)
+        db.session.flush()
+        return article
+    return add
+
+
+@pytest.mark.parametrize('content, verdict', [(REPORT, prefilter.KEEP), (WEBINAR, prefilter.DISCARD), (NEWS, None)])
+def test_clear_cases_are_decided_locally(article, content, verdict):
+    assert prefilter.classify(article(content)) == verdict
+
+
+def test_hard_evidence_is_never_discarded(article):
+    score, reasons, has_evidence = prefilter.score_text(WEBINAR + " Patch CVE-2024-3400 now.")
+    assert has_evidence and score < 0
+    assert prefilter.classify(article(WEBINAR + " Patch CVE-2024-3400 now.")) is None
+
+
+def test_repeated_keywords_do_not_win_on_volume(article):
+    assert prefilter.classify(article("ransomware malware exploit " * 200)) is None
+
+
+def test_retried_article_keeps_one_decision_row(article):
+    discarded = article(WEBINAR)
+    prefilter.classify(discarded)
+    prefilter.classify(discarded)
+    db.session.commit()
+    assert PrefilterDecision.query.filter_by(article_id=discarded.id).count() == 1
@@ -0,0 +1,36 @@
+from app import db, llm_cache, llm_client, prompt_budget
+from app.feed_processor import filter_articles_grouped, filter_input, filter_prompt_text
+from app.models import Article, Prompt
+
+
+class GroupBackend(llm_client.LLMBackend):
+    """Answers a grouped filter request for its first article only, and single requests with KEEP"""
+
+    def send(self, api_key, model, messages, max_tokens, timeout, response_format=None):
+        grouped = '[2]' in messages[-1]['content']
+        return llm_client.Completion('1: KEEP' if grouped else 'KEEP', 50, 5)
+
+
+def test_inputs_are_counted_once_per_request_sent(feed, monkeypatch):
+    monkeypatch.setitem(llm_cache._config, 'max_entries', 100)
+    articles = [Article(title=name, url=f"https://example.com/{name}", content=f"{name} exploits CVE-2024-1234",
+                        feed_id=feed.id) for name in ('first', 'second', 'cached')]
+    db.session.add_all(articles)
+    db.session.commit()
+    filter_prompt = Prompt.query.filter_by(name='filter_prompt').first()
+    cached_input = filter_input(filter_prompt, articles[2].content)
+    llm_cache.store(filter_prompt.name, filter_prompt.model, filter_prompt_text(), cached_input.text, 'DISCARD')
+    before = dict(prompt_budget.stats()[prompt_budget.FILTER])
+
+    llm_client.set_backend(GroupBackend())
+    try:
+        verdicts = filter_articles_grouped(articles, filter_prompt, 'sk-test', group_size=2)
+    finally:
+        llm_client.set_backend(None)
+
+    assert verdicts == {articles[0].id: 'KEEP', articles[1].id: 'KEEP', articles[2].id: 'DISCARD'}
+    # Both articles went out in the group and the second once more on its own; the cached one never did
+    after = prompt_budget.stats()[prompt_budget.FILTER]
+    assert after['calls'] - before['calls'] == 3
+    first, second = (filter_input(filter_prompt, article.content).sent for article in articles[:2])
+    assert after['tokens_sent'] - before['tokens_sent'] == first + 2 * second
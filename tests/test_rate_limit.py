@@ -0,0 +1,47 @@
+import pytest
+
+from app import rate_limit
+from app.rate_limit import TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A monotonic clock that only moves when the test advances it"""
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_bucket_refills_at_its_rate(clock):
+    bucket = TokenBucket(60)
+    assert bucket.try_acquire(60) == 0
+    assert bucket.try_acquire(2) == pytest.approx(2.0)
+
+    clock[0] += 1.5
+    assert bucket.try_acquire(1) == 0
+    assert bucket.try_acquire(1) == pytest.approx(0.5)
+
+
+def test_oversized_request_waits_for_a_full_bucket(clock):
+    bucket = TokenBucket(60, capacity=10)
+    assert bucket.try_acquire(5) == 0
+    assert bucket.try_acquire(1000) == pytest.approx(5.0)
+    clock[0] += 5
+    assert bucket.try_acquire(1000) == 0
+
+
+def test_refund_never_overfills(clock):
+    bucket = TokenBucket(60)
+    assert bucket.try_acquire(10) == 0
+    bucket.refund(100)
+    assert bucket.tokens == bucket.capacity
+
+
+def test_limits_are_parsed_and_shared(monkeypatch):
+    assert rate_limit.parse_model_limits('gpt-4=500:30000, bad, gpt-x=1:') == {'gpt-4': (500, 30000)}
+    monkeypatch.setitem(rate_limit._config, 'model_limits', {'gpt-4': (500, 30000)})
+    monkeypatch.setitem(rate_limit._config, 'share', 0.5)
+    monkeypatch.setattr(rate_limit, '_limiters', {})
+
+    assert rate_limit.get_limiter('gpt-4').stats()['rpm'] == 250
+    assert rate_limit.get_limiter('gpt-4').stats()['tpm'] == 15000
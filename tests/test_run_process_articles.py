@@ -0,0 +1,15 @@
+import argparse
+
+from app import create_app, job_queue, llm_client
+from run_process_articles import apply_overrides
+
+
+def test_overrides_reach_init_app(app, monkeypatch):
+    monkeypatch.delenv('LLM_WORKERS', raising=False)
+    monkeypatch.delenv('JOB_CLAIM_BATCH', raising=False)
+    apply_overrides(argparse.Namespace(concurrency=7, claim_batch=3))
+
+    overridden = create_app(init_scheduler=False)
+    assert overridden.config['LLM_WORKERS'] == 7
+    assert llm_client._config['hedge_workers'] == 14
+    assert job_queue._config['claim_batch'] == 3
@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from app import structured_output
+
+ANSWER = {"summary": "Ransomware group hits hospitals", "threat_groups": ["FIN7"],
+          "ttp": ["T1486"], "tags": ["ransomware", "healthcare"]}
+TEXT = json.dumps(ANSWER)
+
+
+# The kinds of almost-JSON benchmarks/mock_llm_server.py sends back
+@pytest.mark.parametrize('kind, text, repair', [
+    ('fence', f"```json\n{TEXT}\n```", 'fence'),
+    ('trailing_comma', TEXT.replace(']', ',]').replace('}', ',}'), 'trailing_comma'),
+    ('prose', f"Here is the extracted information:\n{TEXT}\nLet me know if you need more.", 'extract'),
+])
+def test_repair_json(kind, text, repair):
+    value, repairs = structured_output.repair_json(text)
+    assert value == ANSWER
+    assert repair in repairs
+
+
+def test_repair_json_completes_truncated_answer():
+    value, repairs = structured_output.repair_json(TEXT[:TEXT.index('"tags"') + 20])
+    assert 'truncated' in repairs
+    assert value['summary'] == ANSWER['summary']
+    assert value['ttp'] == ANSWER['ttp']
+
+
+def test_repair_json_gives_up_on_text():
+    assert structured_output.repair_json("I could not find any threat intelligence here.") == (None, [])
+
+
+def test_parse_summary_keeps_fields_without_summary():
+    data = structured_output.parse_summary(json.dumps({"ttp": ["T1059"], "threat_groups": ["APT29"], "tags": []}))
+    assert data['summary'] == structured_output.DEFAULT_SUMMARY
+    assert data['ttp'] == ["T1059"]
+    assert data['threat_groups'] == ["APT29"]
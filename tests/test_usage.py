@@ -0,0 +1,33 @@
+from app import db, usage
+from app.models import Article, LLMUsage
+
+
+def test_grouped_request_is_split_per_article_and_counted_once(feed, monkeypatch):
+    # Rows other tests left in the buffer belong to their own databases
+    monkeypatch.setattr(usage, '_buffer', [])
+    articles = [Article(title=f"Article {i}", url=f"https://example.com/{i}", feed_id=feed.id) for i in range(3)]
+    db.session.add_all(articles)
+    db.session.commit()
+    ids = [article.id for article in articles]
+
+    with usage.attribute(*ids):
+        usage.record('usage-model', 'filter', prompt_tokens=101, completion_tokens=10, latency=1.0)
+    usage.record('usage-model', 'parse', prompt_tokens=500, completion_tokens=50, article_ids=[ids[0]])
+    usage.record('usage-model', 'parse', cache_hit=True, article_ids=[ids[1]])
+    usage.flush()
+
+    grouped = LLMUsage.query.filter_by(model='usage-model', stage='filter').order_by(LLMUsage.article_id).all()
+    assert [row.article_id for row in grouped] == ids
+    assert [row.prompt_tokens for row in grouped] == [34, 34, 33]
+    assert [row.completion_tokens for row in grouped] == [4, 3, 3]
+    assert len({row.request_id for row in grouped}) == 1
+
+    report = usage.summary()
+    model = next(entry for entry in report['by_model'] if entry['model'] == 'usage-model')
+    assert (model['calls'], model['cache_hits']) == (2, 1)
+    assert (model['prompt_tokens'], model['completion_tokens']) == (601, 60)
+    assert model['cache_hit_rate'] == round(1 / 3, 3)
+    stages = {entry['stage']: entry for entry in report['by_stage']}
+    assert stages['filter']['calls'] == 1 and stages['parse']['calls'] == 1
+    by_feed = next(entry for entry in report['by_feed'] if entry['feed_id'] == feed.id)
+    assert by_feed['articles'] == 3 and by_feed['total_tokens'] == 661